@@ -0,0 +1,89 @@
+"""比較不同連線設定 (C 擴充、協定壓縮、預備語句、健康檢查) 對寫入速度的影響。
+
+用法：
+    python benchmarks/bench_connection.py --host mysql.example.com --port 33306 --user me --password ... --rows 50000
+
+會在目標資料庫建立暫時的 bench_connection_tmp 資料表，結束後刪除。
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+import mysql.connector  # noqa: E402
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+
+TABLE = 'bench_connection_tmp'
+
+
+def _rows(count):
+    df = datagen.generate_frame(count, 6, mix=('int', 'float', 'text', 'cjk', 'date', 'int'))
+    df = df.astype(object)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+def run_combo(db_config, settings, rows, batch_size):
+    pool = db.create_pool(db_config, settings)
+    try:
+        conn = pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS `{TABLE}`")
+        cursor.execute(f"CREATE TABLE `{TABLE}` (a BIGINT, b DOUBLE, c TEXT, d TEXT, e DATETIME, f BIGINT) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+        cursor.close()
+        write_cursor = db.insert_cursor(pool, conn)
+        sql = f"INSERT INTO `{TABLE}` (a, b, c, d, e, f) VALUES (%s, %s, %s, %s, %s, %s)"
+        start = time.perf_counter()
+        for i in range(0, len(rows), batch_size):
+            write_cursor.executemany(sql, rows[i:i + batch_size])
+            conn.commit()
+        insert_seconds = time.perf_counter() - start
+        write_cursor.close()
+        conn.close()
+
+        start = time.perf_counter()
+        for _ in range(50):
+            pool.get_connection().close()
+        checkout_ms = (time.perf_counter() - start) / 50 * 1000
+
+        conn = pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS `{TABLE}`")
+        cursor.close()
+        conn.close()
+        return len(rows) / insert_seconds, checkout_ms, pool.driver
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="連線設定效能比較")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_config = {'host': args.host, 'port': args.port, 'user': args.user, 'password': args.password,
+                 'database': args.database or f"db_{args.user}"}
+    rows = _rows(args.rows)
+    print(f"{'驅動':<10}{'壓縮':<6}{'預備語句':<10}{'健康檢查':<10}{'寫入 rows/s':>14}{'取用連線 ms':>14}")
+    drivers = [True, False] if mysql.connector.HAVE_CEXT else [False]
+    for use_c, compress, prepared, health in itertools.product(drivers, [False, True], [False, True], [True, False]):
+        settings = dict(db.DEFAULT_CONNECTION_SETTINGS, pool_size=2, use_c_extension=use_c, compress=compress,
+                        prepared_statements=prepared, health_check=health)
+        rate, checkout_ms, driver = run_combo(db_config, settings, rows, args.batch_size)
+        print(f"{driver:<10}{'開' if compress else '關':<6}{'開' if prepared else '關':<10}{'開' if health else '關':<10}{rate:>14,.0f}{checkout_ms:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
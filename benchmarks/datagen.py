@@ -0,0 +1,69 @@
+"""產生效能測試用的合成 CSV / XLSX / SQLite 資料。
+
+所有輸出皆由固定亂數種子產生，相同參數會得到位元組完全相同的檔案，方便跨版本比較。
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# 同時可用 big5 與 gbk 編碼的繁體字，確保三種編碼都能寫出相同內容
+CJK_WORDS = ["台北", "新竹", "台中", "高雄", "桃園", "工廠", "產品", "測試", "資料", "品質",
+             "良率", "製程", "設備", "批號", "客戶", "訂單", "出貨", "檢驗", "材料", "供應商",
+             "倉庫", "庫存", "單位", "數量", "金額", "備註"]
+ASCII_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+               "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa"]
+
+COLUMN_TYPES = ('int', 'float', 'text', 'cjk', 'date', 'bool')
+DEFAULT_MIX = ('int', 'float', 'text', 'cjk', 'date')
+
+
+def _column(kind, rows, rng):
+    if kind == 'int':
+        return rng.integers(0, 1_000_000, size=rows)
+    if kind == 'float':
+        return np.round(rng.normal(100, 25, size=rows), 4)
+    if kind == 'text':
+        words = np.array(ASCII_WORDS)
+        return np.char.add(words[rng.integers(0, len(words), size=rows)], rng.integers(0, 10_000, size=rows).astype(str))
+    if kind == 'cjk':
+        words = np.array(CJK_WORDS)
+        return np.char.add(words[rng.integers(0, len(words), size=rows)], words[rng.integers(0, len(words), size=rows)])
+    if kind == 'date':
+        base = np.datetime64('2024-01-01T00:00:00')
+        return base + rng.integers(0, 365 * 24 * 3600, size=rows).astype('timedelta64[s]')
+    if kind == 'bool':
+        return rng.integers(0, 2, size=rows).astype(bool)
+    raise ValueError(f"未知的欄位型態: {kind}")
+
+
+def generate_frame(rows, cols, mix=DEFAULT_MIX, seed=42):
+    """依型態組合輪流產生 cols 個欄位、rows 筆資料的 DataFrame。"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        kind = mix[i % len(mix)]
+        data[f"{kind}_{i}"] = _column(kind, rows, rng)
+    return pd.DataFrame(data)
+
+
+def write_csv(df, path, encoding='utf-8'):
+    df.to_csv(path, index=False, encoding=encoding)
+    return path
+
+
+def write_xlsx(df, path):
+    df.to_excel(path, index=False, sheet_name='Sheet1')
+    return path
+
+
+def write_sqlite(df, path, table='bench'):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        df.to_sql(table, conn, index=False)
+    finally:
+        conn.close()
+    return path
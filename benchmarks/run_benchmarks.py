@@ -0,0 +1,224 @@
+"""匯入 (run_import) 與複製 (convert_database) 引擎的可重現效能測試。
+
+用法：
+    python benchmarks/run_benchmarks.py run --rows 100000 --cols 20 --output results/base.json
+    python benchmarks/run_benchmarks.py run --mysql-user me --mysql-password ... --mysql-database db_me
+    python benchmarks/run_benchmarks.py compare results/base.json results/new.json
+
+未指定 --mysql-user 時會使用本機 DB-API 替身 (standin.py)，只量測用戶端成本。
+每個測試案例都在獨立的子程序中執行，峰值 RSS 才不會受前一個案例影響。
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+import datagen  # noqa: E402
+from metrics import peak_rss_bytes  # noqa: E402
+
+
+def _make_pool(mysql_config, latency_ms):
+    if mysql_config:
+        from mysql.connector import pooling
+        return pooling.MySQLConnectionPool(pool_name="bench", pool_size=2, **mysql_config)
+    from standin import StandInPool
+    return StandInPool(latency_ms=latency_ms)
+
+
+def _run_case(case, mysql_config, latency_ms, result_queue):
+    import engine
+    pool = _make_pool(mysql_config, latency_ms)
+    table = f"bench_{case['id']}".replace('-', '_')
+    start = time.perf_counter()
+    if case['engine'] == 'copy':
+        result = engine.copy_sqlite_table(pool, case['path'], 'bench', table)
+    else:
+        options = {
+            'rows_to_skip': 0,
+            'headers_promoted': True,
+            'sheet_name': 'Sheet1',
+            'csv_encoding': case.get('encoding') or 'utf-8',
+            'csv_engine': case.get('csv_engine', 'c'),
+            'add_filename': False,
+            'deduplicate': case.get('deduplicate', False),
+            'action': 'overwrite',
+        }
+        result = engine.import_files(pool, [case['path']], table, options)
+    seconds = time.perf_counter() - start
+    if mysql_config:
+        conn = pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+        cursor.close()
+        conn.close()
+    peak = peak_rss_bytes()
+    result_queue.put({
+        'seconds': seconds,
+        'rows': result['rows'],
+        'rows_per_sec': result['rows'] / seconds if seconds else None,
+        'peak_rss_mb': round(peak / 1024 / 1024, 1) if peak else None,
+        'stages': result['metrics'].as_dict()['stages'],
+        'pipeline': result['metrics'].as_dict()['pipeline'],
+    })
+
+
+def _run_isolated(case, mysql_config, latency_ms):
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(case, mysql_config, latency_ms, result_queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"測試案例 {case['id']} 執行失敗 (exit code {proc.exitcode})")
+    return result_queue.get()
+
+
+def build_cases(args):
+    os.makedirs(args.data_dir, exist_ok=True)
+    mix = tuple(args.mix.split(','))
+    df = datagen.generate_frame(args.rows, args.cols, mix=mix, seed=args.seed)
+    suffix = f"{args.rows}x{args.cols}-{'_'.join(mix)}-s{args.seed}"
+    cases = []
+    for fmt in args.formats.split(','):
+        if fmt == 'csv':
+            for encoding in args.encodings.split(','):
+                path = os.path.join(args.data_dir, f"{suffix}-{encoding}.csv")
+                if not os.path.exists(path):
+                    datagen.write_csv(df, path, encoding=encoding)
+                for csv_engine in args.csv_engines.split(','):
+                    # 沿用舊的案例名稱，預設引擎的結果才能與既有結果檔比較
+                    case_id = f"csv-{encoding}-{args.rows}x{args.cols}" + ("" if csv_engine == 'c' else f"-{csv_engine}")
+                    cases.append({'id': case_id, 'engine': 'import', 'format': fmt, 'encoding': encoding,
+                                  'csv_engine': csv_engine, 'path': path})
+        elif fmt == 'xlsx':
+            path = os.path.join(args.data_dir, f"{suffix}.xlsx")
+            if not os.path.exists(path):
+                datagen.write_xlsx(df, path)
+            cases.append({'id': f"xlsx-{args.rows}x{args.cols}", 'engine': 'import', 'format': fmt, 'path': path})
+        elif fmt == 'sqlite':
+            path = os.path.join(args.data_dir, f"{suffix}.sqlite")
+            if not os.path.exists(path):
+                datagen.write_sqlite(df, path)
+            cases.append({'id': f"sqlite-{args.rows}x{args.cols}", 'engine': 'copy', 'format': fmt, 'path': path})
+        else:
+            raise ValueError(f"未知的格式: {fmt}")
+    if args.deduplicate:
+        for case in cases:
+            case['deduplicate'] = case['engine'] == 'import'
+    return cases
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args):
+    import pandas as pd
+    mysql_config = None
+    if args.mysql_user:
+        mysql_config = {'host': args.mysql_host, 'port': args.mysql_port, 'user': args.mysql_user,
+                        'password': args.mysql_password, 'database': args.mysql_database or f"db_{args.mysql_user}"}
+
+    results = []
+    for case in build_cases(args):
+        runs = []
+        for n in range(args.repeat):
+            run = _run_isolated(case, mysql_config, args.latency_ms)
+            runs.append(run)
+            print(f"{case['id']:<32} 第 {n + 1}/{args.repeat} 次: {run['rows_per_sec']:,.0f} rows/s, "
+                  f"{run['seconds']:.2f}s, 峰值 RSS {run['peak_rss_mb']} MB")
+        results.append({
+            'case': case['id'],
+            'engine': case['engine'],
+            'format': case['format'],
+            'encoding': case.get('encoding'),
+            'runs': runs,
+            'median_seconds': statistics.median(r['seconds'] for r in runs),
+            'median_rows_per_sec': statistics.median(r['rows_per_sec'] for r in runs),
+            'peak_rss_mb': max((r['peak_rss_mb'] or 0) for r in runs) or None,
+        })
+
+    report = {
+        'meta': {
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'target': 'mysql' if mysql_config else f"standin(latency_ms={args.latency_ms})",
+            'params': {'rows': args.rows, 'cols': args.cols, 'mix': args.mix, 'seed': args.seed, 'repeat': args.repeat},
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(BENCH_DIR, 'results', f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 {output}")
+
+
+def cmd_compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = {r['case']: r for r in json.load(f)['results']}
+    with open(args.new, encoding='utf-8') as f:
+        new = {r['case']: r for r in json.load(f)['results']}
+    print(f"{'案例':<32}{'基準 rows/s':>14}{'新版 rows/s':>14}{'變化':>9}{'RSS 基準':>10}{'RSS 新版':>10}")
+    for case, n in new.items():
+        b = base.get(case)
+        if not b:
+            print(f"{case:<32}{'-':>14}{n['median_rows_per_sec']:>14,.0f}")
+            continue
+        change = (n['median_rows_per_sec'] / b['median_rows_per_sec'] - 1) * 100
+        print(f"{case:<32}{b['median_rows_per_sec']:>14,.0f}{n['median_rows_per_sec']:>14,.0f}{change:>+8.1f}%"
+              f"{b['peak_rss_mb'] or 0:>10}{n['peak_rss_mb'] or 0:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB Importer 匯入/複製效能測試")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="產生測試資料並執行效能測試")
+    run.add_argument('--rows', type=int, default=100_000)
+    run.add_argument('--cols', type=int, default=20)
+    run.add_argument('--mix', default=','.join(datagen.DEFAULT_MIX), help=f"欄位型態輪替順序，可用: {', '.join(datagen.COLUMN_TYPES)}")
+    run.add_argument('--formats', default='csv,xlsx,sqlite')
+    run.add_argument('--encodings', default='utf-8,big5,gbk', help="CSV 檔案的編碼")
+    run.add_argument('--csv-engines', default='c', help="CSV 解析引擎，可用: c,pyarrow")
+    run.add_argument('--deduplicate', action='store_true', help="匯入時啟用去除重複資料")
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'))
+    run.add_argument('--output')
+    run.add_argument('--latency-ms', type=float, default=0.0, help="替身模式下每次往返的模擬延遲")
+    run.add_argument('--mysql-host', default='127.0.0.1')
+    run.add_argument('--mysql-port', type=int, default=3306)
+    run.add_argument('--mysql-user')
+    run.add_argument('--mysql-password', default='')
+    run.add_argument('--mysql-database')
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser('compare', help="比較兩次測試結果")
+    compare.add_argument('base')
+    compare.add_argument('new')
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""本機 DB-API 替身：模擬 mysql.connector 連線池的最小介面，但不連線任何伺服器。
+
+寫入的資料只計數後丟棄，用來量測匯入引擎在用戶端 (解析、轉換、打包) 的成本；
+可選擇為每次往返加上固定延遲，模擬遠端主機的網路往返時間。
+"""
+import re
+import threading
+import time
+
+_CREATE_RE = re.compile(r"^\s*CREATE TABLE `([^`]+)`", re.IGNORECASE)
+_DROP_RE = re.compile(r"^\s*DROP TABLE (?:IF EXISTS )?`([^`]+)`", re.IGNORECASE)
+
+
+class StandInPool:
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables = set()
+        self.rows_written = 0
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        return StandInConnection(self)
+
+    def close(self):
+        pass
+
+    def _round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StandInConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.connected = True
+
+    def cursor(self, *args, **kwargs):
+        return StandInCursor(self.pool)
+
+    def commit(self):
+        self.pool._round_trip()
+
+    def rollback(self):
+        self.pool._round_trip()
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+
+
+class StandInCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = -1
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self.pool._round_trip()
+        self._result = []
+        self.rowcount = 0
+        if match := _CREATE_RE.match(sql):
+            self.pool.tables.add(match.group(1))
+        elif match := _DROP_RE.match(sql):
+            self.pool.tables.discard(match.group(1))
+        elif sql.upper().startswith("SHOW TABLES LIKE"):
+            name = params[0]
+            self._result = [(name,)] if name in self.pool.tables else []
+
+    def executemany(self, sql, seq_params):
+        self.pool._round_trip()
+        rows = len(seq_params)
+        with self.pool.lock:
+            self.pool.rows_written += rows
+        self.rowcount = rows
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def fetchmany(self, size=1):
+        result, self._result = self._result[:size], self._result[size:]
+        return result
+
+    def close(self):
+        pass
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import messagebox
 import mysql.connector
 import logging
+import multiprocessing
 import sys
 import os
 
@@ -98,6 +99,12 @@ def run_app():
         app.pack(expand=True, fill="both")
         
         def on_closing():
+            if hasattr(app, 'job_queue'):
+                if app.job_queue.active_count() and not messagebox.askyesno("確認關閉", "仍有工作在佇列中或執行中，確定要取消這些工作並關閉嗎？"):
+                    return
+                if app.folder_watcher is not None:
+                    app.folder_watcher.stop()
+                app.job_queue.shutdown()
             logging.info("應用程式關閉。")
             if hasattr(app, 'db_pool'):
                 try:
@@ -116,5 +123,7 @@ def run_app():
     root.mainloop()
 
 if __name__ == "__main__":
+    # 打包成執行檔時，平行解析 CSV 的子程序需要此呼叫
+    multiprocessing.freeze_support()
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     run_app()
@@ -2,19 +2,48 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, scrolledtext
 import sqlite3
 import mysql.connector
-from mysql.connector import pooling
 import threading
 import logging
 import queue
 import os
 import pandas as pd
-import re
+
+import archives
+from readers import (CSV_DELIMITERS, CSV_ENCODINGS, CSV_ENGINES, SHEET_MODES, SOURCE_POSITIONS_ATTR, list_sheets,
+                     project_columns, read_file_raw, sanitize_and_deduplicate_columns, select_sheets, sniff_source)
+import console
+import db
+import engine
+import exporter
+import jobs
+import metrics
+import prescan
+import table_ops
+import transforms
+import watcher
+
+# 預覽表格顯示的資料列數
+PREVIEW_DISPLAY_ROWS = 50
+# 「若資料表已存在」選項與匯入引擎動作的對照
+IMPORT_ACTIONS = {
+    '覆蓋 (Overwrite)': 'overwrite',
+    '附加 (Append)': 'append',
+    '失敗 (Fail)': 'fail',
+    '更新或插入 (Upsert)': 'upsert',
+}
+
+# 效能分析選項與 metrics.run_profiled 模式的對照
+PROFILE_OPTIONS = {
+    '關閉': None,
+    'cProfile': 'cprofile',
+    'tracemalloc': 'tracemalloc',
+}
 
 # --- 日誌設定 ---
 def setup_logging(log_queue):
     log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     # 將日誌檔案儲存在專案根目錄
-    log_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_importer_debug.log')
+    log_file_path = metrics.app_file_path('db_importer_debug.log')
     file_handler = logging.FileHandler(log_file_path, mode='w', encoding='utf-8')
     file_handler.setFormatter(log_formatter)
     
@@ -49,17 +78,21 @@ class MainApplication(tk.Frame):
 
         self.log_queue = queue.Queue()
         self.raw_data_queue = queue.Queue()
+        self.profile_mode = tk.StringVar(value='關閉')
         setup_logging(self.log_queue)
 
+        self.db_config = db_config
+        self.connection_settings = db.load_connection_settings()
         try:
-            self.db_pool = pooling.MySQLConnectionPool(pool_name="mypool", pool_size=5, **db_config)
+            self.db_pool = db.create_pool(db_config, self.connection_settings)
             logging.info(f"MySQL 連線池建立成功 (使用者: {db_config['user']}, 資料庫: {db_config['database']})。")
         except mysql.connector.Error as err:
             logging.error(f"無法建立 MySQL 連線池: {err}")
             messagebox.showerror("連線池錯誤", f"無法建立 MySQL 連線池: {err}")
             root.destroy()
             return
-            return
+        self.job_history = jobs.JobHistory()
+        self.job_queue = jobs.JobQueue(self.db_pool, history=self.job_history, on_finish=self._on_job_finished)
         
         self.notebook = ttk.Notebook(root)
         self.tab1 = ttk.Frame(self.notebook)
@@ -67,10 +100,14 @@ class MainApplication(tk.Frame):
         self.tab3 = ttk.Frame(self.notebook)
         self.tab4 = ttk.Frame(self.notebook)
         self.tab5 = ttk.Frame(self.notebook)
+        self.tab6 = ttk.Frame(self.notebook)
+        self.tab7 = ttk.Frame(self.notebook)
         
         self.notebook.add(self.tab1, text='SQLite 複製到 MySQL')
         self.notebook.add(self.tab2, text='MySQL 資料表管理')
+        self.notebook.add(self.tab7, text='SQL 主控台')
         self.notebook.add(self.tab4, text='檔案匯入工具 (Excel/CSV)')
+        self.notebook.add(self.tab6, text='工作佇列')
         self.notebook.add(self.tab5, text='操作日誌 (Action Log)')
         self.notebook.add(self.tab3, text='偵錯日誌 (Debug Log)')
         self.notebook.pack(expand=True, fill="both", padx=10, pady=10)
@@ -80,9 +117,12 @@ class MainApplication(tk.Frame):
         self.init_log_tab()
         self.init_importer_tab()
         self.init_action_log_tab()
+        self.init_jobs_tab()
+        self.init_console_tab()
         
         self.root.after(100, self.process_log_queue)
         self.root.after(100, self.process_raw_data_queue)
+        self.root.after(500, self.refresh_job_view)
 
     def process_log_queue(self):
         while not self.log_queue.empty():
@@ -94,11 +134,13 @@ class MainApplication(tk.Frame):
 
     def process_raw_data_queue(self):
         try:
-            df = self.raw_data_queue.get_nowait()
+            df, sniffed = self.raw_data_queue.get_nowait()
             logging.info("主線程：從原始資料佇列中取到資料。")
             self.raw_df = df
-            self.transformed_df = df.copy()
-            self._populate_preview_tree(self.transformed_df)
+            if sniffed and not df.empty:
+                self._apply_sniff_result(sniffed)
+            else:
+                self._refresh_preview()
         except queue.Empty:
             pass
         except Exception as e:
@@ -116,7 +158,13 @@ class MainApplication(tk.Frame):
         self.all_files_in_folder = []
         self.selected_file_path = tk.StringVar()
         self.is_preview_loading = False
+        self.sniff_pending = False
+        self.csv_column_count = None
         self.preview_tree = None
+        self.preview_cache = transforms.PreviewCache()
+        # 欄位選擇 (原始檔案中的欄位位置，None 為全部) 套用到預覽資料的結果，原始資料或選擇改變時才重算
+        self.usecols = None
+        self._projection = None
 
         importer_pane = ttk.PanedWindow(self.tab4, orient=tk.HORIZONTAL)
         importer_pane.pack(expand=True, fill="both", padx=5, pady=5)
@@ -173,6 +221,20 @@ class MainApplication(tk.Frame):
         v_scroll.pack(side='right', fill='y')
         self.file_listbox.pack(side='left', fill='both', expand=True)
         self.file_listbox.bind("<<ListboxSelect>>", self._on_file_selected_from_list)
+        self.prescan_button = ttk.Button(self.folder_widgets_frame, text="預先檢查欄位結構", command=self.start_prescan_thread)
+        self.prescan_button.pack(fill="x", pady=(5, 0))
+
+        watch_frame = ttk.Frame(self.folder_widgets_frame)
+        watch_frame.pack(fill="x", pady=(5, 0))
+        self.watch_include_existing = tk.BooleanVar(value=False)
+        ttk.Checkbutton(watch_frame, text="包含資料夾中既有的檔案", variable=self.watch_include_existing).pack(anchor="w")
+        self.watch_button = ttk.Button(watch_frame, text="開始監看資料夾", command=self.toggle_folder_watch)
+        self.watch_button.pack(fill="x", pady=(2, 0))
+        self.watch_retry_button = ttk.Button(watch_frame, text="重試匯入失敗的檔案", command=self.retry_watch_failures, state="disabled")
+        self.watch_retry_button.pack(fill="x", pady=(2, 0))
+        self.watch_status_label = ttk.Label(watch_frame, text="", foreground="gray", wraplength=330)
+        self.watch_status_label.pack(anchor="w")
+        self.folder_watcher = None
 
         self.excel_options_frame = ttk.Frame(self.file_selection_frame)
         ttk.Label(self.excel_options_frame, text="選擇工作表 (Sheet):").pack(anchor="w")
@@ -180,6 +242,19 @@ class MainApplication(tk.Frame):
         self.sheet_menu = ttk.Combobox(self.excel_options_frame, textvariable=self.sheet_name, state="readonly")
         self.sheet_menu.pack(fill="x")
         self.sheet_menu.bind("<<ComboboxSelected>>", self._start_raw_data_load_thread)
+        ttk.Label(self.excel_options_frame, text="匯入的工作表:").pack(anchor="w", pady=(5, 0))
+        sheet_mode_row = ttk.Frame(self.excel_options_frame)
+        sheet_mode_row.pack(fill="x")
+        self.sheet_mode = tk.StringVar(value='單一工作表')
+        sheet_mode_menu = ttk.Combobox(sheet_mode_row, textvariable=self.sheet_mode, values=list(SHEET_MODES), state="readonly", width=10)
+        sheet_mode_menu.pack(side="left")
+        sheet_mode_menu.bind("<<ComboboxSelected>>", self._on_sheet_mode_change)
+        self.sheet_pattern = tk.StringVar(value='*')
+        self.sheet_pattern_entry = ttk.Entry(sheet_mode_row, textvariable=self.sheet_pattern, state="disabled")
+        self.sheet_pattern_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+        self.sheet_pattern_entry.bind('<KeyRelease>', self._on_sheet_mode_change)
+        self.sheet_match_label = ttk.Label(self.excel_options_frame, text="", foreground="gray", wraplength=330)
+        self.sheet_match_label.pack(anchor="w")
         
         processing_frame = ttk.LabelFrame(settings_pane, text="4. 資料轉換工具", padding="10")
         processing_frame.pack(fill="x", pady=5, anchor="n")
@@ -192,20 +267,76 @@ class MainApplication(tk.Frame):
         
         transform_frame2 = ttk.Frame(processing_frame)
         transform_frame2.pack(fill="x", pady=(5,8))
-        ttk.Button(transform_frame2, text="使用第一行作為標題", command=self.promote_headers).pack(side="left", expand=True, fill="x", padx=(0,5))
+        self.promote_headers_button = ttk.Button(transform_frame2, text="使用第一行作為標題", command=self.promote_headers)
+        self.promote_headers_button.pack(side="left", expand=True, fill="x", padx=(0,5))
         ttk.Button(transform_frame2, text="套用並更新預覽", command=self._apply_transformations_and_refresh_preview, style="Accent.TButton").pack(side="left", expand=True, fill="x")
 
         self.encoding_frame = ttk.Frame(processing_frame)
-        ttk.Label(self.encoding_frame, text="CSV 編碼:").pack(side="left")
+        encoding_row = ttk.Frame(self.encoding_frame)
+        encoding_row.pack(fill="x")
+        ttk.Label(encoding_row, text="CSV 編碼:").pack(side="left")
         self.csv_encoding = tk.StringVar(value="utf-8")
-        self.csv_encoding_menu = ttk.Combobox(self.encoding_frame, textvariable=self.csv_encoding, values=['utf-8', 'big5', 'gbk'], width=10, state="readonly")
+        self.csv_encoding_menu = ttk.Combobox(encoding_row, textvariable=self.csv_encoding, values=CSV_ENCODINGS, width=10, state="readonly")
         self.csv_encoding_menu.pack(side="left", padx=5)
         self.csv_encoding_menu.bind("<<ComboboxSelected>>", self._start_raw_data_load_thread)
-
+        ttk.Label(encoding_row, text="分隔符號:").pack(side="left", padx=(10, 0))
+        self.csv_delimiter = tk.StringVar(value=list(CSV_DELIMITERS)[0])
+        self.csv_delimiter_menu = ttk.Combobox(encoding_row, textvariable=self.csv_delimiter, values=list(CSV_DELIMITERS), width=8, state="readonly")
+        self.csv_delimiter_menu.pack(side="left", padx=5)
+        self.csv_delimiter_menu.bind("<<ComboboxSelected>>", self._on_csv_delimiter_change)
+        engine_row = ttk.Frame(self.encoding_frame)
+        engine_row.pack(fill="x", pady=(5, 0))
+        ttk.Label(engine_row, text="解析引擎:").pack(side="left")
+        self.csv_engine = tk.StringVar(value=list(CSV_ENGINES)[0])
+        self.csv_engine_menu = ttk.Combobox(engine_row, textvariable=self.csv_engine, values=list(CSV_ENGINES), width=10, state="readonly")
+        self.csv_engine_menu.pack(side="left", padx=5)
+        self.csv_engine_menu.bind("<<ComboboxSelected>>", self._start_raw_data_load_thread)
+        ttk.Label(engine_row, text="平行程序數 (0=自動):").pack(side="left", padx=(10, 0))
+        self.parallel_workers = tk.IntVar(value=0)
+        ttk.Spinbox(engine_row, from_=0, to=64, textvariable=self.parallel_workers, width=4).pack(side="left", padx=5)
+        sniff_row = ttk.Frame(self.encoding_frame)
+        sniff_row.pack(fill="x", pady=(5, 0))
+        ttk.Button(sniff_row, text="自動偵測格式", command=self._start_sniff_and_load).pack(side="left")
+        self.sniff_status_label = ttk.Label(sniff_row, text="", foreground="gray")
+        self.sniff_status_label.pack(side="left", padx=5)
+
+        self.align_by_name = tk.BooleanVar()
+        ttk.Checkbutton(processing_frame, text="依標題名稱對齊各檔案的欄位 (需使用標題列)", variable=self.align_by_name, command=self._refresh_preview).pack(anchor="w", pady=(5,0))
         self.add_filename = tk.BooleanVar()
-        ttk.Checkbutton(processing_frame, text="新增 '檔案來源' 欄位", variable=self.add_filename).pack(anchor="w", pady=(5,0))
+        ttk.Checkbutton(processing_frame, text="新增 '檔案來源' 欄位", variable=self.add_filename, command=self._refresh_preview).pack(anchor="w", pady=(5,0))
         self.deduplicate = tk.BooleanVar()
-        ttk.Checkbutton(processing_frame, text="去除重複的資料行", variable=self.deduplicate).pack(anchor="w")
+        ttk.Checkbutton(processing_frame, text="去除重複的資料行", variable=self.deduplicate, command=self._refresh_preview).pack(anchor="w")
+        self.trim_whitespace = tk.BooleanVar()
+        ttk.Checkbutton(processing_frame, text="去除文字前後空白", variable=self.trim_whitespace, command=self._refresh_preview).pack(anchor="w")
+        usecols_row = ttk.Frame(processing_frame)
+        usecols_row.pack(fill="x", pady=(5,0))
+        ttk.Button(usecols_row, text="選擇要讀取的欄位...", command=self.open_usecols_window).pack(side="left")
+        self.usecols_label = ttk.Label(usecols_row, text="讀取全部欄位", foreground="gray")
+        self.usecols_label.pack(side="left", padx=5)
+        ttk.Label(processing_frame, text="列條件 (讀取後立即套用，不符合的列不會再經過後續處理):").pack(anchor="w", pady=(5,0))
+        row_filter_row = ttk.Frame(processing_frame)
+        row_filter_row.pack(fill="x")
+        self.row_filter_column = tk.StringVar()
+        self.row_filter_column_menu = ttk.Combobox(row_filter_row, textvariable=self.row_filter_column, state="readonly", width=14)
+        self.row_filter_column_menu.pack(side="left")
+        self.row_filter_op = tk.StringVar(value='=')
+        ttk.Combobox(row_filter_row, textvariable=self.row_filter_op, values=list(table_ops.FILTER_OPERATORS), state="readonly", width=6).pack(side="left", padx=2)
+        self.row_filter_value = tk.StringVar()
+        ttk.Entry(row_filter_row, textvariable=self.row_filter_value, width=12).pack(side="left", padx=2)
+        ttk.Button(row_filter_row, text="加入", command=self.add_row_filter).pack(side="left", padx=2)
+        ttk.Button(row_filter_row, text="清除", command=self.clear_row_filters).pack(side="left")
+        self.row_filters = []
+        self.row_filter_label = ttk.Label(processing_frame, text="", foreground="gray", wraplength=330)
+        self.row_filter_label.pack(anchor="w")
+        ttk.Label(processing_frame, text="篩選條件 (每行一個 pandas 查詢式，欄位名稱以 ` 包住):").pack(anchor="w", pady=(5,0))
+        self.filters_text = tk.Text(processing_frame, height=2, font=("Courier New", 9))
+        self.filters_text.pack(fill="x")
+        self.column_casts = {}
+        recipe_frame = ttk.Frame(processing_frame)
+        recipe_frame.pack(fill="x", pady=(5,0))
+        ttk.Button(recipe_frame, text="欄位型態轉換...", command=self.open_casts_window).pack(side="left", expand=True, fill="x", padx=(0,5))
+        ttk.Button(recipe_frame, text="儲存配方...", command=self.save_recipe).pack(side="left", expand=True, fill="x", padx=(0,5))
+        ttk.Button(recipe_frame, text="載入配方...", command=self.load_recipe).pack(side="left", expand=True, fill="x")
 
         dest_frame = ttk.LabelFrame(settings_pane, text="5. 匯入目標", padding="10")
         dest_frame.pack(fill="x", pady=5, anchor="n")
@@ -214,7 +345,34 @@ class MainApplication(tk.Frame):
         ttk.Entry(dest_frame, textvariable=self.mysql_target_table).pack(fill="x", pady=(0, 5))
         ttk.Label(dest_frame, text="若資料表已存在:").pack(anchor="w")
         self.import_action = tk.StringVar(value="覆蓋 (Overwrite)")
-        ttk.Combobox(dest_frame, textvariable=self.import_action, values=['覆蓋 (Overwrite)', '附加 (Append)', '失敗 (Fail)'], state="readonly").pack(fill="x")
+        action_menu = ttk.Combobox(dest_frame, textvariable=self.import_action, values=list(IMPORT_ACTIONS), state="readonly")
+        action_menu.pack(fill="x")
+        action_menu.bind("<<ComboboxSelected>>", self._on_import_action_change)
+
+        self.swap_overwrite = tk.BooleanVar(value=True)
+        self.swap_overwrite_check = ttk.Checkbutton(dest_frame, text="覆蓋時先載入影子表再交換 (不中斷查詢)", variable=self.swap_overwrite)
+        self.swap_overwrite_check.pack(anchor="w", pady=(5, 0))
+        self.validate_schema = tk.BooleanVar(value=True)
+        self.validate_schema_check = ttk.Checkbutton(dest_frame, text="寫入既有資料表前依欄位定義驗證 (不合格的列存到拒絕檔)", variable=self.validate_schema)
+        self.validate_schema_check.pack(anchor="w", pady=(5, 0))
+        error_row = ttk.Frame(dest_frame)
+        error_row.pack(fill="x", pady=(5, 0))
+        ttk.Label(error_row, text="寫入時被拒絕的列超過").pack(side="left")
+        self.max_error_rows = tk.IntVar(value=engine.DEFAULT_MAX_ERROR_ROWS)
+        ttk.Spinbox(error_row, from_=0, to=1000000, increment=10, textvariable=self.max_error_rows, width=8).pack(side="left", padx=5)
+        ttk.Label(error_row, text="筆時中止").pack(side="left")
+
+        index_row = ttk.Frame(dest_frame)
+        index_row.pack(fill="x", pady=(5, 0))
+        ttk.Button(index_row, text="主鍵與索引...", command=self.open_index_spec_window).pack(side="left")
+        self.index_spec = {}
+        self.index_spec_label = ttk.Label(index_row, text="不建立主鍵與索引", foreground="gray", wraplength=250)
+        self.index_spec_label.pack(side="left", padx=5)
+
+        self.key_columns_frame = ttk.Frame(dest_frame)
+        ttk.Label(self.key_columns_frame, text="鍵值欄位 (可複選):").pack(anchor="w", pady=(5, 0))
+        self.key_columns_listbox = tk.Listbox(self.key_columns_frame, height=5, selectmode=tk.MULTIPLE, exportselection=False)
+        self.key_columns_listbox.pack(fill="x")
 
         action_frame = ttk.LabelFrame(settings_pane, text="6. 執行", padding="10")
         action_frame.pack(fill="x", pady=5, anchor="n")
@@ -224,9 +382,11 @@ class MainApplication(tk.Frame):
         self.importer_progressbar.pack(fill="x", pady=(0,5))
         self.importer_status_label = ttk.Label(action_frame, text="")
         self.importer_status_label.pack(fill="x")
+        self._build_profile_selector(action_frame).pack(fill="x", pady=(5,0))
 
         self.importer_button = ttk.Button(action_frame, text="開始匯入", command=self.start_import_thread, style="Success.TButton")
         self.importer_button.pack(fill="x", ipady=5, pady=(10,0))
+        ttk.Button(action_frame, text="加入工作佇列", command=self.enqueue_import_job).pack(fill="x", pady=(5,0))
 
         self.preview_frame = ttk.LabelFrame(preview_pane, text="資料預覽 (最多顯示前 50 筆)", padding="10")
         self.preview_frame.pack(expand=True, fill="both")
@@ -238,8 +398,30 @@ class MainApplication(tk.Frame):
         
         self._on_mode_change()
     
+    def _on_import_action_change(self, *args):
+        action = IMPORT_ACTIONS[self.import_action.get()]
+        if action == 'upsert':
+            self.key_columns_frame.pack(fill="x")
+        else:
+            self.key_columns_frame.pack_forget()
+        self.swap_overwrite_check.config(state="normal" if action == 'overwrite' else "disabled")
+        self.validate_schema_check.config(state="normal" if action in ('append', 'upsert') else "disabled")
+
+    def _refresh_key_column_choices(self, columns):
+        selected = set(self._selected_key_columns())
+        self.key_columns_listbox.delete(0, tk.END)
+        for i, col in enumerate(columns):
+            self.key_columns_listbox.insert(tk.END, col)
+            if col in selected:
+                self.key_columns_listbox.selection_set(i)
+
+    def _selected_key_columns(self):
+        return [self.key_columns_listbox.get(i) for i in self.key_columns_listbox.curselection()]
+
     def _on_mode_change(self, *args):
         mode = self.import_mode.get()
+        if self.folder_watcher is not None:
+            self.stop_folder_watch()
         self.source_path_var.set("")
         self.selected_file_path.set("")
         self.all_files_in_folder.clear()
@@ -248,7 +430,7 @@ class MainApplication(tk.Frame):
         self.sheet_name.set("")
         self.raw_df = None
         self.transformed_df = None
-        self.headers_promoted = False
+        self._set_headers_promoted(False)
         self._clear_and_recreate_preview_tree()
         if mode == 'single':
             self.folder_widgets_frame.pack_forget()
@@ -261,7 +443,15 @@ class MainApplication(tk.Frame):
         mode = self.import_mode.get()
         path = ""
         if mode == 'single':
-            path = filedialog.askopenfilename(filetypes=[("Excel/CSV", "*.xlsx *.xls *.csv")])
+            path = filedialog.askopenfilename(filetypes=[("Excel/CSV", "*.xlsx *.xls *.csv"),
+                                                         ("壓縮檔", "*.gz *.bz2 *.xz *.zip")])
+            if path and path.lower().endswith(archives.ARCHIVE_EXTENSION):
+                members = archives.zip_members(path)
+                if len(members) != 1:
+                    messagebox.showinfo("提示", f"此壓縮檔包含 {len(members)} 個可匯入的檔案，請改用資料夾模式選擇壓縮檔所在的資料夾，"
+                                              "其中的每個檔案會分別列在檔案清單中。")
+                    return
+                path = f"{path}{archives.MEMBER_SEPARATOR}{members[0]}"
             if path:
                 self.source_path_var.set(path)
                 self.selected_file_path.set(path)
@@ -270,7 +460,7 @@ class MainApplication(tk.Frame):
             path = filedialog.askdirectory()
             if path:
                 self.source_path_var.set(path)
-                self.all_files_in_folder = sorted([f for f in os.listdir(path) if f.endswith(('.csv', '.xlsx', '.xls'))])
+                self.all_files_in_folder = watcher.list_matching_files(path)
                 self._update_file_list_view()
 
     def _update_file_list_view(self, *args):
@@ -292,21 +482,44 @@ class MainApplication(tk.Frame):
     def _handle_file_type(self, file_path):
         self.excel_options_frame.pack_forget()
         self.encoding_frame.pack_forget()
-        self.headers_promoted = False
-        if file_path.endswith(('.xlsx', '.xls')):
+        if archives.is_excel(file_path):
             self.excel_options_frame.pack(fill="x", pady=5)
             try:
-                xls = pd.ExcelFile(file_path)
-                sheets = xls.sheet_names
+                sheets = list_sheets(file_path)
                 self.sheet_menu['values'] = sheets
                 if sheets:
                     self.sheet_name.set(sheets[0])
                     self._start_raw_data_load_thread()
             except Exception as e:
                 messagebox.showerror("讀取錯誤", f"無法讀取 Excel 工作表: {e}")
-        elif file_path.endswith('.csv'):
+        elif archives.is_csv(file_path):
             self.encoding_frame.pack(fill="x", pady=2)
-            self._start_raw_data_load_thread()
+            self._start_sniff_and_load()
+
+    def _on_sheet_mode_change(self, *args):
+        mode = SHEET_MODES[self.sheet_mode.get()]
+        self.sheet_pattern_entry.config(state="normal" if mode == 'pattern' else "disabled")
+        file_path = self.selected_file_path.get()
+        if mode == 'single' or not archives.is_excel(file_path):
+            self.sheet_match_label.config(text="")
+        else:
+            try:
+                sheets = select_sheets(file_path, mode, self.sheet_pattern.get())
+                self.sheet_match_label.config(text=f"將匯入 {len(sheets)} 個工作表，並加上「{transforms.SHEET_COLUMN}」欄位: {', '.join(sheets[:10])}"
+                                                   + (" ..." if len(sheets) > 10 else ""))
+            except Exception as e:
+                self.sheet_match_label.config(text=f"無法讀取工作表清單: {e}")
+        self._refresh_preview()
+
+    def _start_sniff_and_load(self):
+        # 先讀取檔案開頭的樣本推測格式，再以推測結果載入預覽並填入匯入設定
+        if self.is_preview_loading: return
+        self.sniff_pending = True
+        self._start_raw_data_load_thread()
+
+    def _on_csv_delimiter_change(self, *args):
+        self.csv_column_count = None
+        self._start_raw_data_load_thread()
 
     def _start_raw_data_load_thread(self, *args):
         if self.is_preview_loading: return
@@ -314,120 +527,265 @@ class MainApplication(tk.Frame):
         if not file_to_load: return
 
         self.is_preview_loading = True
-        self.preview_status_label.config(text="正在載入原始資料...")
+        sniff = self.sniff_pending
+        self.sniff_pending = False
+        self.preview_status_label.config(text="正在偵測檔案格式..." if sniff else "正在載入原始資料...")
         self.raw_df = None
         self.transformed_df = None
-        self.headers_promoted = False
         self._clear_and_recreate_preview_tree()
         
-        thread = threading.Thread(target=self._run_raw_data_load, args=(file_to_load,))
+        thread = threading.Thread(target=self._run_raw_data_load, args=(file_to_load, sniff))
         thread.start()
 
-    def _run_raw_data_load(self, file_path):
+    def _run_raw_data_load(self, file_path, sniff=False):
+        sniffed = None
         try:
-            logging.info(f"背景：開始讀取原始檔案 '{os.path.basename(file_path)}'")
-            df = self._read_file_raw(file_path, preview=True)
+            if sniff and archives.is_csv(file_path):
+                sniffed = sniff_source(file_path)
+                logging.info(f"背景：格式偵測結果 {sniffed}")
+            logging.info(f"背景：開始讀取原始檔案 '{archives.display_name(file_path)}'")
+            df = self._read_file_raw(file_path, preview=True, sniffed=sniffed)
             logging.info(f"背景：成功讀取原始檔案。")
-            self.raw_data_queue.put(df)
+            self.raw_data_queue.put((df, sniffed))
         except Exception as e:
             logging.error(f"背景讀取原始檔案失敗: {e}", exc_info=True)
-            self.raw_data_queue.put(pd.DataFrame())
+            self.raw_data_queue.put((pd.DataFrame(), None))
         finally:
             self.is_preview_loading = False
     
-    def _read_file_raw(self, file_path, preview=False, sheet_name_override=None):
-        if not file_path: return None
-        nrows = 200 if preview else None 
-        df = None
+    def _read_file_raw(self, file_path, preview=False, sheet_name_override=None, sniffed=None):
         sheet_to_use = sheet_name_override if sheet_name_override else self.sheet_name.get()
-
-        if file_path.endswith(('.xlsx', '.xls')):
-            if not sheet_to_use: return None
-            df = pd.read_excel(file_path, sheet_name=sheet_to_use, header=None, nrows=nrows)
-        elif file_path.endswith('.csv'):
-            encoding = self.csv_encoding.get()
-            df = pd.read_csv(file_path, encoding=encoding, header=None, low_memory=False, skipinitialspace=True, nrows=nrows)
-        
-        if df is not None:
-            df.dropna(how='all', axis=0, inplace=True)
-            df.dropna(how='all', axis=1, inplace=True)
-            df.reset_index(drop=True, inplace=True)
-            df.columns = [f"Column_{i}" for i in range(df.shape[1])]
-        return df
+        if sniffed:
+            encoding, delimiter, column_count = sniffed['encoding'], sniffed['delimiter'], sniffed['column_count']
+        else:
+            encoding, delimiter, column_count = self.csv_encoding.get(), CSV_DELIMITERS[self.csv_delimiter.get()], self.csv_column_count
+        return read_file_raw(file_path, sheet_name=sheet_to_use, encoding=encoding, preview=preview,
+                             csv_engine=CSV_ENGINES[self.csv_engine.get()], delimiter=delimiter, column_count=column_count)
+
+    def _apply_sniff_result(self, sniffed):
+        """把格式偵測結果填入匯入設定，並直接套用移除頂端行數與標題列。"""
+        self.csv_encoding.set(sniffed['encoding'])
+        self.csv_delimiter.set(next(name for name, char in CSV_DELIMITERS.items() if char == sniffed['delimiter']))
+        self.csv_column_count = sniffed['column_count']
+        self.rows_to_remove.set(sniffed['rows_to_skip'])
+        self._set_headers_promoted(sniffed['has_header'])
+        self.sniff_status_label.config(text=f"偵測結果: {sniffed['encoding']} ({sniffed['encoding_reason']})，"
+                                            f"移除 {sniffed['rows_to_skip']} 行，{'有' if sniffed['has_header'] else '無'}標題列")
+        self._refresh_preview()
 
     def _apply_transformations_and_refresh_preview(self, *args):
         if self.raw_df is None:
             messagebox.showinfo("提示", "請先選擇一個檔案以載入資料。")
             return
-
         logging.info("正在套用轉換並更新預覽...")
-        try:
-            df = self.raw_df.copy()
-            rows_to_skip = self.rows_to_remove.get()
-            if rows_to_skip > 0 and rows_to_skip < len(df):
-                df = df.iloc[rows_to_skip:].reset_index(drop=True)
-
-            self.transformed_df = df
-            self._populate_preview_tree(df)
-        except Exception as e:
-            logging.error(f"套用轉換時出錯: {e}", exc_info=True)
-            messagebox.showerror("轉換錯誤", f"套用轉換時出錯: {e}")
+        self._refresh_preview()
 
     def promote_headers(self, *args):
-        current_df = self.transformed_df
-        if current_df is None or current_df.empty:
+        if self.raw_df is None or self.raw_df.empty:
             messagebox.showinfo("提示", "沒有可提升為標頭的資料。")
             return
+        # 再按一次即取消；原始資料不會被修改，只需重新套用轉換
+        self._set_headers_promoted(not self.headers_promoted)
+        logging.info("正在提升標題列..." if self.headers_promoted else "已取消使用第一行作為標題。")
+        self._refresh_preview()
+
+    def _set_headers_promoted(self, promoted):
+        self.headers_promoted = promoted
+        self.promote_headers_button.config(text="取消使用第一行作為標題" if promoted else "使用第一行作為標題")
+
+    def _collect_recipe(self):
+        return {
+            'usecols': list(self.usecols) if self.usecols else None,
+            'rows_to_skip': self.rows_to_remove.get(),
+            'headers_promoted': self.headers_promoted,
+            'align_by_name': self.align_by_name.get(),
+            'trim_whitespace': self.trim_whitespace.get(),
+            'casts': dict(self.column_casts),
+            'row_filters': [list(f) for f in self.row_filters],
+            'filters': self.filters_text.get("1.0", tk.END).splitlines(),
+            'add_filename': self.add_filename.get(),
+            'deduplicate': self.deduplicate.get(),
+        }
+
+    def _apply_recipe(self, recipe):
+        self._set_usecols(recipe['usecols'])
+        self.row_filters = [tuple(f) for f in recipe['row_filters']]
+        self._update_row_filter_label()
+        self.rows_to_remove.set(recipe['rows_to_skip'])
+        self._set_headers_promoted(recipe['headers_promoted'])
+        self.align_by_name.set(recipe['align_by_name'])
+        self.trim_whitespace.set(recipe['trim_whitespace'])
+        self.column_casts = dict(recipe['casts'])
+        self.filters_text.delete("1.0", tk.END)
+        self.filters_text.insert("1.0", "\n".join(recipe['filters']))
+        self.add_filename.set(recipe['add_filename'])
+        self.deduplicate.set(recipe['deduplicate'])
+
+    def save_recipe(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("轉換配方", "*.json")])
+        if not path: return
+        try:
+            transforms.save_recipe(self._collect_recipe(), path)
+            logging.info(f"轉換配方已儲存至 {path}")
+        except Exception as e:
+            messagebox.showerror("儲存失敗", f"無法儲存配方: {e}")
 
-        logging.info("正在提升標題列...")
+    def load_recipe(self):
+        path = filedialog.askopenfilename(filetypes=[("轉換配方", "*.json")])
+        if not path: return
         try:
-            df = current_df.copy()
-            new_header = df.iloc[0].astype(str)
-            df = df[1:]
-            df.columns = new_header
-            df.reset_index(drop=True, inplace=True)
-            
-            self.raw_df = df
+            self._apply_recipe(transforms.load_recipe(path))
+            logging.info(f"已載入轉換配方 {path}")
+        except Exception as e:
+            messagebox.showerror("載入失敗", f"無法載入配方: {e}")
+            return
+        if self.raw_df is not None:
+            self._refresh_preview()
+
+    def open_casts_window(self):
+        columns = list(self.transformed_df.columns) if self.transformed_df is not None else list(self.column_casts)
+        if not columns:
+            messagebox.showinfo("提示", "請先載入檔案並設定標題列。")
+            return
+        win = tk.Toplevel(self.root)
+        win.title("欄位型態轉換")
+        win.geometry("420x380")
+        win.transient(self.root)
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill="both", expand=True)
+        type_names = {code: name for name, code in transforms.CAST_TYPES.items()}
+        tree = ttk.Treeview(frame, columns=("column", "cast"), show="headings", selectmode="extended")
+        tree.heading("column", text="欄位")
+        tree.heading("cast", text="轉換為")
+        tree.column("cast", width=100)
+        for col in columns:
+            tree.insert("", tk.END, iid=col, values=(col, type_names.get(self.column_casts.get(col), "不轉換")))
+        tree.pack(fill="both", expand=True)
+        choice = tk.StringVar(value="不轉換")
+        bar = ttk.Frame(frame)
+        bar.pack(fill="x", pady=(5, 0))
+        ttk.Combobox(bar, textvariable=choice, values=["不轉換"] + list(transforms.CAST_TYPES), state="readonly", width=10).pack(side="left")
+
+        def apply_to_selection():
+            for col in tree.selection():
+                if choice.get() == "不轉換":
+                    self.column_casts.pop(col, None)
+                else:
+                    self.column_casts[col] = transforms.CAST_TYPES[choice.get()]
+                tree.set(col, "cast", choice.get())
+            if self.raw_df is not None:
+                self._refresh_preview()
+        ttk.Button(bar, text="套用到選取欄位", command=apply_to_selection).pack(side="left", padx=5)
+
+    def _set_usecols(self, usecols):
+        self.usecols = sorted(usecols) if usecols else None
+        self.usecols_label.config(text=f"只讀取 {len(self.usecols)} 個欄位" if self.usecols else "讀取全部欄位")
+
+    def open_usecols_window(self):
+        """列出原始檔案的所有欄位 (依目前的移除行數與標題列命名)，勾選的欄位才會被讀取與匯入。"""
+        if self.raw_df is None or self.raw_df.empty:
+            messagebox.showinfo("提示", "請先選擇一個檔案以載入資料。")
+            return
+        positions = self.raw_df.attrs.get(SOURCE_POSITIONS_ATTR, list(range(self.raw_df.shape[1])))
+        header = transforms.apply_skip_and_header(self.raw_df, self.rows_to_remove.get(), self.headers_promoted)
+        names = list(sanitize_and_deduplicate_columns(header).columns) if self.headers_promoted else list(self.raw_df.columns)
+        win = tk.Toplevel(self.root)
+        win.title("選擇要讀取的欄位")
+        win.geometry("380x460")
+        win.transient(self.root)
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text="未選擇的欄位在讀取時就會略過，不會解析也不會寫入資料庫。", wraplength=340).pack(anchor="w")
+        listbox = tk.Listbox(frame, selectmode=tk.MULTIPLE, exportselection=False)
+        listbox.pack(fill="both", expand=True, pady=5)
+        for i, (name, position) in enumerate(zip(names, positions)):
+            listbox.insert(tk.END, f"{name}  (第 {position + 1} 欄)")
+            if self.usecols is None or position in self.usecols:
+                listbox.selection_set(i)
+        bar = ttk.Frame(frame)
+        bar.pack(fill="x")
+        ttk.Button(bar, text="全選", command=lambda: listbox.selection_set(0, tk.END)).pack(side="left")
+        ttk.Button(bar, text="全不選", command=lambda: listbox.selection_clear(0, tk.END)).pack(side="left", padx=5)
+
+        def apply():
+            selected = [positions[i] for i in listbox.curselection()]
+            if not selected:
+                messagebox.showwarning("提示", "請至少選擇一個欄位。", parent=win)
+                return
+            self._set_usecols(None if len(selected) == len(positions) else selected)
+            win.destroy()
+            self._refresh_preview()
+        ttk.Button(bar, text="套用", command=apply, style="Accent.TButton").pack(side="right")
+
+    def add_row_filter(self):
+        column = self.row_filter_column.get()
+        if not column: return
+        self.row_filters.append((column, table_ops.FILTER_OPERATORS[self.row_filter_op.get()], self.row_filter_value.get()))
+        self.row_filter_value.set("")
+        self._update_row_filter_label()
+        self._refresh_preview()
+
+    def clear_row_filters(self):
+        self.row_filters = []
+        self._update_row_filter_label()
+        self._refresh_preview()
+
+    def _update_row_filter_label(self):
+        op_names = {code: name for name, code in table_ops.FILTER_OPERATORS.items()}
+        self.row_filter_label.config(text=" 且 ".join(f"{col} {op_names.get(op, op)} {value}".rstrip() for col, op, value in self.row_filters))
+
+    def _preview_source(self):
+        # 預覽載入的是全部欄位，在這裡套用欄位選擇，結果與實際匯入時以 usecols 讀取相同
+        usecols = tuple(self.usecols or ())
+        if self._projection is None or self._projection[0] is not self.raw_df or self._projection[1] != usecols:
+            self._projection = (self.raw_df, usecols, project_columns(self.raw_df, self.usecols))
+        return self._projection[2]
+
+    def _refresh_preview(self):
+        """以目前的轉換設定編譯流程，套用到原始預覽資料後更新表格。"""
+        if self.raw_df is None: return
+        try:
+            pipeline = transforms.compile_pipeline({**self._collect_recipe(), 'sheet_mode': SHEET_MODES[self.sheet_mode.get()]})
+            # 只重算設定有變動的步驟之後的部分
+            df = self.preview_cache.run(pipeline, self._preview_source(), archives.display_name(self.selected_file_path.get()), self.sheet_name.get() or None)
             self.transformed_df = df
-            self.headers_promoted = True
             self._populate_preview_tree(df)
         except Exception as e:
-            logging.error(f"提升標題列時出錯: {e}", exc_info=True)
-            messagebox.showerror("操作錯誤", f"提升標題列時出錯: {e}")
+            logging.error(f"套用轉換時出錯: {e}", exc_info=True)
+            messagebox.showerror("轉換錯誤", f"套用轉換時出錯: {e}")
 
     def _populate_preview_tree(self, df):
-        self._clear_and_recreate_preview_tree()
-        if df is None: return
-
-        df_preview = df.copy()
-        df_preview = self._sanitize_and_deduplicate_columns(df_preview)
-        
-        if self.deduplicate.get():
-            df_preview.drop_duplicates(inplace=True)
-        if self.add_filename.get():
-            filename = os.path.basename(self.selected_file_path.get())
-            if '檔案來源' not in df_preview.columns:
-                df_preview.insert(0, '檔案來源', filename)
-
-        if df_preview.empty:
+        """就地更新預覽表格：欄位不變時只替換顯示中的資料列，且只把這幾列轉成字串。"""
+        if self.preview_tree is None or not self.preview_tree.winfo_exists():
+            self._clear_and_recreate_preview_tree()
+        if df is None or df.empty:
+            self.preview_tree.delete(*self.preview_tree.get_children())
             self.preview_status_label.config(text="預覽更新：0 筆資料列 × 0 個欄位")
             return
         
-        rows, cols = df_preview.shape
+        rows, cols = df.shape
         self.preview_status_label.config(text=f"預覽更新：{rows} 筆資料列 × {cols} 個欄位")
         
-        for col in df_preview.columns: df_preview[col] = df_preview[col].fillna('').astype(str)
-        
-        self.preview_tree["columns"] = list(df_preview.columns)
-        self.preview_tree["displaycolumns"] = list(df_preview.columns)
-        
-        for col in df_preview.columns:
-            self.preview_tree.heading(col, text=col)
-        
-        self._autofit_treeview_columns(self.preview_tree)
-
-        for index, row in df_preview.head(50).iterrows():
-            self.preview_tree.insert("", "end", values=list(row))
+        columns = [str(col) for col in df.columns]
+        self._refresh_key_column_choices(columns)
+        self.row_filter_column_menu['values'] = [c for c in columns if c not in (transforms.SOURCE_COLUMN, transforms.SHEET_COLUMN)]
+        if list(self.preview_tree["columns"]) != columns:
+            self.preview_tree["columns"] = columns
+            self.preview_tree["displaycolumns"] = columns
+            for col in columns:
+                self.preview_tree.heading(col, text=col)
+            self._autofit_treeview_columns(self.preview_tree)
+
+        window = df.head(PREVIEW_DISPLAY_ROWS).astype(object)
+        values = window.where(window.notna(), '').astype(str).values.tolist()
+        existing = self.preview_tree.get_children()
+        for i, row in enumerate(values):
+            if i < len(existing):
+                self.preview_tree.item(existing[i], values=row)
+            else:
+                self.preview_tree.insert("", "end", values=row)
+        if len(existing) > len(values):
+            self.preview_tree.delete(*existing[len(values):])
 
     def _autofit_treeview_columns(self, treeview):
         for col in treeview["columns"]:
@@ -451,22 +809,6 @@ class MainApplication(tk.Frame):
 
         self.preview_status_label.config(text="請選擇檔案或套用轉換")
 
-    def _sanitize_and_deduplicate_columns(self, df):
-        original_columns = df.columns.tolist()
-        new_columns = []
-        seen_counts = {}
-        for col in original_columns:
-            clean_col = re.sub(r'[\s\n\r\t　]+', ' ', str(col)).strip()
-            if not clean_col: clean_col = "Unnamed_Column"
-            if clean_col in seen_counts:
-                seen_counts[clean_col] += 1
-                new_columns.append(f"{clean_col}_{seen_counts[clean_col]}")
-            else:
-                seen_counts[clean_col] = 0
-                new_columns.append(clean_col)
-        df.columns = new_columns
-        return df
-
     def start_import_thread(self):
         self.importer_button.config(state=tk.DISABLED)
         self.importer_progress_var.set(0)
@@ -474,6 +816,208 @@ class MainApplication(tk.Frame):
         thread = threading.Thread(target=self.run_import)
         thread.start()
         
+    def _collect_import_settings(self):
+        return {
+            **self._collect_recipe(),
+            'sheet_name': self.sheet_name.get(),
+            'sheet_mode': SHEET_MODES[self.sheet_mode.get()],
+            'sheet_pattern': self.sheet_pattern.get().strip(),
+            'csv_encoding': self.csv_encoding.get(),
+            'csv_delimiter': CSV_DELIMITERS[self.csv_delimiter.get()],
+            'csv_column_count': self.csv_column_count,
+            'parallel_workers': self.parallel_workers.get(),
+            'csv_engine': CSV_ENGINES[self.csv_engine.get()],
+            'action': IMPORT_ACTIONS[self.import_action.get()],
+            'key_columns': self._selected_key_columns(),
+            'swap_overwrite': self.swap_overwrite.get(),
+            'validate_schema': self.validate_schema.get(),
+            'max_error_rows': self.max_error_rows.get(),
+            'index_spec': self.index_spec,
+        }
+
+    def _update_index_spec_label(self):
+        spec = self.index_spec
+        parts = []
+        if spec.get('surrogate_key'):
+            parts.append(f"自動遞增主鍵 {spec['surrogate_key']}")
+        elif spec.get('primary_key'):
+            parts.append(f"主鍵 ({', '.join(spec['primary_key'])})")
+        if spec.get('indexes'):
+            parts.append(f"{len(spec['indexes'])} 個索引")
+        self.index_spec_label.config(text="、".join(parts) if parts else "不建立主鍵與索引")
+
+    def open_index_spec_window(self):
+        """設定新建資料表的主鍵 (或自動遞增代理鍵) 與次要索引；次要索引在資料載入後一次建立。"""
+        columns = list(self.transformed_df.columns) if self.transformed_df is not None else []
+        if not columns:
+            messagebox.showinfo("提示", "請先載入檔案並設定標題列。")
+            return
+        spec = self.index_spec
+        win = tk.Toplevel(self.root)
+        win.title("主鍵與索引")
+        win.geometry("460x560")
+        win.transient(self.root)
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text="只在本次匯入建立資料表時套用 (新資料表或覆蓋)。", foreground="gray").pack(anchor="w")
+
+        pk_frame = ttk.LabelFrame(frame, text="主鍵", padding=5)
+        pk_frame.pack(fill="x", pady=5)
+        pk_mode = tk.StringVar(value='surrogate' if spec.get('surrogate_key') else 'columns' if spec.get('primary_key') else 'none')
+        surrogate_name = tk.StringVar(value=spec.get('surrogate_key') or 'id')
+        pk_row = ttk.Frame(pk_frame)
+        pk_row.pack(fill="x")
+        ttk.Radiobutton(pk_row, text="不建立", variable=pk_mode, value='none').pack(side="left")
+        ttk.Radiobutton(pk_row, text="自動遞增代理鍵:", variable=pk_mode, value='surrogate').pack(side="left", padx=(10, 0))
+        ttk.Entry(pk_row, textvariable=surrogate_name, width=10).pack(side="left", padx=2)
+        ttk.Radiobutton(pk_frame, text="使用下列選取的欄位:", variable=pk_mode, value='columns').pack(anchor="w")
+        pk_listbox = tk.Listbox(pk_frame, height=5, selectmode=tk.MULTIPLE, exportselection=False)
+        pk_listbox.pack(fill="x")
+
+        index_frame = ttk.LabelFrame(frame, text="次要索引 (資料載入後以單一 ALTER TABLE 建立)", padding=5)
+        index_frame.pack(fill="both", expand=True)
+        index_listbox = tk.Listbox(index_frame, height=5, selectmode=tk.MULTIPLE, exportselection=False)
+        index_listbox.pack(fill="x")
+        index_unique = tk.BooleanVar()
+        indexes = [dict(idx) for idx in spec.get('indexes') or []]
+        index_view = ttk.Treeview(index_frame, columns=("columns", "unique"), show="headings", height=4)
+        index_view.heading("columns", text="索引欄位")
+        index_view.heading("unique", text="唯一")
+        index_view.column("unique", width=50)
+        for col in columns:
+            pk_listbox.insert(tk.END, col)
+            index_listbox.insert(tk.END, col)
+            if col in (spec.get('primary_key') or []):
+                pk_listbox.selection_set(tk.END)
+
+        def refresh_indexes():
+            index_view.delete(*index_view.get_children())
+            for i, idx in enumerate(indexes):
+                index_view.insert("", tk.END, iid=str(i), values=(", ".join(idx['columns']), "是" if idx.get('unique') else ""))
+
+        def add_index():
+            selected = [index_listbox.get(i) for i in index_listbox.curselection()]
+            if not selected: return
+            indexes.append({'columns': selected, 'unique': index_unique.get()})
+            index_listbox.selection_clear(0, tk.END)
+            refresh_indexes()
+
+        def remove_index():
+            for iid in sorted((int(i) for i in index_view.selection()), reverse=True):
+                del indexes[iid]
+            refresh_indexes()
+
+        bar = ttk.Frame(index_frame)
+        bar.pack(fill="x", pady=2)
+        ttk.Checkbutton(bar, text="唯一索引", variable=index_unique).pack(side="left")
+        ttk.Button(bar, text="加入索引", command=add_index).pack(side="left", padx=5)
+        ttk.Button(bar, text="移除選取的索引", command=remove_index).pack(side="left")
+        index_view.pack(fill="both", expand=True)
+        refresh_indexes()
+
+        def apply():
+            new_spec = {'indexes': indexes}
+            if pk_mode.get() == 'surrogate':
+                new_spec['surrogate_key'] = surrogate_name.get().strip()
+            elif pk_mode.get() == 'columns':
+                new_spec['primary_key'] = [pk_listbox.get(i) for i in pk_listbox.curselection()]
+            try:
+                engine.parse_index_spec(new_spec, columns)
+            except ValueError as e:
+                messagebox.showerror("索引設定錯誤", str(e), parent=win)
+                return
+            self.index_spec = new_spec
+            self._update_index_spec_label()
+            win.destroy()
+        ttk.Button(frame, text="套用", command=apply, style="Accent.TButton").pack(anchor="e", pady=(5, 0))
+
+    def _collect_import_files(self):
+        if self.import_mode.get() == 'single':
+            return [self.selected_file_path.get()]
+        source = self.source_path_var.get()
+        return [os.path.join(source, f) for f in self.file_listbox.get(0, tk.END)]
+
+    def _update_importer_progress(self, done, total, text):
+        self.importer_progressbar['maximum'] = max(total, 1)
+        self.importer_status_label.config(text=text)
+        self.importer_progress_var.set(done)
+        self.root.update_idletasks()
+
+    def start_prescan_thread(self):
+        files = self._collect_import_files()
+        if not files:
+            messagebox.showinfo("提示", "請先選擇資料夾，清單中至少要有一個檔案。")
+            return
+        self.prescan_button.config(state=tk.DISABLED)
+        self.importer_progress_var.set(0)
+        thread = threading.Thread(target=self.run_prescan, args=(files, self._collect_import_settings()))
+        thread.start()
+
+    def run_prescan(self, files, settings):
+        try:
+            report = prescan.prescan_files(files, settings, progress=self._update_importer_progress)
+            self.root.after(0, lambda: self._show_prescan_report(report))
+        except Exception as e:
+            logging.error(f"欄位結構預先檢查失敗: {e}", exc_info=True)
+            messagebox.showerror("檢查失敗", f"欄位結構預先檢查失敗: {e}")
+        finally:
+            self.prescan_button.config(state=tk.NORMAL)
+
+    def _show_prescan_report(self, report):
+        problems = [e for e in report['files'] if e['status'] not in ('reference', 'ok')]
+        self.importer_status_label.config(text=f"欄位結構檢查：{len(report['files'])} 個檔案，{len(problems)} 個與基準不一致。")
+
+        win = tk.Toplevel(self.root)
+        win.title("欄位結構報告")
+        win.geometry("900x520")
+        win.transient(self.root)
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill="both", expand=True)
+
+        reference = report['reference_columns']
+        ttk.Label(frame, text=f"基準欄位 ({len(reference)} 個): {', '.join(reference)}", wraplength=860).pack(anchor="w", pady=(0, 5))
+        columns = ("file", "status", "count", "detail")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=12)
+        for col, heading, width in zip(columns, ("檔案", "狀態", "欄位數", "說明"), (220, 160, 60, 420)):
+            tree.heading(col, text=heading)
+            tree.column(col, width=width, anchor="w")
+        tree.tag_configure("problem", foreground="#c0392b")
+        for entry in report['files']:
+            details = []
+            if entry['error']: details.append(entry['error'])
+            if entry['missing']: details.append(f"缺少: {', '.join(entry['missing'])}")
+            if entry['extra']: details.append(f"多出: {', '.join(entry['extra'])}")
+            tree.insert("", tk.END, values=(entry['file'], prescan.STATUS_LABELS[entry['status']], len(entry['columns']), "；".join(details)),
+                        tags=("problem",) if entry in problems else ())
+        tree.pack(fill="both", expand=True)
+
+        conflicts = report['type_conflicts']
+        ttk.Label(frame, text=f"可能的型態衝突 ({len(conflicts)} 個欄位):").pack(anchor="w", pady=(8, 2))
+        conflict_text = scrolledtext.ScrolledText(frame, height=6, wrap=tk.WORD, font=("Courier New", 9))
+        for column, seen in conflicts.items():
+            conflict_text.insert(tk.END, f"{column}: " + "；".join(f"{t} ({', '.join(files)})" for t, files in seen.items()) + "\n")
+        if not conflicts:
+            conflict_text.insert(tk.END, "無\n")
+        conflict_text.config(state="disabled")
+        conflict_text.pack(fill="x")
+        if any(e['status'] in ('reordered', 'renamed', 'count_mismatch') for e in problems) and self.headers_promoted:
+            ttk.Label(frame, text="提示：勾選「依標題名稱對齊各檔案的欄位」可讓順序或數量不同的檔案依名稱匯入，而不是被跳過或錯位。",
+                      foreground="gray", wraplength=860).pack(anchor="w", pady=(5, 0))
+
+    def _build_profile_selector(self, parent):
+        frame = ttk.Frame(parent)
+        ttk.Label(frame, text="效能分析:").pack(side="left")
+        ttk.Combobox(frame, textvariable=self.profile_mode, values=list(PROFILE_OPTIONS), width=12, state="readonly").pack(side="left", padx=5)
+        return frame
+
+    def _record_run_metrics(self, run_metrics):
+        self.log_action(run_metrics.summary())
+        try:
+            path = metrics.save_metrics_json(run_metrics)
+            logging.info(f"效能指標已寫入 {path}")
+        except OSError as e:
+            logging.error(f"寫入效能指標檔失敗: {e}")
+
     def run_import(self):
         logging.info("="*20 + " 開始新的檔案匯入任務 " + "="*20)
         target_table = self.mysql_target_table.get().strip()
@@ -481,131 +1025,99 @@ class MainApplication(tk.Frame):
             messagebox.showerror("錯誤", "請填寫目標 MySQL 資料表名稱。")
             self.importer_button.config(state=tk.NORMAL)
             return
-        
-        conn = None
+
         try:
-            all_files_to_process = []
-            mode = self.import_mode.get()
-            source = self.source_path_var.get()
-            if mode == 'single':
-                all_files_to_process.append(self.selected_file_path.get())
+            files = self._collect_import_files()
+            settings = self._collect_import_settings()
+            result = metrics.run_profiled(PROFILE_OPTIONS[self.profile_mode.get()], 'import',
+                                          lambda: engine.import_files(self.db_pool, files, target_table, settings, progress=self._update_importer_progress))
+            self._record_run_metrics(result['metrics'])
+            total_rows = result['rows']
+            rejected_note = ""
+            if result.get('rejected'):
+                rejected_note = f"\n\n另有 {result['rejected']} 筆資料不符合資料表的欄位定義而未寫入，已存到拒絕檔:\n{result['reject_file']}"
+                self.log_action(f"匯入 '{target_table}' 時有 {result['rejected']} 筆資料未通過驗證，拒絕檔: {result['reject_file']}")
+            if result.get('dead_letter_rows'):
+                rejected_note += f"\n\n有 {result['dead_letter_rows']} 筆資料被 MySQL 拒絕而未寫入，已存到死信檔:\n{result['dead_letter_file']}"
+                self.log_action(f"匯入 '{target_table}' 時有 {result['dead_letter_rows']} 筆資料被 MySQL 拒絕，死信檔: {result['dead_letter_file']}")
+            if result.get('indexes_built'):
+                rejected_note += f"\n\n已在載入後建立 {result['indexes_built']} 個索引，耗時 {result['index_seconds']:.1f} 秒。"
+            if 'inserted' in result:
+                summary = f"新增 {result['inserted']} 筆、更新 {result['updated']} 筆、未變更 {result['unchanged']} 筆"
+                self.log_action(f"更新或插入資料表 '{target_table}': {summary}")
+                self.importer_status_label.config(text=f"匯入成功！{summary}。", bootstyle="success")
+                messagebox.showinfo("成功", f"已將 {total_rows} 筆資料更新或插入到資料表 '{target_table}'。\n\n{summary}。{rejected_note}")
             else:
-                filtered_filenames = self.file_listbox.get(0, tk.END)
-                all_files_to_process = [os.path.join(source, f) for f in filtered_filenames]
-            if not all_files_to_process: raise ValueError("找不到任何要處理的檔案。")
-            
-            logging.info(f"找到 {len(all_files_to_process)} 個待處理檔案。")
-            
-            all_dfs = []
-            final_columns = None
-            rows_to_skip = self.rows_to_remove.get()
-            sheet_name_to_use = self.sheet_name.get()
-            
-            for i, f_path in enumerate(all_files_to_process):
-                logging.info(f"正在完整讀取檔案: {f_path}")
-                df = self._read_file_raw(file_path=f_path, sheet_name_override=sheet_name_to_use, preview=False)
-                if df is None or df.empty:
-                    continue
-
-                if rows_to_skip > 0 and rows_to_skip < len(df):
-                    df = df.iloc[rows_to_skip:].reset_index(drop=True)
-                
-                if df.empty:
-                    continue
-
-                if i == 0:
-                    if self.headers_promoted:
-                        new_header = df.iloc[0].astype(str)
-                        df = df[1:]
-                        df.columns = new_header
-                    
-                    df.reset_index(drop=True, inplace=True)
-                    df = self._sanitize_and_deduplicate_columns(df)
-                    final_columns = df.columns.tolist()
-                else:
-                    if self.headers_promoted:
-                        df = df[1:]
-                    
-                    df.reset_index(drop=True, inplace=True)
-                    
-                    if len(final_columns) == df.shape[1]:
-                        df.columns = final_columns
-                    else:
-                        logging.warning(f"檔案 '{os.path.basename(f_path)}' 的欄位數 ({df.shape[1]}) 與第一個檔案 ({len(final_columns)}) 不符，將跳過此檔案。")
-                        continue
-
-                if self.add_filename.get():
-                    df.insert(0, '檔案來源', os.path.basename(f_path))
-                
-                all_dfs.append(df)
-
-            if not all_dfs: raise ValueError("所有檔案都無法讀取或為空。")
-            
-            master_df = pd.concat(all_dfs, ignore_index=True)
-
-            if self.deduplicate.get():
-                master_df.drop_duplicates(inplace=True)
-            
-            total_rows = len(master_df)
-            logging.info(f"最終準備匯入 {total_rows} 筆資料到資料表 '{target_table}'")
-            self.importer_progressbar['maximum'] = total_rows
-            
-            master_df = master_df.where(pd.notnull(master_df), None)
-            
-            conn = self.db_pool.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SHOW TABLES LIKE %s", (target_table,))
-            table_exists = cursor.fetchone()
-            action = self.import_action.get().split(' ')[0]
-            
-            if table_exists:
-                if action == '失敗': raise ValueError(f"資料表 '{target_table}' 已存在，操作已取消。")
-                if action == '覆蓋':
-                    cursor.execute(f"DROP TABLE `{target_table}`")
-                    table_exists = False
-            
-            if not table_exists:
-                cols_with_types = [f"`{col}` {self.map_pandas_dtype_to_mysql(dtype)}" for col, dtype in master_df.dtypes.items()]
-                create_sql = f"CREATE TABLE `{target_table}` ({', '.join(cols_with_types)}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-                cursor.execute(create_sql)
-            
-            if not master_df.empty:
-                data_to_insert = [tuple(row) for row in master_df.itertuples(index=False)]
-                insert_sql = f"INSERT INTO `{target_table}` ({', '.join([f'`{c}`' for c in master_df.columns])}) VALUES ({', '.join(['%s'] * len(master_df.columns))})"
-                
-                CHUNK_SIZE = 1000
-                rows_written = 0
-                for i in range(0, total_rows, CHUNK_SIZE):
-                    chunk = data_to_insert[i:i + CHUNK_SIZE]
-                    status_text = f"正在寫入資料... {rows_written + len(chunk)} / {total_rows}"
-                    self.importer_status_label.config(text=status_text)
-                    self.importer_progress_var.set(rows_written + len(chunk))
-                    self.root.update_idletasks()
-                    
-                    cursor.executemany(insert_sql, chunk)
-                    conn.commit()
-                    rows_written += len(chunk)
-
-            self.importer_status_label.config(text=f"匯入成功！共 {total_rows} 筆資料。", bootstyle="success")
-            logging.info("所有資料成功寫入資料庫！")
-            messagebox.showinfo("成功", f"成功將 {total_rows} 筆資料匯入到資料表 '{target_table}'。")
+                self.importer_status_label.config(text=f"匯入成功！共 {total_rows} 筆資料。", bootstyle="success")
+                messagebox.showinfo("成功", f"成功將 {total_rows} 筆資料匯入到資料表 '{target_table}'。{rejected_note}")
         except Exception as e:
             logging.error(f"匯入任務失敗: {e}", exc_info=True)
             self.importer_status_label.config(text=f"任務失敗: {e}", bootstyle="danger")
             messagebox.showerror("匯入失敗", f"任務失敗，請查看日誌。\n\n錯誤: {e}")
         finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
             self.importer_button.config(state=tk.NORMAL)
 
-    def map_pandas_dtype_to_mysql(self, dtype):
-        dtype_str = str(dtype).lower()
-        if "int" in dtype_str: return "BIGINT"
-        if "float" in dtype_str: return "DOUBLE"
-        if "datetime" in dtype_str: return "DATETIME"
-        if "bool" in dtype_str: return "TINYINT(1)"
-        return "TEXT"
+    def enqueue_import_job(self):
+        target_table = self.mysql_target_table.get().strip()
+        if not target_table:
+            messagebox.showerror("錯誤", "請填寫目標 MySQL 資料表名稱。")
+            return
+        files = [f for f in self._collect_import_files() if f]
+        if not files:
+            messagebox.showerror("錯誤", "請先選擇要匯入的檔案或資料夾。")
+            return
+        job = self.job_queue.submit(jobs.import_job(self.db_pool, files, target_table, self._collect_import_settings()))
+        self.importer_status_label.config(text=f"已加入工作佇列 (工作 #{job.id})，可到「工作佇列」頁籤查看進度。")
+
+    def toggle_folder_watch(self):
+        if self.folder_watcher is not None:
+            self.stop_folder_watch()
+            return
+        folder = self.source_path_var.get()
+        target_table = self.mysql_target_table.get().strip()
+        if not folder or not target_table:
+            messagebox.showerror("錯誤", "請先選擇資料夾並填寫目標 MySQL 資料表名稱。")
+            return
+        settings = self._collect_import_settings()
+        if settings['action'] not in ('append', 'upsert'):
+            messagebox.showerror("錯誤", "監看資料夾會持續寫入同一個資料表，「若資料表已存在」請選擇附加或更新或插入。")
+            return
+
+        def submit_batch(paths):
+            return self.job_queue.submit(jobs.import_job(self.db_pool, paths, target_table, settings,
+                                                         description=f"監看：{len(paths)} 個檔案 ({archives.display_name(paths[0])}...)"))
+
+        def on_status(text):
+            self.root.after(0, lambda: self.watch_status_label.config(text=text))
+
+        # 以開始監看當下的轉換與匯入設定處理之後的每個檔案
+        self.folder_watcher = watcher.FolderWatcher(folder, self.file_keyword.get(), submit_batch,
+                                                    include_existing=self.watch_include_existing.get(), on_status=on_status)
+        self.folder_watcher.start()
+        self.watch_button.config(text="停止監看資料夾")
+        self.watch_retry_button.config(state="normal")
+        self.watch_status_label.config(text="監看中：等待新檔案...")
+        self.log_action(f"開始監看資料夾 '{folder}'，新檔案將匯入資料表 '{target_table}'。")
+
+    def stop_folder_watch(self):
+        self.folder_watcher.stop()
+        self.log_action(f"停止監看資料夾 '{self.folder_watcher.folder}'：共送出 {self.folder_watcher.files_submitted} 個檔案。")
+        self.folder_watcher = None
+        self.watch_button.config(text="開始監看資料夾")
+        self.watch_retry_button.config(state="disabled")
+        self.watch_status_label.config(text="")
+
+    def retry_watch_failures(self):
+        if self.folder_watcher is None: return
+        count = len(self.folder_watcher.failed)
+        if not count:
+            messagebox.showinfo("提示", "目前沒有匯入失敗的檔案。")
+            return
+        if not messagebox.askyesno("確認", f"有 {count} 個檔案所屬的批次匯入失敗，同一批前面的檔案可能已寫入資料表。\n"
+                                         "使用附加模式時重試可能造成重複資料，確定要重試嗎？"):
+            return
+        self.folder_watcher.retry_failed()
+        self.log_action(f"重試監看資料夾中 {count} 個匯入失敗的檔案。")
 
     def init_action_log_tab(self):
         action_log_frame = ttk.LabelFrame(self.tab5, text="資料庫操作日誌", padding="10")
@@ -620,6 +1132,229 @@ class MainApplication(tk.Frame):
             self.action_log_text.insert(tk.END, log_entry)
             self.action_log_text.see(tk.END)
 
+    # ======================================================================
+    # 頁籤六：工作佇列 (Jobs Tab)
+    # ======================================================================
+    def init_jobs_tab(self):
+        main_frame = ttk.Frame(self.tab6, padding="10")
+        main_frame.pack(expand=True, fill="both")
+
+        queue_frame = ttk.LabelFrame(main_frame, text=f"目前的工作 (最多同時執行 {self.job_queue.workers} 個)", padding="10")
+        queue_frame.pack(expand=True, fill="both", pady=(0, 5))
+        columns = ("id", "kind", "target", "description", "status", "progress", "rows", "speed", "seconds")
+        self.jobs_tree = ttk.Treeview(queue_frame, columns=columns, show="headings", height=8, style="Custom.Treeview")
+        for col, heading, width in zip(columns, ("#", "類型", "目標資料表", "來源", "狀態", "進度", "筆數", "筆/秒", "耗時 (秒)"),
+                                       (40, 90, 160, 220, 70, 260, 80, 80, 70)):
+            self.jobs_tree.heading(col, text=heading)
+            self.jobs_tree.column(col, width=width, anchor="w")
+        self.jobs_tree.pack(expand=True, fill="both")
+        button_frame = ttk.Frame(queue_frame)
+        button_frame.pack(fill="x", pady=(5, 0))
+        ttk.Button(button_frame, text="取消所選工作", command=self.cancel_selected_jobs, bootstyle="danger").pack(side="left")
+        ttk.Button(button_frame, text="清除已結束的工作", command=self.clear_finished_jobs).pack(side="left", padx=5)
+
+        history_frame = ttk.LabelFrame(main_frame, text="工作歷史", padding="10")
+        history_frame.pack(expand=True, fill="both")
+        columns = ("finished_at", "kind", "target", "status", "seconds", "rows", "speed", "error")
+        self.job_history_tree = ttk.Treeview(history_frame, columns=columns, show="headings", height=8, style="Custom.Treeview")
+        for col, heading, width in zip(columns, ("結束時間", "類型", "目標資料表", "狀態", "耗時 (秒)", "筆數", "筆/秒", "錯誤"),
+                                       (140, 90, 160, 70, 70, 80, 80, 300)):
+            self.job_history_tree.heading(col, text=heading)
+            self.job_history_tree.column(col, width=width, anchor="w")
+        self.job_history_tree.pack(expand=True, fill="both")
+        ttk.Button(history_frame, text="重新整理", command=self.refresh_job_history).pack(anchor="w", pady=(5, 0))
+        self.refresh_job_history()
+
+    def refresh_job_view(self):
+        try:
+            shown = set(self.jobs_tree.get_children())
+            for job in self.job_queue.snapshot():
+                progress = job.text
+                if job.status == 'running' and job.total:
+                    progress = f"{job.done / job.total:.0%} {job.text}"
+                elif job.error:
+                    progress = job.error
+                values = (job.id, jobs.KIND_LABELS[job.kind], job.target, job.description, jobs.STATUS_LABELS[job.status], progress,
+                          job.rows if job.rows is not None else "", f"{job.rows_per_sec:,.0f}" if job.rows_per_sec else "",
+                          f"{job.seconds:.1f}" if job.seconds is not None else "")
+                item = str(job.id)
+                if item in shown:
+                    self.jobs_tree.item(item, values=values)
+                    shown.discard(item)
+                else:
+                    self.jobs_tree.insert("", tk.END, iid=item, values=values)
+            if shown:
+                self.jobs_tree.delete(*shown)
+        except Exception as e:
+            logging.error(f"更新工作佇列畫面時發生錯誤: {e}", exc_info=True)
+        finally:
+            self.root.after(500, self.refresh_job_view)
+
+    def refresh_job_history(self):
+        self.job_history_tree.delete(*self.job_history_tree.get_children())
+        try:
+            records = self.job_history.recent()
+        except sqlite3.Error as e:
+            logging.error(f"讀取工作歷史失敗: {e}")
+            return
+        for record in records:
+            self.job_history_tree.insert("", tk.END, values=(
+                (record['finished_at'] or "").replace('T', ' '), jobs.KIND_LABELS.get(record['kind'], record['kind']), record['target'],
+                jobs.STATUS_LABELS.get(record['status'], record['status']), f"{record['seconds']:.1f}" if record['seconds'] is not None else "",
+                record['rows'] if record['rows'] is not None else "", f"{record['rows_per_sec']:,.0f}" if record['rows_per_sec'] else "",
+                record['error'] or ""))
+
+    def cancel_selected_jobs(self):
+        selected = self.jobs_tree.selection()
+        if not selected:
+            messagebox.showinfo("提示", "請先選擇要取消的工作。")
+            return
+        for item in selected:
+            self.job_queue.cancel(int(item))
+
+    def clear_finished_jobs(self):
+        self.job_queue.clear_finished()
+
+    def _on_job_finished(self, job):
+        # 在工作執行緒中呼叫
+        if job.status == 'done':
+            self._record_run_metrics(job.result['metrics'])
+            self.log_action(f"工作 #{job.id} ({jobs.KIND_LABELS[job.kind]}) 完成：{job.rows} 筆資料寫入 '{job.target}'。")
+            if job.result.get('rejected'):
+                self.log_action(f"工作 #{job.id} 有 {job.result['rejected']} 筆資料未通過驗證，拒絕檔: {job.result['reject_file']}")
+            if job.result.get('dead_letter_rows'):
+                self.log_action(f"工作 #{job.id} 有 {job.result['dead_letter_rows']} 筆資料被 MySQL 拒絕，死信檔: {job.result['dead_letter_file']}")
+            if job.kind == 'mysql_copy':
+                self.root.after(0, self.refresh_mysql_tables)
+        else:
+            self.log_action(f"工作 #{job.id} ({jobs.KIND_LABELS[job.kind]} -> '{job.target}') {jobs.STATUS_LABELS[job.status]}: {job.error}")
+        self.root.after(0, self.refresh_job_history)
+
+    def init_console_tab(self):
+        self.console_query = None
+        self.console_queue = queue.Queue()
+        self.console_text_values = None
+        main_frame = ttk.Frame(self.tab7, padding="10")
+        main_frame.pack(expand=True, fill="both")
+
+        ttk.Label(main_frame, text="SQL (一次一個語句，Ctrl+Enter 執行):").pack(anchor="w")
+        self.console_sql_text = scrolledtext.ScrolledText(main_frame, height=8, wrap=tk.WORD, font=("Courier New", 10))
+        self.console_sql_text.pack(fill="x")
+        self.console_sql_text.bind('<Control-Return>', lambda event: self.run_console_query() or "break")
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill="x", pady=5)
+        self.console_run_buttons = [
+            ttk.Button(button_frame, text="執行", command=self.run_console_query, style="Accent.TButton"),
+            ttk.Button(button_frame, text="EXPLAIN", command=lambda: self.run_console_query(explain=True)),
+            ttk.Button(button_frame, text="EXPLAIN ANALYZE", command=lambda: self.run_console_query(explain=True, analyze=True)),
+        ]
+        for button in self.console_run_buttons:
+            button.pack(side="left", padx=(0, 5))
+        self.console_cancel_button = ttk.Button(button_frame, text="取消查詢 (KILL QUERY)", command=self.cancel_console_query,
+                                                bootstyle="danger", state=tk.DISABLED)
+        self.console_cancel_button.pack(side="left")
+        self.console_status_label = ttk.Label(main_frame, text="", foreground="gray")
+        self.console_status_label.pack(fill="x")
+
+        result_frame = ttk.LabelFrame(main_frame, text=f"結果 (最多顯示 {console.CONSOLE_MAX_ROWS:,} 筆)", padding="5")
+        result_frame.pack(expand=True, fill="both", pady=(5, 0))
+        self.console_tree = ttk.Treeview(result_frame, show="headings", style="Custom.Treeview")
+        vsb = ttk.Scrollbar(result_frame, orient="vertical", command=self.console_tree.yview)
+        hsb = ttk.Scrollbar(result_frame, orient="horizontal", command=self.console_tree.xview)
+        self.console_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        vsb.pack(side="right", fill="y")
+        hsb.pack(side="bottom", fill="x")
+        self.console_tree.pack(expand=True, fill="both")
+        # EXPLAIN ANALYZE 與 FORMAT=TREE 的結果是多行文字，另外顯示
+        self.console_plan_text = scrolledtext.ScrolledText(main_frame, height=10, wrap=tk.NONE, font=("Courier New", 9))
+        self.root.after(100, self.process_console_queue)
+
+    def run_console_query(self, explain=False, analyze=False):
+        if self.console_query is not None: return
+        sql = self.console_sql_text.get("1.0", tk.END).strip()
+        if not sql:
+            messagebox.showinfo("提示", "請輸入要執行的 SQL。")
+            return
+        if explain:
+            sql = console.explain_sql(sql.rstrip(';'), analyze)
+        self.console_tree.delete(*self.console_tree.get_children())
+        self.console_tree["columns"] = ()
+        self.console_plan_text.pack_forget()
+        self.console_status_label.config(text="執行中...")
+        for button in self.console_run_buttons:
+            button.config(state=tk.DISABLED)
+        self.console_cancel_button.config(state=tk.NORMAL)
+        self.console_query = console.ConsoleQuery(
+            self.db_pool, sql,
+            on_columns=lambda columns: self.console_queue.put(('columns', columns)),
+            on_rows=lambda rows: self.console_queue.put(('rows', rows)))
+        threading.Thread(target=self._run_console_query, args=(self.console_query,), daemon=True).start()
+
+    def _run_console_query(self, query):
+        try:
+            self.console_queue.put(('done', query.run()))
+        except engine.OperationCancelled as e:
+            self.console_queue.put(('cancelled', str(e)))
+        except Exception as e:
+            logging.error(f"SQL 主控台查詢失敗: {e}")
+            self.console_queue.put(('error', str(e)))
+
+    def cancel_console_query(self):
+        if self.console_query is None: return
+        self.console_status_label.config(text="正在中止查詢...")
+        threading.Thread(target=self.console_query.cancel, daemon=True).start()
+
+    def process_console_queue(self):
+        try:
+            while True:
+                kind, payload = self.console_queue.get_nowait()
+                if kind == 'columns':
+                    self.console_tree["columns"] = [str(i) for i in range(len(payload))]
+                    for i, col in enumerate(payload):
+                        self.console_tree.heading(str(i), text=col)
+                        self.console_tree.column(str(i), width=max(80, len(str(col)) * 12 + 20), minwidth=50, stretch=tk.NO)
+                    self.console_text_values = [] if len(payload) == 1 else None
+                elif kind == 'rows':
+                    for row in payload:
+                        self.console_tree.insert("", tk.END, values=["" if v is None else str(v) for v in row])
+                    if self.console_text_values is not None:
+                        self.console_text_values.extend(str(row[0]) for row in payload)
+                    self.console_status_label.config(text=f"正在取回結果... {len(self.console_tree.get_children()):,} 筆")
+                else:
+                    self._finish_console_query(kind, payload)
+        except queue.Empty:
+            pass
+        except Exception as e:
+            logging.error(f"更新 SQL 主控台結果時發生錯誤: {e}", exc_info=True)
+        finally:
+            self.root.after(100, self.process_console_queue)
+
+    def _finish_console_query(self, kind, payload):
+        self.console_query = None
+        for button in self.console_run_buttons:
+            button.config(state=tk.NORMAL)
+        self.console_cancel_button.config(state=tk.DISABLED)
+        if kind == 'error':
+            self.console_status_label.config(text=f"錯誤: {payload}")
+            messagebox.showerror("SQL 錯誤", payload)
+            return
+        if kind == 'cancelled':
+            self.console_status_label.config(text=payload)
+            return
+        timing = f"執行 {payload['execute_seconds']:.3f} 秒"
+        if payload['columns'] is None:
+            self.console_status_label.config(text=f"完成：影響 {payload['affected']} 筆，{timing}。")
+            self.log_action(f"SQL 主控台：影響 {payload['affected']} 筆")
+            return
+        note = " (已達顯示上限，其餘結果未讀取)" if payload['truncated'] else ""
+        self.console_status_label.config(text=f"完成：{payload['rows']:,} 筆{note}，{timing}，取回 {payload['fetch_seconds']:.3f} 秒。")
+        values = self.console_text_values
+        if values and any('\n' in value for value in values[:5]):
+            # 單欄的多行文字結果 (例如 EXPLAIN ANALYZE) 改以文字方塊顯示
+            self.console_plan_text.delete("1.0", tk.END)
+            self.console_plan_text.insert("1.0", "\n\n".join(values))
+            self.console_plan_text.pack(fill="both", expand=True, pady=(5, 0))
+
     # ======================================================================
     # 既有功能頁籤
     # ======================================================================
@@ -648,8 +1383,10 @@ class MainApplication(tk.Frame):
         ttk.Label(mysql_frame, text="設定新資料表名稱:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.mysql_table_name = tk.StringVar()
         ttk.Entry(mysql_frame, textvariable=self.mysql_table_name, width=60).grid(row=0, column=1, padx=5, pady=5)
+        self._build_profile_selector(main_frame).pack(fill=tk.X, pady=5)
         self.convert_button = ttk.Button(main_frame, text="開始複製", command=self.start_conversion_thread)
-        self.convert_button.pack(pady=10, ipady=4, fill='x')
+        self.convert_button.pack(pady=(10, 0), ipady=4, fill='x')
+        ttk.Button(main_frame, text="加入工作佇列", command=self.enqueue_copy_job).pack(pady=(5, 10), fill='x')
         progress_frame = ttk.Frame(main_frame)
         progress_frame.pack(fill=tk.X, pady=5)
         self.progress_var = tk.DoubleVar()
@@ -658,6 +1395,12 @@ class MainApplication(tk.Frame):
         self.copier_status_label = ttk.Label(main_frame, text="請先選擇 SQLite 資料庫檔案", bootstyle="info")
         self.copier_status_label.pack(pady=5)
 
+    def _update_copier_progress(self, done, total, text):
+        self.progressbar['maximum'] = max(total, 1)
+        self.progress_var.set(done)
+        self.copier_status_label.config(text=text, bootstyle="info" if done else "warning")
+        self.root.update_idletasks()
+
     def convert_database(self):
         logging.info("="*20 + " 開始新的複製任務 " + "="*20)
         self.progress_var.set(0)
@@ -667,68 +1410,36 @@ class MainApplication(tk.Frame):
         new_mysql_table = self.mysql_table_name.get().strip()
         if not all([sqlite_file, sqlite_table, new_mysql_table]):
             messagebox.showerror("輸入錯誤", "請確認所有欄位都已正確填寫。")
+            self.convert_button.config(state=tk.NORMAL)
             return
-        sqlite_conn = None
-        mysql_conn = None
         try:
-            self.copier_status_label.config(text="正在連接 SQLite...", bootstyle="warning")
-            sqlite_conn = sqlite3.connect(sqlite_file)
-            sqlite_cursor = sqlite_conn.cursor()
-            sqlite_cursor.execute(f"SELECT COUNT(*) FROM `{sqlite_table}`")
-            total_rows = sqlite_cursor.fetchone()[0]
-            self.progressbar['maximum'] = total_rows
-            sqlite_cursor.execute(f"PRAGMA table_info(`{sqlite_table}`)")
-            columns_info = sqlite_cursor.fetchall()
-            if not columns_info: raise ValueError(f"在 SQLite 中找不到資料表 '{sqlite_table}' 或該表沒有欄位。")
-            self.copier_status_label.config(text="正在從連線池取得 MySQL 連線...", bootstyle="warning")
-            mysql_conn = self.db_pool.get_connection()
-            mysql_cursor = mysql_conn.cursor()
-            self.copier_status_label.config(text=f"正在建立資料表 '{new_mysql_table}'...", bootstyle="warning")
-            column_definitions = [f"`{col[1]}` {self.map_sqlite_type_to_mysql(col[2])}" for col in columns_info]
-            create_table_query = f"CREATE TABLE `{new_mysql_table}` ({', '.join(column_definitions)}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-            mysql_cursor.execute(f"DROP TABLE IF EXISTS `{new_mysql_table}`")
-            mysql_cursor.execute(create_table_query)
-            if total_rows > 0:
-                sqlite_cursor.execute(f"SELECT * FROM `{sqlite_table}`")
-                column_names_str = ", ".join([f"`{col[1]}`" for col in columns_info])
-                placeholders = ", ".join(["%s"] * len(columns_info))
-                insert_query = f"INSERT INTO `{new_mysql_table}` ({column_names_str}) VALUES ({placeholders})"
-                CHUNK_SIZE = 500
-                rows_written = 0
-                while True:
-                    chunk = sqlite_cursor.fetchmany(CHUNK_SIZE)
-                    if not chunk: break
-                    mysql_cursor.executemany(insert_query, chunk)
-                    mysql_conn.commit()
-                    rows_written += len(chunk)
-                    self.progress_var.set(rows_written)
-                    status_text = f"正在寫入資料... {rows_written} / {total_rows}"
-                    self.copier_status_label.config(text=status_text, bootstyle="info")
-                    self.root.update_idletasks()
+            result = metrics.run_profiled(PROFILE_OPTIONS[self.profile_mode.get()], 'copy',
+                                          lambda: engine.copy_sqlite_table(self.db_pool, sqlite_file, sqlite_table, new_mysql_table, progress=self._update_copier_progress))
+            self._record_run_metrics(result['metrics'])
             self.copier_status_label.config(text="複製成功！", bootstyle="success")
-            messagebox.showinfo("成功", f"資料表 '{sqlite_table}' 的 {total_rows} 筆資料已成功複製到 '{new_mysql_table}'。")
+            dead_letter_note = ""
+            if result.get('dead_letter_rows'):
+                dead_letter_note = f"\n\n有 {result['dead_letter_rows']} 筆資料被 MySQL 拒絕而未寫入，已存到死信檔:\n{result['dead_letter_file']}"
+                self.log_action(f"複製 '{sqlite_table}' 時有 {result['dead_letter_rows']} 筆資料被 MySQL 拒絕，死信檔: {result['dead_letter_file']}")
+            messagebox.showinfo("成功", f"資料表 '{sqlite_table}' 的 {result['rows']} 筆資料已成功複製到 '{new_mysql_table}'。{dead_letter_note}")
         except Exception as e:
             logging.error(f"任務失敗！錯誤訊息: {e}", exc_info=True)
             self.copier_status_label.config(text="任務失敗！請查看日誌。", bootstyle="danger")
             messagebox.showerror("任務失敗", f"發生錯誤，請切換到「偵錯日誌」頁籤查看詳細資訊。\n\n錯誤摘要: {e}")
         finally:
-            if sqlite_conn: sqlite_conn.close()
-            if mysql_conn and mysql_conn.is_connected():
-                mysql_cursor.close()
-                mysql_conn.close() 
             self.convert_button.config(state=tk.NORMAL)
             self.progress_var.set(0)
             logging.info("="*22 + " 複製任務結束 " + "="*23 + "\n")
 
-    def map_sqlite_type_to_mysql(self, sqlite_type):
-        sqlite_type_upper = sqlite_type.upper()
-        if "INT" in sqlite_type_upper: return "BIGINT"
-        if "CHAR" in sqlite_type_upper or "TEXT" in sqlite_type_upper: return "TEXT"
-        if "REAL" in sqlite_type_upper or "FLOAT" in sqlite_type_upper: return "REAL"
-        if "DOUBLE" in sqlite_type_upper: return "DOUBLE"
-        if "BLOB" in sqlite_type_upper: return "LONGBLOB"
-        if "DATE" in sqlite_type_upper: return "DATETIME"
-        return "VARCHAR(255)"
+    def enqueue_copy_job(self):
+        sqlite_file = self.sqlite_file_path.get()
+        sqlite_table = self.selected_sqlite_table.get()
+        new_mysql_table = self.mysql_table_name.get().strip()
+        if not all([sqlite_file, sqlite_table, new_mysql_table]):
+            messagebox.showerror("輸入錯誤", "請確認所有欄位都已正確填寫。")
+            return
+        job = self.job_queue.submit(jobs.copy_job(self.db_pool, sqlite_file, sqlite_table, new_mysql_table))
+        self.copier_status_label.config(text=f"已加入工作佇列 (工作 #{job.id})，可到「工作佇列」頁籤查看進度。", bootstyle="info")
 
     def start_conversion_thread(self):
         self.convert_button.config(state=tk.DISABLED)
@@ -745,7 +1456,7 @@ class MainApplication(tk.Frame):
         db_path = self.sqlite_file_path.get()
         if not db_path: return
         try:
-            conn = sqlite3.connect(db_path)
+            conn = engine.open_sqlite_readonly(db_path)
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
             tables = [table[0] for table in cursor.fetchall()]
@@ -770,6 +1481,9 @@ class MainApplication(tk.Frame):
         self.total_rows = 0
         self.total_pages = 1
         self.current_table_for_data = None
+        self.data_filters = []
+        self.data_where = (None, [])
+        self.data_order = None
 
         manager_frame = ttk.Frame(self.tab2, padding="10")
         manager_frame.pack(expand=True, fill="both")
@@ -799,6 +1513,7 @@ class MainApplication(tk.Frame):
         ttk.Button(button_frame, text="重新整理", command=self.refresh_mysql_tables).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(button_frame, text="創建新表", command=self.create_table_window).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(button_frame, text="刪除選項", command=self.delete_table).pack(side="left", expand=True, fill="x", padx=2)
+        ttk.Button(left_frame, text="連線設定", command=self.connection_settings_window).pack(fill="x", padx=2)
 
         # --- Right Frame Paned Window ---
         right_pane = ttk.PanedWindow(right_frame, orient=tk.VERTICAL)
@@ -818,6 +1533,41 @@ class MainApplication(tk.Frame):
             self.column_tree.column(col, width=100, anchor='w')
         self.column_tree.pack(expand=True, fill="both")
 
+        # --- Filter / Sort Bar ---
+        filter_bar = ttk.Frame(data_preview_frame)
+        filter_bar.pack(fill="x", pady=(0, 5))
+        search_row = ttk.Frame(filter_bar)
+        search_row.pack(fill="x")
+        ttk.Label(search_row, text="搜尋:").pack(side="left")
+        self.data_search = tk.StringVar()
+        search_entry = ttk.Entry(search_row, textvariable=self.data_search, width=20)
+        search_entry.pack(side="left", padx=(2, 10))
+        search_entry.bind('<Return>', self.apply_data_filter)
+        ttk.Label(search_row, text="排序:").pack(side="left")
+        self.data_sort_column = tk.StringVar()
+        self.data_sort_menu = ttk.Combobox(search_row, textvariable=self.data_sort_column, state="readonly", width=16)
+        self.data_sort_menu.pack(side="left", padx=2)
+        self.data_sort_desc = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_row, text="遞減", variable=self.data_sort_desc).pack(side="left", padx=(2, 10))
+        ttk.Button(search_row, text="套用", command=self.apply_data_filter).pack(side="left", padx=2)
+        ttk.Button(search_row, text="清除", command=self.clear_data_filter).pack(side="left", padx=2)
+
+        condition_row = ttk.Frame(filter_bar)
+        condition_row.pack(fill="x", pady=(5, 0))
+        ttk.Label(condition_row, text="條件:").pack(side="left")
+        self.data_filter_column = tk.StringVar()
+        self.data_filter_column_menu = ttk.Combobox(condition_row, textvariable=self.data_filter_column, state="readonly", width=16)
+        self.data_filter_column_menu.pack(side="left", padx=2)
+        self.data_filter_op = tk.StringVar(value='=')
+        ttk.Combobox(condition_row, textvariable=self.data_filter_op, values=list(table_ops.FILTER_OPERATORS), state="readonly", width=7).pack(side="left", padx=2)
+        self.data_filter_value = tk.StringVar()
+        ttk.Entry(condition_row, textvariable=self.data_filter_value, width=16).pack(side="left", padx=2)
+        ttk.Button(condition_row, text="加入條件", command=self.add_data_filter).pack(side="left", padx=2)
+        self.data_filter_label = ttk.Label(condition_row, text="", foreground="gray")
+        self.data_filter_label.pack(side="left", padx=5)
+        self.data_plan_label = ttk.Label(filter_bar, text="", foreground="#d35400", wraplength=700)
+        self.data_plan_label.pack(anchor="w")
+
         # --- Data Preview ---
         self.data_tree = ttk.Treeview(data_preview_frame, show="headings", style="Custom.Treeview")
         data_vsb = ttk.Scrollbar(data_preview_frame, orient="vertical", command=self.data_tree.yview)
@@ -847,8 +1597,72 @@ class MainApplication(tk.Frame):
         self.add_button = ttk.Button(pagination_frame, text="新增資料", command=self.add_new_data_window, style="Success.TButton")
         self.add_button.pack(side="left", padx=5)
 
+        self.export_button_main = ttk.Button(pagination_frame, text="匯出資料", command=self.export_data_window)
+        self.export_button_main.pack(side="left", padx=5)
+
+        ttk.Button(pagination_frame, text="複製資料表", command=self.copy_table_window).pack(side="left", padx=5)
+
+        self.delete_matching_button = ttk.Button(pagination_frame, text="刪除符合條件的資料", command=self.delete_matching_data, style="Danger.TButton")
+        self.delete_matching_button.pack(side="left", padx=5)
+
         self.refresh_mysql_tables()
 
+    def connection_settings_window(self):
+        win = tk.Toplevel(self.root)
+        win.title("連線設定")
+        win.geometry("420x300")
+        win.transient(self.root)
+        win.grab_set()
+
+        form = ttk.Frame(win, padding=15)
+        form.pack(fill="both", expand=True)
+        current = self.connection_settings
+
+        pool_frame = ttk.Frame(form)
+        pool_frame.pack(fill="x", pady=4)
+        ttk.Label(pool_frame, text="連線池大小:").pack(side="left")
+        pool_size = tk.IntVar(value=current['pool_size'])
+        ttk.Spinbox(pool_frame, from_=1, to=db.MAX_POOL_SIZE, textvariable=pool_size, width=5).pack(side="left", padx=5)
+
+        use_c_extension = tk.BooleanVar(value=current['use_c_extension'] and mysql.connector.HAVE_CEXT)
+        cext_text = "使用 C 擴充驅動" + ("" if mysql.connector.HAVE_CEXT else " (未安裝)")
+        ttk.Checkbutton(form, text=cext_text, variable=use_c_extension, state="normal" if mysql.connector.HAVE_CEXT else "disabled").pack(anchor="w", pady=2)
+        compress = tk.BooleanVar(value=current['compress'])
+        ttk.Checkbutton(form, text="啟用協定壓縮 (遠端主機建議開啟)", variable=compress).pack(anchor="w", pady=2)
+        prepared = tk.BooleanVar(value=current['prepared_statements'])
+        ttk.Checkbutton(form, text="INSERT 使用伺服器端預備語句", variable=prepared).pack(anchor="w", pady=2)
+        health_check = tk.BooleanVar(value=current['health_check'])
+        ttk.Checkbutton(form, text="取用連線前檢查並自動重連", variable=health_check).pack(anchor="w", pady=2)
+        ttk.Label(form, text=f"目前驅動: {self.db_pool.driver}", bootstyle="secondary").pack(anchor="w", pady=(8, 0))
+
+        def save():
+            # 工作與主控台查詢持有舊連線池；排隊中的工作也會向舊連線池取用連線，結束後才能重建
+            if self.job_queue.active_count() or self.console_query is not None:
+                messagebox.showerror("錯誤", "有工作或主控台查詢正在執行，請等它們結束 (或取消) 後再變更連線設定。", parent=win)
+                return
+            settings = dict(current)
+            settings.update({
+                'pool_size': max(1, min(pool_size.get(), db.MAX_POOL_SIZE)),
+                'use_c_extension': use_c_extension.get(),
+                'compress': compress.get(),
+                'prepared_statements': prepared.get(),
+                'health_check': health_check.get(),
+            })
+            try:
+                new_pool = db.create_pool(self.db_config, settings)
+            except mysql.connector.Error as err:
+                logging.error(f"以新設定建立連線池失敗: {err}")
+                messagebox.showerror("連線池錯誤", f"無法以新設定建立連線池: {err}", parent=win)
+                return
+            old_pool, self.db_pool = self.db_pool, new_pool
+            old_pool.close()
+            self.connection_settings = settings
+            db.save_connection_settings(settings)
+            self.log_action(f"更新連線設定: {settings}")
+            win.destroy()
+
+        ttk.Button(form, text="儲存並重建連線池", command=save, style="Success.TButton").pack(fill="x", pady=(12, 0), ipady=3)
+
     def run_query(self, query, params=None, fetch=None):
         conn = None
         try:
@@ -884,16 +1698,76 @@ class MainApplication(tk.Frame):
         
         # 載入欄位資訊並尋找主鍵
         for i in self.column_tree.get_children(): self.column_tree.delete(i)
-        columns = self.run_query(f"DESCRIBE `{table_name}`", fetch='all')
+        columns = self.run_query(f"DESCRIBE {table_ops.quote_identifier(table_name)}", fetch='all')
         if columns:
             for col in columns:
                 self.column_tree.insert("", "end", values=col)
                 if 'PRI' in col[3]: # col[3] is the Key column
                     self.current_primary_keys.append(col[0]) # col[0] is the Field name
 
-        # 載入資料
+        # 載入資料 (換資料表時清除篩選與排序)
         self.current_table_for_data = table_name
         self.current_page = 1
+        column_names = [col[0] for col in columns] if columns else []
+        self.data_sort_menu['values'] = [""] + column_names
+        self.data_filter_column_menu['values'] = column_names
+        self.data_filter_column.set(column_names[0] if column_names else "")
+        self._reset_data_filter()
+        self.load_table_data()
+
+    def _reset_data_filter(self):
+        self.data_filters = []
+        self.data_search.set("")
+        self.data_sort_column.set("")
+        self.data_sort_desc.set(False)
+        self.data_where = (None, [])
+        self.data_order = None
+        self.data_filter_label.config(text="")
+        self.data_plan_label.config(text="")
+
+    def add_data_filter(self):
+        column = self.data_filter_column.get()
+        if not column: return
+        op = table_ops.FILTER_OPERATORS[self.data_filter_op.get()]
+        self.data_filters.append((column, op, self.data_filter_value.get()))
+        self.data_filter_value.set("")
+        self.apply_data_filter()
+
+    def clear_data_filter(self):
+        self._reset_data_filter()
+        self.current_page = 1
+        self.load_table_data()
+
+    def _sort_by_heading(self, column):
+        # 點欄位標題排序；再點一次同一欄位則切換遞增/遞減
+        if self.data_sort_column.get() == column:
+            self.data_sort_desc.set(not self.data_sort_desc.get())
+        else:
+            self.data_sort_column.set(column)
+            self.data_sort_desc.set(False)
+        self.apply_data_filter()
+
+    def apply_data_filter(self, event=None):
+        if not self.current_table_for_data: return
+        columns = list(self.data_filter_column_menu['values'])
+        try:
+            where_sql, params = table_ops.build_where(columns, self.data_filters, self.data_search.get())
+            order_sql = table_ops.build_order_by(columns, self.data_sort_column.get(), self.data_sort_desc.get())
+        except ValueError as e:
+            messagebox.showerror("篩選條件錯誤", str(e))
+            return
+        self.data_where = (where_sql, params)
+        self.data_order = order_sql
+        labels = {code: label for label, code in table_ops.FILTER_OPERATORS.items()}
+        self.data_filter_label.config(text=" 且 ".join(f"{c} {labels[op]} {v}" if op not in ('isnull', 'notnull') else f"{c} {labels[op]}"
+                                                        for c, op, v in self.data_filters))
+        try:
+            warnings = table_ops.explain_warnings(self.db_pool, self.current_table_for_data, where_sql, params, order_sql, self.rows_per_page)
+        except mysql.connector.Error as e:
+            logging.error(f"EXPLAIN 失敗: {e}")
+            warnings = []
+        self.data_plan_label.config(text=" ".join(warnings))
+        self.current_page = 1
         self.load_table_data()
 
     def load_table_data(self):
@@ -906,15 +1780,17 @@ class MainApplication(tk.Frame):
         for i in self.data_tree.get_children():
             self.data_tree.delete(i)
 
-        # 取得總筆數和總頁數
-        count_result = self.run_query(f"SELECT COUNT(*) FROM `{table_name}`", fetch='one')
+        # 取得總筆數和總頁數 (篩選與排序都在伺服器端執行)
+        where_sql, where_params = self.data_where
+        count_result = self.run_query(f"SELECT COUNT(*) FROM {table_ops.quote_identifier(table_name)}" + (f" WHERE {where_sql}" if where_sql else ""),
+                                      params=where_params, fetch='one')
         self.total_rows = count_result[0] if count_result else 0
         self.total_pages = (self.total_rows + self.rows_per_page - 1) // self.rows_per_page
         if self.total_pages == 0:
             self.total_pages = 1
 
         # 取得欄位名稱
-        columns_info = self.run_query(f"DESCRIBE `{table_name}`", fetch='all')
+        columns_info = self.run_query(f"DESCRIBE {table_ops.quote_identifier(table_name)}", fetch='all')
         if not columns_info:
             self.data_tree["columns"] = []
             return
@@ -925,14 +1801,17 @@ class MainApplication(tk.Frame):
 
         # 取得當前頁面的資料
         offset = (self.current_page - 1) * self.rows_per_page
-        data = self.run_query(f"SELECT * FROM `{table_name}` LIMIT %s OFFSET %s", params=(self.rows_per_page, offset), fetch='all')
+        data = self.run_query(table_ops.select_sql(table_name, where_sql, self.data_order) + " LIMIT %s OFFSET %s",
+                              params=list(where_params) + [self.rows_per_page, offset], fetch='all')
 
         from tkinter import font
         style_font = ttk.Style().lookup("Treview", "font")
         font_obj = font.Font(font=style_font or ("TkDefaultFont", 9))
 
+        sort_column = self.data_sort_column.get()
         for i, col in enumerate(column_names):
-            self.data_tree.heading(col, text=col)
+            arrow = (" ▼" if self.data_sort_desc.get() else " ▲") if col == sort_column else ""
+            self.data_tree.heading(col, text=col + arrow, command=lambda c=col: self._sort_by_heading(c))
             
             # 自動計算欄寬
             header_width = font_obj.measure(col)
@@ -954,7 +1833,8 @@ class MainApplication(tk.Frame):
                 self.data_tree.insert("", "end", values=row)
 
         # 更新分頁狀態
-        self.page_status_label.config(text=f"頁數: {self.current_page} / {self.total_pages} (共 {self.total_rows} 筆)")
+        filtered = " 符合條件" if where_sql else ""
+        self.page_status_label.config(text=f"頁數: {self.current_page} / {self.total_pages} (共 {self.total_rows} 筆{filtered})")
         self.prev_page_button.config(state="normal" if self.current_page > 1 else "disabled")
         self.next_page_button.config(state="normal" if self.current_page < self.total_pages else "disabled")
 
@@ -1012,6 +1892,23 @@ class MainApplication(tk.Frame):
         messagebox.showinfo("操作完成", f"成功刪除 {deleted_count} 筆資料。")
         self.load_table_data() # 重新載入資料
 
+    def delete_matching_data(self):
+        where_sql, params = self.data_where
+        if not self.current_table_for_data or not where_sql:
+            messagebox.showwarning("沒有篩選條件", "請先設定搜尋或篩選條件；此功能只刪除符合條件的資料。")
+            return
+        table_name = self.current_table_for_data
+        if not messagebox.askyesno("確認刪除", f"您確定要永久刪除資料表 '{table_name}' 中符合目前條件的 {self.total_rows} 筆資料嗎？\n此操作無法復原！"):
+            return
+        sql = f"DELETE FROM {table_ops.quote_identifier(table_name)} WHERE {where_sql}"
+        if self.run_query(sql, params=params):
+            self.log_action(f"執行刪除: {sql} | 參數: {params} | 結果: 成功")
+            messagebox.showinfo("操作完成", "已刪除符合條件的資料。")
+        else:
+            self.log_action(f"執行刪除: {sql} | 參數: {params} | 結果: 失敗")
+        self.current_page = 1
+        self.load_table_data()
+
     def add_new_data_window(self):
         if not self.current_table_for_data:
             messagebox.showwarning("無操作對象", "請先選擇一個資料表。")
@@ -1071,6 +1968,170 @@ class MainApplication(tk.Frame):
             self.log_action(f"執行新增: {sql} | 參數: {values} | 結果: 失敗")
             messagebox.showerror("失敗", "新增資料失敗，請檢查日誌。")
 
+    def export_data_window(self):
+        if not self.current_table_for_data:
+            messagebox.showwarning("無操作對象", "請先選擇一個資料表。")
+            return
+
+        table_name = self.current_table_for_data
+        self.export_win = tk.Toplevel(self.root)
+        self.export_win.title(f"匯出資料表 {table_name}")
+        self.export_win.geometry("520x300")
+        self.export_win.transient(self.root)
+
+        form = ttk.Frame(self.export_win, padding=15)
+        form.pack(fill="both", expand=True)
+        form.columnconfigure(1, weight=1)
+
+        ttk.Label(form, text="匯出格式:").grid(row=0, column=0, sticky="w", pady=4)
+        self.export_format = tk.StringVar(value='CSV')
+        format_menu = ttk.Combobox(form, textvariable=self.export_format, values=list(exporter.EXPORT_FORMATS), state="readonly", width=12)
+        format_menu.grid(row=0, column=1, sticky="w", pady=4)
+
+        ttk.Label(form, text="篩選條件 (WHERE):").grid(row=1, column=0, sticky="w", pady=4)
+        self.export_where = tk.StringVar()
+        ttk.Entry(form, textvariable=self.export_where).grid(row=1, column=1, sticky="ew", pady=4)
+        self.export_use_filter = tk.BooleanVar(value=bool(self.data_where[0]))
+        ttk.Checkbutton(form, text="套用目前的篩選", variable=self.export_use_filter,
+                        state="normal" if self.data_where[0] else "disabled").grid(row=1, column=2, padx=(5, 0), pady=4)
+
+        ttk.Label(form, text="每批筆數:").grid(row=2, column=0, sticky="w", pady=4)
+        self.export_batch_size = tk.IntVar(value=exporter.EXPORT_BATCH_SIZE)
+        ttk.Spinbox(form, from_=1000, to=200000, increment=1000, textvariable=self.export_batch_size, width=10).grid(row=2, column=1, sticky="w", pady=4)
+
+        ttk.Label(form, text="輸出檔案:").grid(row=3, column=0, sticky="w", pady=4)
+        self.export_path = tk.StringVar()
+        ttk.Entry(form, textvariable=self.export_path).grid(row=3, column=1, sticky="ew", pady=4)
+        ttk.Button(form, text="瀏覽...", command=self._browse_export_path).grid(row=3, column=2, padx=(5, 0), pady=4)
+
+        self.export_progress_var = tk.DoubleVar()
+        self.export_progressbar = ttk.Progressbar(form, variable=self.export_progress_var, maximum=100)
+        self.export_progressbar.grid(row=4, column=0, columnspan=3, sticky="ew", pady=(10, 2))
+        self.export_status_label = ttk.Label(form, text="")
+        self.export_status_label.grid(row=5, column=0, columnspan=3, sticky="w")
+
+        self.export_button = ttk.Button(form, text="開始匯出", command=self.start_export_thread, style="Success.TButton")
+        self.export_button.grid(row=6, column=0, columnspan=3, sticky="ew", pady=(10, 0), ipady=4)
+
+    def _browse_export_path(self):
+        fmt = exporter.EXPORT_FORMATS[self.export_format.get()]
+        ext = exporter.EXPORT_EXTENSIONS[fmt]
+        path = filedialog.asksaveasfilename(parent=self.export_win, defaultextension=ext,
+                                            initialfile=f"{self.current_table_for_data}{ext}",
+                                            filetypes=[(self.export_format.get(), f"*{ext}")])
+        if path:
+            self.export_path.set(path)
+
+    def start_export_thread(self):
+        dest_path = self.export_path.get().strip()
+        if not dest_path:
+            messagebox.showerror("錯誤", "請選擇輸出檔案。", parent=self.export_win)
+            return
+        self.export_button.config(state=tk.DISABLED)
+        # 手動輸入的 WHERE 與資料預覽的篩選 (參數化) 以 AND 合併
+        clauses = [self.export_where.get().strip()]
+        params = []
+        if self.export_use_filter.get() and self.data_where[0]:
+            clauses.append(self.data_where[0])
+            params = list(self.data_where[1])
+        clauses = [c for c in clauses if c]
+        request = {
+            'table_name': self.current_table_for_data,
+            'dest_path': dest_path,
+            'fmt': exporter.EXPORT_FORMATS[self.export_format.get()],
+            'where_sql': " AND ".join(f"({c})" for c in clauses) or None,
+            'params': params,
+            'batch_size': self.export_batch_size.get(),
+        }
+        thread = threading.Thread(target=self.run_export, args=(request,))
+        thread.start()
+
+    def _update_export_progress(self, done, total, text):
+        if not self.export_win.winfo_exists(): return
+        self.export_progressbar['maximum'] = max(total, 1)
+        self.export_progress_var.set(done)
+        self.export_status_label.config(text=text)
+
+    def run_export(self, request):
+        logging.info("="*20 + " 開始新的匯出任務 " + "="*20)
+        try:
+            result = exporter.export_table(self.db_pool, progress=self._update_export_progress, **request)
+            self._record_run_metrics(result['metrics'])
+            self.log_action(f"匯出資料表 '{request['table_name']}' ({request['where_sql'] or '全部'}) 共 {result['rows']} 筆 -> {result['path']}")
+            if self.export_win.winfo_exists():
+                self.export_status_label.config(text=f"匯出完成！共 {result['rows']} 筆資料。", bootstyle="success")
+            messagebox.showinfo("成功", f"已將 {result['rows']} 筆資料匯出到:\n{result['path']}")
+        except Exception as e:
+            logging.error(f"匯出任務失敗: {e}", exc_info=True)
+            if self.export_win.winfo_exists():
+                self.export_status_label.config(text=f"任務失敗: {e}", bootstyle="danger")
+            messagebox.showerror("匯出失敗", f"任務失敗，請查看日誌。\n\n錯誤: {e}")
+        finally:
+            if self.export_win.winfo_exists():
+                self.export_button.config(state=tk.NORMAL)
+
+    def copy_table_window(self):
+        if not self.current_table_for_data:
+            messagebox.showwarning("無操作對象", "請先選擇一個資料表。")
+            return
+
+        table_name = self.current_table_for_data
+        columns = list(self.data_filter_column_menu['values'])
+        win = tk.Toplevel(self.root)
+        win.title(f"複製資料表 {table_name}")
+        win.geometry("480x460")
+        win.transient(self.root)
+        win.grab_set()
+
+        form = ttk.Frame(win, padding=15)
+        form.pack(fill="both", expand=True)
+        form.columnconfigure(1, weight=1)
+        form.rowconfigure(1, weight=1)
+
+        ttk.Label(form, text="新資料表名稱:").grid(row=0, column=0, sticky="w", pady=4)
+        new_table = tk.StringVar(value=f"{table_name}_copy")
+        ttk.Entry(form, textvariable=new_table).grid(row=0, column=1, columnspan=2, sticky="ew", pady=4)
+
+        ttk.Label(form, text="保留欄位:").grid(row=1, column=0, sticky="nw", pady=4)
+        column_listbox = tk.Listbox(form, selectmode=tk.MULTIPLE, exportselection=False)
+        for col in columns:
+            column_listbox.insert(tk.END, col)
+        column_listbox.select_set(0, tk.END)
+        column_listbox.grid(row=1, column=1, columnspan=2, sticky="nsew", pady=4)
+        ttk.Label(form, text=f"主鍵欄位必須保留: {', '.join(self.current_primary_keys) or '(無主鍵，將以單一語句複製)'}",
+                  foreground="gray").grid(row=2, column=0, columnspan=3, sticky="w")
+
+        ttk.Label(form, text="篩選條件 (WHERE):").grid(row=3, column=0, sticky="w", pady=4)
+        where = tk.StringVar()
+        ttk.Entry(form, textvariable=where).grid(row=3, column=1, sticky="ew", pady=4)
+        use_filter = tk.BooleanVar(value=bool(self.data_where[0]))
+        ttk.Checkbutton(form, text="套用目前的篩選", variable=use_filter,
+                        state="normal" if self.data_where[0] else "disabled").grid(row=3, column=2, padx=(5, 0), pady=4)
+
+        def submit():
+            target = new_table.get().strip()
+            selected = [column_listbox.get(i) for i in column_listbox.curselection()]
+            if not target or not selected:
+                messagebox.showerror("輸入錯誤", "請輸入新資料表名稱並至少選擇一個欄位。", parent=win)
+                return
+            # 與匯出相同：手動輸入的 WHERE 與資料預覽的篩選 (參數化) 以 AND 合併
+            clauses, params = [where.get().strip()], []
+            if use_filter.get() and self.data_where[0]:
+                clauses.append(self.data_where[0])
+                params = list(self.data_where[1])
+            clauses = [c for c in clauses if c]
+            where_sql = " AND ".join(f"({c})" for c in clauses) or None
+            job = self.job_queue.submit(jobs.mysql_copy_job(self.db_pool, table_name, target,
+                                                            columns=None if len(selected) == len(columns) else selected,
+                                                            where_sql=where_sql, params=params))
+            self.log_action(f"伺服器端複製資料表 '{table_name}' -> '{target}' ({where_sql or '全部'}) 已加入工作佇列 (工作 #{job.id})")
+            messagebox.showinfo("已加入工作佇列", f"複製工作 #{job.id} 已加入佇列，可到「工作佇列」頁籤查看進度。", parent=win)
+            win.destroy()
+
+        ttk.Label(form, text="資料以 INSERT ... SELECT 在伺服器端依主鍵範圍分段複製，不經過本機。",
+                  foreground="gray", wraplength=440).grid(row=4, column=0, columnspan=3, sticky="w", pady=(8, 0))
+        ttk.Button(form, text="加入工作佇列", command=submit, style="Success.TButton").grid(row=5, column=0, columnspan=3, sticky="ew", pady=(10, 0), ipady=4)
+
     def delete_table(self):
         selected_item = self.table_tree.focus()
         if not selected_item:
@@ -0,0 +1,123 @@
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import zipfile
+
+# 可直接讀取的資料檔副檔名
+DATA_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+# 單一檔案的壓縮格式 (例如 data.csv.gz)，讀取時邊解壓縮邊解析
+COMPRESSION_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+ARCHIVE_EXTENSION = '.zip'
+# ZIP 內的檔案以「壓縮檔路徑::成員名稱」表示，在檔案清單中就像一般檔案
+MEMBER_SEPARATOR = '::'
+
+
+def split_member(path):
+    """拆成 (壓縮檔或一般檔案路徑, ZIP 成員名稱或 None)。"""
+    if MEMBER_SEPARATOR in path:
+        archive, member = path.split(MEMBER_SEPARATOR, 1)
+        return archive, member
+    return path, None
+
+
+def local_path(path):
+    """實際存在於磁碟上的檔案 (ZIP 成員回傳壓縮檔本身)，供檢查大小與修改時間。"""
+    return split_member(path)[0]
+
+
+def inner_name(path):
+    """去除壓縮副檔名後的資料檔名稱，用來判斷格式，例如 data.csv.gz -> data.csv。"""
+    archive, member = split_member(path)
+    name = (member or archive).lower()
+    root, ext = os.path.splitext(name)
+    return root if ext in COMPRESSION_OPENERS else name
+
+
+def data_kind(path):
+    name = inner_name(path)
+    if name.endswith(EXCEL_EXTENSIONS):
+        return 'excel'
+    if name.endswith('.csv'):
+        return 'csv'
+    return None
+
+
+def is_excel(path):
+    return data_kind(path) == 'excel'
+
+
+def is_csv(path):
+    return data_kind(path) == 'csv'
+
+
+def is_streamed(path):
+    """壓縮檔或 ZIP 成員只能循序讀取：無法記憶體映射，也無法依位元組範圍平行解析。"""
+    archive, member = split_member(path)
+    return member is not None or os.path.splitext(archive.lower())[1] in COMPRESSION_OPENERS
+
+
+def display_name(path):
+    """顯示與「檔案來源」欄位使用的名稱；ZIP 成員包含壓縮檔名稱以便追溯。"""
+    archive, member = split_member(path)
+    return f"{os.path.basename(archive)}{MEMBER_SEPARATOR}{member}" if member else os.path.basename(archive)
+
+
+def open_binary(path):
+    """以二進位串流開啟資料檔；壓縮內容在讀取時才解壓縮，不會先寫到磁碟。"""
+    archive, member = split_member(path)
+    if member is not None:
+        zf = zipfile.ZipFile(archive)
+        try:
+            stream = zf.open(member)
+        except Exception:
+            zf.close()
+            raise
+        # 成員串流關閉時一併關閉壓縮檔
+        close_member = stream.close
+
+        def close():
+            close_member()
+            zf.close()
+        stream.close = close
+        return stream
+    opener = COMPRESSION_OPENERS.get(os.path.splitext(archive.lower())[1], open)
+    return opener(archive, 'rb')
+
+
+def excel_source(path):
+    """pandas 讀取 Excel 需要可隨機存取的來源：一般檔案直接使用路徑，壓縮內容解壓縮到記憶體。"""
+    if not is_streamed(path):
+        return path
+    with open_binary(path) as f:
+        return io.BytesIO(f.read())
+
+
+def zip_members(archive, log_errors=True):
+    """列出 ZIP 中可匯入的資料檔 (略過資料夾與 macOS 的 __MACOSX 附帶檔)。"""
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            names = [info.filename for info in zf.infolist() if not info.is_dir()]
+    except (zipfile.BadZipFile, OSError) as e:
+        if log_errors: logging.warning(f"無法讀取壓縮檔 '{os.path.basename(archive)}': {e}")
+        return []
+    return [name for name in names if not name.startswith('__MACOSX/') and data_kind(name)]
+
+
+def expand_entries(folder, filenames, log_errors=True):
+    """把資料夾中的檔名展開為檔案清單項目：ZIP 依成員展開，壓縮檔與一般資料檔照列。"""
+    entries = []
+    for filename in filenames:
+        if filename.lower().endswith(ARCHIVE_EXTENSION):
+            members = zip_members(os.path.join(folder, filename), log_errors)
+            entries.extend(f"{filename}{MEMBER_SEPARATOR}{member}" for member in members)
+        elif data_kind(filename):
+            entries.append(filename)
+    return entries
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+from mysql.connector import errors as mysql_errors
+
+from engine import OperationCancelled
+
+# 每批從非緩衝游標取回並送到表格的筆數
+CONSOLE_BATCH_ROWS = 500
+# 表格最多顯示的筆數；超過時停止讀取並中止伺服器端的查詢
+CONSOLE_MAX_ROWS = 50_000
+# MySQL 查詢被 KILL QUERY 中斷時的錯誤代碼 (ER_QUERY_INTERRUPTED)
+QUERY_INTERRUPTED_ERRNO = 1317
+
+
+def explain_sql(sql, analyze=False):
+    """為查詢加上 EXPLAIN 或 EXPLAIN ANALYZE (MySQL 8.0.18 以上，會實際執行查詢並回報各步驟耗時)。"""
+    return f"{'EXPLAIN ANALYZE' if analyze else 'EXPLAIN'} {sql}"
+
+
+class ConsoleQuery:
+    """以連線池的連線執行一段 SQL，結果以非緩衝游標分批取回。
+
+    on_columns(欄位名稱) 在取得結果欄位時呼叫一次，on_rows(資料列) 在每批取回後呼叫
+    (都在執行 run 的執行緒中)。執行時間 (execute 到伺服器開始回傳) 與取回時間分開計算。
+    cancel() 以另一條連線送出 KILL QUERY 中止伺服器端的查詢。
+    """
+    def __init__(self, db_pool, sql, on_columns=None, on_rows=None, batch_size=CONSOLE_BATCH_ROWS, max_rows=CONSOLE_MAX_ROWS):
+        self.db_pool = db_pool
+        self.sql = sql.strip().rstrip(';').strip()
+        self.on_columns = on_columns
+        self.on_rows = on_rows
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.connection_id = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        if not self.sql: raise ValueError("請輸入要執行的 SQL。")
+        result = {'columns': None, 'rows': 0, 'affected': None, 'truncated': False,
+                  'execute_seconds': 0.0, 'fetch_seconds': 0.0}
+        conn = self.db_pool.get_connection()
+        cursor = None
+        try:
+            id_cursor = conn.cursor()
+            id_cursor.execute("SELECT CONNECTION_ID()")
+            with self._lock:
+                self.connection_id = id_cursor.fetchone()[0]
+            id_cursor.close()
+            if self.cancelled: raise OperationCancelled("查詢已被使用者取消。")
+
+            cursor = conn.cursor(buffered=False)
+            logging.info(f"SQL 主控台執行 (連線 {self.connection_id}): {self.sql}")
+            start = time.perf_counter()
+            cursor.execute(self.sql)
+            result['execute_seconds'] = time.perf_counter() - start
+
+            if cursor.description is None:
+                # 沒有結果集的語句 (INSERT/UPDATE/DDL...)
+                conn.commit()
+                result['affected'] = cursor.rowcount
+                return result
+
+            result['columns'] = [d[0] for d in cursor.description]
+            if self.on_columns: self.on_columns(result['columns'])
+            while True:
+                start = time.perf_counter()
+                rows = cursor.fetchmany(min(self.batch_size, self.max_rows - result['rows']))
+                result['fetch_seconds'] += time.perf_counter() - start
+                if not rows: break
+                result['rows'] += len(rows)
+                if self.on_rows: self.on_rows(rows)
+                if result['rows'] >= self.max_rows:
+                    result['truncated'] = True
+                    break
+            if result['truncated']:
+                # 其餘結果不再需要：先中止伺服器端的查詢，再丟棄已送達的部分
+                self._kill(quiet=True)
+            return result
+        except mysql_errors.Error as e:
+            if self.cancelled and getattr(e, 'errno', None) == QUERY_INTERRUPTED_ERRNO:
+                raise OperationCancelled("查詢已被使用者取消。")
+            raise
+        finally:
+            with self._lock:
+                self.connection_id = None
+            # 非緩衝游標須讀完剩餘結果，連線才能歸還連線池
+            try:
+                if conn.is_connected() and conn.unread_result:
+                    conn.consume_results()
+            except mysql_errors.Error:
+                pass
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mysql_errors.Error:
+                    pass
+            conn.close()
+
+    def cancel(self):
+        """要求中止查詢；回傳是否已對伺服器送出 KILL QUERY。"""
+        self.cancelled = True
+        return self._kill()
+
+    def _kill(self, quiet=False):
+        with self._lock:
+            connection_id = self.connection_id
+        if connection_id is None:
+            return False
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
+            cursor.close()
+        except mysql_errors.Error as e:
+            # 查詢可能已在送出前結束
+            if not quiet: logging.warning(f"中止查詢 (連線 {connection_id}) 失敗: {e}")
+            return False
+        finally:
+            conn.close()
+        if not quiet: logging.info(f"已對連線 {connection_id} 送出 KILL QUERY。")
+        return True
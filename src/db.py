@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+
+import mysql.connector
+from mysql.connector import errors, pooling
+from mysql.connector.constants import ClientFlag
+
+from metrics import app_file_path
+
+SETTINGS_FILE = 'db_importer_settings.json'
+DEFAULT_CONNECTION_SETTINGS = {
+    'pool_size': 5,
+    # 可用時改用 C 擴充 (_mysql_connector)，解析封包較純 Python 實作快
+    'use_c_extension': True,
+    # 啟用 MySQL 協定壓縮，適合頻寬有限的遠端主機
+    'compress': False,
+    # 重複的 INSERT 改用伺服器端預備語句；注意 executemany 會逐筆執行，大批次寫入通常較慢
+    'prepared_statements': False,
+    # 取出連線時先 ping，失效則自動重連
+    'health_check': True,
+    # 連線池用盡時最多等待的秒數
+    'pool_timeout': 30,
+}
+MAX_POOL_SIZE = 32  # mysql.connector 連線池上限
+
+
+def load_connection_settings(path=None):
+    path = path or app_file_path(SETTINGS_FILE)
+    settings = dict(DEFAULT_CONNECTION_SETTINGS)
+    try:
+        with open(path, encoding='utf-8') as f:
+            settings.update({k: v for k, v in json.load(f).get('connection', {}).items() if k in DEFAULT_CONNECTION_SETTINGS})
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning(f"無法讀取設定檔 '{path}'，將使用預設連線設定: {e}")
+    settings['pool_size'] = max(1, min(int(settings['pool_size']), MAX_POOL_SIZE))
+    return settings
+
+
+def save_connection_settings(settings, path=None):
+    path = path or app_file_path(SETTINGS_FILE)
+    data = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        pass
+    data['connection'] = {k: settings[k] for k in DEFAULT_CONNECTION_SETTINGS}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def build_connection_config(db_config, settings):
+    """依連線設定補上 mysql.connector 的連線參數。"""
+    config = dict(db_config)
+    config['use_pure'] = not (settings['use_c_extension'] and mysql.connector.HAVE_CEXT)
+    config['compress'] = bool(settings['compress'])
+    # 明確關閉 FOUND_ROWS：Upsert 依影響筆數 (新增 1、更新 2、未變更 0) 統計結果
+    config['client_flags'] = list(config.get('client_flags', [])) + [-ClientFlag.FOUND_ROWS]
+    return config
+
+
+class _RetirablePool(pooling.MySQLConnectionPool):
+    """停用 (retired) 後歸還的連線直接關閉，不再放回連線池。"""
+    def __init__(self, *args, **kwargs):
+        self.retired = False
+        super().__init__(*args, **kwargs)
+
+    def add_connection(self, cnx=None):
+        if self.retired and cnx is not None:
+            try:
+                cnx.disconnect()
+            except errors.Error:
+                pass  # 連線已中斷
+            return
+        super().add_connection(cnx)
+
+
+class HealthCheckedPool:
+    """包裝 MySQLConnectionPool：可調整的連線參數、取用時健康檢查、連線池用盡時等待。
+
+    介面與 MySQLConnectionPool 相容 (get_connection)，匯入引擎可直接使用。
+    """
+    def __init__(self, db_config, settings, pool_name="mypool"):
+        self.settings = dict(settings)
+        self.pool_size = self.settings['pool_size']
+        self.prepared_statements = bool(self.settings['prepared_statements'])
+        config = build_connection_config(db_config, self.settings)
+        self.pool = _RetirablePool(pool_name=pool_name, pool_size=self.pool_size, **config)
+        self.closed = False
+        self.driver = "純 Python" if config['use_pure'] else "C 擴充"
+        logging.info(f"連線池設定: 大小={self.pool_size}, 驅動={self.driver}, 壓縮={'開' if config['compress'] else '關'}, "
+                     f"預備語句={'開' if self.prepared_statements else '關'}, 健康檢查={'開' if self.settings['health_check'] else '關'}")
+
+    def get_connection(self):
+        if self.closed:
+            raise errors.PoolError("連線池已關閉 (連線設定已變更)。")
+        deadline = time.monotonic() + self.settings['pool_timeout']
+        while True:
+            try:
+                conn = self.pool.get_connection()
+                break
+            except errors.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)
+        if self.settings['health_check']:
+            try:
+                conn.ping(reconnect=True, attempts=3, delay=1)
+            except errors.Error:
+                conn.close()
+                raise
+        return conn
+
+    def close(self):
+        """停止借出連線：閒置的連線立即關閉，仍借出中的連線在歸還時才關閉，不會中斷正在使用的連線。"""
+        self.closed = True
+        self.pool.retired = True
+        closed = 0
+        while True:
+            try:
+                conn = self.pool.get_connection()
+            except errors.Error:
+                break  # 已沒有閒置的連線
+            conn.close()
+            closed += 1
+        logging.info(f"舊連線池已停用：關閉 {closed} 條閒置連線，其餘借出中的連線歸還時關閉。")
+
+
+def create_pool(db_config, settings=None):
+    return HealthCheckedPool(db_config, settings or load_connection_settings())
+
+
+def insert_cursor(db_pool, conn):
+    """重複 INSERT 使用的游標：連線池啟用預備語句時改用伺服器端預備語句。"""
+    if getattr(db_pool, 'prepared_statements', False):
+        return conn.cursor(prepared=True)
+    return conn.cursor()
@@ -0,0 +1,957 @@
+import collections
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from mysql.connector import errors as mysql_errors
+
+from db import insert_cursor
+from metrics import StageMetrics
+import archives
+from readers import iter_file_raw, read_sheets, select_sheets
+from staging import StagedPipeline
+from transforms import compile_pipeline
+from validation import DEAD_LETTER_ERROR_COLUMN, RejectWriter, check_columns, read_target_schema, validate_frame
+
+# 每次 executemany 寫入的筆數
+IMPORT_CHUNK_SIZE = 1000
+COPY_CHUNK_SIZE = 500
+# SQLite 來源以唯讀方式開啟，並加大記憶體映射與頁面快取
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_CACHE_KIB = 64 * 1024
+# rowid 範圍超過此數才以多條連線平行讀取；每個讀取工作負責一段固定大小的 rowid 區間
+SQLITE_PARALLEL_MIN_ROWS = 200_000
+SQLITE_READ_WORKERS = 4
+SQLITE_RANGE_ROWS = 50_000
+# 估計 rowid 密度時在整個 rowid 範圍中平均抽樣的區間數與每個區間的寬度
+SQLITE_DENSITY_PROBES = 16
+SQLITE_DENSITY_PROBE_WIDTH = 1000
+# rowid 密度 (筆數 / rowid 範圍) 低於此值視為稀疏 (例如時間戳記或雪花 ID 主鍵)：以 COUNT(*) 計算筆數並循序讀取
+SQLITE_MIN_ROWID_DENSITY = 0.5
+# MySQL 伺服器端複製每次 INSERT ... SELECT 涵蓋的來源列數 (依主鍵範圍切分)，每段各自提交以縮短鎖定時間
+MYSQL_COPY_CHUNK_ROWS = 50_000
+# 寫入時被 MySQL 拒絕的列超過此數就中止工作 (None 表示不限)
+DEFAULT_MAX_ERROR_ROWS = 100
+# Upsert 鍵值欄位若原本推斷為 TEXT，改用此型態以便建立唯一索引
+KEY_VARCHAR_TYPE = "VARCHAR(255)"
+# 匯入管線中每個編碼區塊的列數：驗證與轉成 tuple 以此為單位，寫入時再切成 IMPORT_CHUNK_SIZE 筆一批
+PIPELINE_BLOCK_ROWS = 50_000
+# 可互相放寬的數值型態 (由窄到寬)
+_NUMERIC_WIDTH = {'TINYINT(1)': 0, 'BIGINT': 1, 'DOUBLE': 2}
+# 來源的 DataFrame 迭代器已結束 (read_file_raw 可能產出 None)
+_END = object()
+
+
+class OperationCancelled(Exception):
+    """匯入或複製在批次之間被取消 (cancel_event 已設定)。"""
+
+
+def map_pandas_dtype_to_mysql(dtype):
+    dtype_str = str(dtype).lower()
+    if "int" in dtype_str: return "BIGINT"
+    if "float" in dtype_str or "double" in dtype_str: return "DOUBLE"
+    # Arrow 型態 (ArrowDtype) 的日期時間為 timestamp[...] / date32[...]
+    if "datetime" in dtype_str or "timestamp" in dtype_str or "date" in dtype_str: return "DATETIME"
+    if "bool" in dtype_str: return "TINYINT(1)"
+    return "TEXT"
+
+
+def map_sqlite_type_to_mysql(sqlite_type):
+    sqlite_type_upper = sqlite_type.upper()
+    if "INT" in sqlite_type_upper: return "BIGINT"
+    if "CHAR" in sqlite_type_upper or "TEXT" in sqlite_type_upper: return "TEXT"
+    if "REAL" in sqlite_type_upper or "FLOAT" in sqlite_type_upper: return "REAL"
+    if "DOUBLE" in sqlite_type_upper: return "DOUBLE"
+    if "BLOB" in sqlite_type_upper: return "LONGBLOB"
+    if "DATE" in sqlite_type_upper: return "DATETIME"
+    return "VARCHAR(255)"
+
+
+def _frame_to_rows(df):
+    # NaN/NaT/pd.NA 一律轉成 None，MySQL 才會寫入 NULL
+    df = df.astype(object).where(df.notna(), None)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+def _read_source(file_path, options, parallel_workers):
+    """讀取一個來源檔，回傳 [(工作表名稱, DataFrame 的迭代器)]；CSV 與單一工作表模式只有一筆。
+
+    平行解析的大型 CSV 依檔案順序逐一產出各範圍 (見 readers.iter_file_raw)，其他來源只有一個 DataFrame。
+    """
+    sheet_mode = options.get('sheet_mode', 'single')
+    if sheet_mode != 'single' and archives.is_excel(file_path):
+        sheets = select_sheets(file_path, sheet_mode, options.get('sheet_pattern', ''))
+        if not sheets:
+            logging.warning(f"檔案 '{archives.display_name(file_path)}' 沒有符合條件的工作表，將跳過此檔案。")
+            return []
+        return [(sheet_name, [df]) for sheet_name, df in read_sheets(file_path, sheets, workers=parallel_workers, usecols=options.get('usecols'))]
+    # 只解析配方選擇的欄位 (usecols)，未選擇的欄位不會佔用解析時間與記憶體
+    frames = iter_file_raw(file_path, sheet_name=options.get('sheet_name'), encoding=options.get('csv_encoding', 'utf-8'),
+                       parallel_workers=parallel_workers, csv_engine=options.get('csv_engine', 'c'),
+                       delimiter=options.get('csv_delimiter', ','), column_count=options.get('csv_column_count'),
+                       usecols=options.get('usecols'))
+    return [(options.get('sheet_name'), frames)]
+
+
+def _report(progress, done, total, text):
+    if progress: progress(done, total, text)
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise OperationCancelled("工作已被使用者取消。")
+
+
+def _is_row_error(error):
+    # 資料本身造成的錯誤 (型態、長度、重複鍵、不可為空)；連線中斷或語法錯誤仍會中止工作
+    return isinstance(error, (mysql_errors.DataError, mysql_errors.IntegrityError))
+
+
+class _BatchWriter:
+    """以 executemany 寫入批次；批次因資料錯誤失敗時以二分法找出有問題的列。
+
+    有問題的列連同 MySQL 錯誤寫入死信檔，其餘列照常寫入，下一個批次仍使用完整大小。
+    二分過程中每個成功的子批次立即提交，失敗的子批次先回滾再繼續切分，因此逐筆執行的
+    預備語句游標也不會重複寫入。死信列超過 max_error_rows 時中止工作。
+    提供 savepoint_cursor 時整個匯入是同一個交易：不提交，失敗的批次只回滾到批次開始前的 SAVEPOINT。
+    """
+    def __init__(self, conn, cursor, sql, columns, table_name, max_error_rows=DEFAULT_MAX_ERROR_ROWS, savepoint_cursor=None):
+        self.conn = conn
+        self.cursor = cursor
+        self.savepoint_cursor = savepoint_cursor
+        self.sql = sql
+        self.columns = list(columns)
+        self.max_error_rows = max_error_rows
+        self.dead_letter = RejectWriter(table_name, suffix='_dead_letter')
+        self.affected_rows = 0
+
+    def write(self, rows):
+        self._begin()
+        try:
+            self._execute(rows)
+        except Exception as e:
+            if not _is_row_error(e): raise
+            self._undo()
+            logging.warning(f"批次寫入失敗 ({len(rows)} 筆)，正在以二分法找出有問題的資料列: {e}")
+            self._bisect(rows)
+
+    def _begin(self):
+        # 同名的 SAVEPOINT 會取代前一個，二分過程依序執行，只需要一個
+        if self.savepoint_cursor is not None:
+            self.savepoint_cursor.execute("SAVEPOINT batch_write")
+
+    def _keep(self):
+        if self.savepoint_cursor is None:
+            self.conn.commit()
+
+    def _undo(self):
+        if self.savepoint_cursor is None:
+            self.conn.rollback()
+        else:
+            self.savepoint_cursor.execute("ROLLBACK TO SAVEPOINT batch_write")
+
+    def _execute(self, rows):
+        self.cursor.executemany(self.sql, rows)
+        self.affected_rows += max(self.cursor.rowcount, 0)
+
+    def _bisect(self, rows):
+        middle = len(rows) // 2
+        for part in (rows[:middle], rows[middle:]):
+            self._begin()
+            try:
+                self._execute(part)
+                self._keep()
+            except Exception as e:
+                if not _is_row_error(e): raise
+                self._undo()
+                if len(part) == 1:
+                    self._reject(part[0], e)
+                else:
+                    self._bisect(part)
+
+    def _reject(self, row, error):
+        df = pd.DataFrame([row], columns=self.columns)
+        df[DEAD_LETTER_ERROR_COLUMN] = str(error)
+        self.dead_letter.write(df)
+        if self.max_error_rows is not None and self.dead_letter.rows > self.max_error_rows:
+            raise ValueError(f"寫入時被拒絕的資料列超過上限 ({self.max_error_rows} 筆)，工作已中止。"
+                             f"被拒絕的資料列已存到: {self.dead_letter.path}")
+
+
+def _read_and_transform(file_paths, options, pipeline, metrics, cancel_event, counter):
+    """管線的讀取階段：逐一讀取來源檔並套用轉換流程，產生轉換後的 DataFrame (每個檔案或工作表一個，平行解析的 CSV 每個範圍一個)。"""
+    # 大型 CSV 的平行解析程序數：0 表示依 CPU 核心數自動決定，1 表示不平行
+    parallel_workers = options.get('parallel_workers', 1) or None
+    for f_path in file_paths:
+        _check_cancelled(cancel_event)
+        logging.info(f"正在完整讀取檔案: {f_path}")
+        with metrics.stage('read'):
+            sources = _read_source(f_path, options, parallel_workers)
+
+        for sheet_name, frames in sources:
+            # 每個工作表都有自己的頂端說明與標題列；同一檔案的後續範圍沿用第一個範圍的標題
+            pipeline.start_file(archives.display_name(f_path), sheet_name)
+            frames = iter(frames)
+            while True:
+                with metrics.stage('read') as stage:
+                    df = next(frames, _END)
+                    if df is not _END and df is not None: stage.add_rows(len(df))
+                if df is _END:
+                    break
+                if df is None or df.empty:
+                    continue
+                df = pipeline.apply(df, metrics=metrics)
+                if df is None or df.empty:
+                    continue
+                counter['rows_read'] += len(df)
+                yield df
+                _check_cancelled(cancel_event)
+
+
+def import_files(db_pool, file_paths, target_table, options, progress=None, metrics=None, cancel_event=None):
+    """將多個 Excel/CSV 檔案套用轉換後匯入 MySQL 資料表。
+
+    options 為匯入設定字典：讀取設定 (sheet_name, sheet_mode, sheet_pattern, csv_encoding, csv_delimiter,
+    csv_column_count, parallel_workers, csv_engine)、轉換配方 (見 transforms.RECIPE_DEFAULTS) 與寫入設定 (action,
+    key_columns, swap_overwrite, validate_schema, max_error_rows, index_spec)；progress(done, total, text) 用於回報進度。
+    讀取與轉換 (parse)、驗證與編碼 (encode)、寫入 (write) 三個階段以有界佇列串接並同時執行 (見
+    staging.StagedPipeline)：等待 MySQL 時下一個檔案已在解析，各階段的忙碌/閒置時間記錄在指標中。
+    資料表依第一個區塊的欄位型態建立，後續區塊需要較寬的型態時以 ALTER TABLE 放寬。
+    index_spec 只在本次建立資料表時套用 (見 parse_index_spec)：主鍵隨資料表建立，次要索引在資料載入後
+    以單一 ALTER TABLE 建立。
+    cancel_event (threading.Event) 被設定時，會在檔案與批次之間停止並撤回本次的寫入，
+    拋出 OperationCancelled。附加或更新既有資料表時整個匯入是同一個交易，取消或失敗後資料表維持原狀。
+    回傳包含筆數與各階段指標 (StageMetrics) 的結果字典；upsert 模式另含
+    inserted/updated/unchanged 筆數，寫入既有資料表時若有不合格的列另含 rejected/reject_file，
+    寫入時被 MySQL 拒絕的列另含 dead_letter_rows/dead_letter_file，載入後建立了索引時另含
+    indexes_built/index_seconds。
+    """
+    if not file_paths: raise ValueError("找不到任何要處理的檔案。")
+    logging.info(f"找到 {len(file_paths)} 個待處理檔案。")
+
+    metrics = metrics or StageMetrics(f"匯入 '{target_table}'")
+    pipeline = compile_pipeline(options)
+    loader = _TableLoader(db_pool, target_table, options, metrics, progress, cancel_event)
+    staged = StagedPipeline(
+        ('parse', lambda: _read_and_transform(file_paths, options, pipeline, metrics, cancel_event, loader.counter)),
+        [('encode', loader.encode)],
+        ('write', loader.write))
+    try:
+        loader.open()
+        with metrics.concurrent():
+            staged.run()
+        if loader.columns is None: raise ValueError("所有檔案都無法讀取或為空。")
+        result = loader.finish()
+    except Exception as e:
+        loader.abort(e)
+        raise
+    finally:
+        loader.close()
+        metrics.record_pipeline(staged.stats)
+
+    logging.info(f"管線中忙碌時間最長 (限制吞吐量) 的階段: {staged.bottleneck()}")
+    metrics.finish(rows=result['rows'])
+    logging.info("所有資料成功寫入資料庫！")
+    logging.info(metrics.summary())
+    return result
+
+
+class _TableLoader:
+    """匯入管線的編碼與寫入階段。
+
+    open() 在管線開始前取得連線並檢查目標資料表；encode() 在背景執行緒中驗證並把 DataFrame 轉成 tuple 區塊；
+    write() 在呼叫端執行緒中寫入：收到第一個區塊時才依其欄位建立資料表，之後的區塊若需要較寬的型態就放寬欄位。
+    """
+    def __init__(self, db_pool, target_table, options, metrics, progress, cancel_event):
+        self.db_pool = db_pool
+        self.target_table = target_table
+        self.options = options
+        self.metrics = metrics
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.action = options.get('action', 'overwrite')
+        self.key_columns = list(options.get('key_columns') or [])
+        self.swap = self.action == 'overwrite' and options.get('swap_overwrite', False)
+        # 是否先載入影子表，全部寫入後才取代目標表 (open() 依目標表是否存在決定)
+        self.shadow = False
+        # 附加或更新既有資料表時整個匯入是同一個交易，finish() 才提交，取消或失敗時資料表維持原狀
+        self.transactional = False
+        self.load_table = target_table
+        self.counter = {'rows_read': 0}
+        self.conn = None
+        self.cursor = None
+        self.write_cursor = None
+        self.writer = None
+        self.table_exists = False
+        self.created_table = False
+        self.schema = None
+        self.rejects = None
+        self.columns = None
+        # 本次建立的資料表 (新表或影子表) 各欄位目前的 MySQL 型態；寫入既有資料表時為 None
+        self.column_types = None
+        self.key_spec = ((), None, [])
+        self.indexed_columns = set()
+        self.post_load_indexes = []
+        self.rows_before = None
+        self.rows_written = 0
+        self.null_keys = 0
+
+    def open(self):
+        if self.action == 'upsert' and not self.key_columns:
+            raise ValueError("更新或插入 (Upsert) 模式必須選擇至少一個鍵值欄位。")
+        self.conn = self.db_pool.get_connection()
+        self.cursor = self.conn.cursor()
+        self.cursor.execute("SHOW TABLES LIKE %s", (self.target_table,))
+        self.table_exists = bool(self.cursor.fetchone())
+        if self.table_exists and self.action == 'fail':
+            raise ValueError(f"資料表 '{self.target_table}' 已存在，操作已取消。")
+        # 讀取與寫入同時進行，後面的檔案可能還沒解析就失敗或被取消；覆蓋既有資料表時一律先載入影子表，
+        # 不勾選交換時只是不沿用原表的索引，原表在全部寫入前都不會被刪除
+        self.shadow = self.swap or (self.action == 'overwrite' and self.table_exists)
+        if self.shadow:
+            self.load_table = _shadow_table_name(self.target_table)
+        self.transactional = self.table_exists and not self.shadow
+        if self.table_exists and self.action != 'overwrite' and self.options.get('validate_schema', True):
+            # 寫入既有資料表前先依其欄位定義檢查每個區塊，不合格的列改寫入拒絕檔，不會寫到一半才失敗
+            self.schema = read_target_schema(self.cursor, self.target_table)
+            self.rejects = RejectWriter(self.target_table)
+
+    def encode(self, df):
+        """管線的編碼階段：依資料表結構驗證後轉成 tuple，每 PIPELINE_BLOCK_ROWS 列產生一個 (欄位型態, 資料列) 區塊。"""
+        if self.action == 'upsert':
+            missing = [c for c in self.key_columns if c not in df.columns]
+            if missing: raise ValueError(f"鍵值欄位不存在於匯入資料中: {', '.join(missing)}")
+            self.null_keys += int(df[self.key_columns].isna().any(axis=1).sum())
+        if self.schema is not None:
+            check_columns(list(df.columns), self.schema, self.target_table)
+        dtypes = df.dtypes
+        for start in range(0, len(df), PIPELINE_BLOCK_ROWS):
+            block = df.iloc[start:start + PIPELINE_BLOCK_ROWS]
+            if self.schema is not None:
+                with self.metrics.stage('validate', rows=len(block)):
+                    block, rejected = validate_frame(block, self.schema)
+                    self.rejects.write(rejected)
+            with self.metrics.stage('convert', rows=len(block)):
+                rows = _frame_to_rows(block)
+            if rows:
+                yield dtypes, rows
+
+    def write(self, item):
+        dtypes, rows = item
+        _check_cancelled(self.cancel_event)
+        if self.columns is None:
+            with self.metrics.stage('prepare_table'):
+                self._prepare(dtypes)
+        elif self.column_types is not None:
+            self._widen(dtypes)
+        for i in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            _check_cancelled(self.cancel_event)
+            chunk = rows[i:i + IMPORT_CHUNK_SIZE]
+            with self.metrics.stage('insert', rows=len(chunk)):
+                self.writer.write(chunk)
+            if not self.transactional:
+                with self.metrics.stage('commit'):
+                    self.conn.commit()
+            self.rows_written += len(chunk)
+            rows_read = max(self.counter['rows_read'], self.rows_written)
+            _report(self.progress, self.rows_written, rows_read, f"正在寫入資料... {self.rows_written} / 已讀取 {rows_read}")
+
+    def _prepare(self, dtypes):
+        columns = list(dtypes.index)
+        primary_key, surrogate_key, spec_indexes = parse_index_spec(self.options.get('index_spec'), columns)
+        has_index_spec = bool(primary_key or surrogate_key or spec_indexes)
+        cursor = self.cursor
+        table_exists = self.table_exists
+        # 資料載入後才建立的索引：影子表沿用原表的索引，新建的資料表使用索引規格
+        if table_exists and self.swap and not has_index_spec:
+            # 影子表只保留新資料仍具備的欄位所組成的索引
+            self.post_load_indexes = [idx for idx in _read_index_definitions(cursor, self.target_table)
+                                      if all(col in columns for col, _ in idx['columns'])]
+
+        if self.shadow or not table_exists:
+            if has_index_spec:
+                self.post_load_indexes = spec_indexes
+            self.indexed_columns = {col for idx in self.post_load_indexes for col, sub_part in idx['columns'] if not sub_part}
+            self.key_spec = (primary_key, surrogate_key, spec_indexes)
+            self.column_types = {col: map_pandas_dtype_to_mysql(dtype) for col, dtype in dtypes.items()}
+        if self.shadow:
+            cursor.execute(f"DROP TABLE IF EXISTS `{self.load_table}`")
+            cursor.execute(_create_table_sql(self.load_table, dtypes, indexed_columns=self.indexed_columns,
+                                             primary_key=primary_key, surrogate_key=surrogate_key))
+            logging.info(f"以影子資料表 '{self.load_table}' 載入資料，完成後再與 '{self.target_table}' 交換。")
+        elif not table_exists:
+            cursor.execute(_create_table_sql(self.target_table, dtypes, self.key_columns if self.action == 'upsert' else None,
+                                             self.indexed_columns, primary_key, surrogate_key))
+            self.created_table = True
+        else:
+            if has_index_spec:
+                logging.info(f"資料表 '{self.target_table}' 已存在，索引設定只在建立資料表時套用，本次略過。")
+            if self.action == 'upsert':
+                _ensure_unique_key(cursor, self.target_table, self.key_columns)
+
+        columns_sql = ', '.join([f'`{c}`' for c in columns])
+        insert_sql = f"INSERT INTO `{self.load_table}` ({columns_sql}) VALUES ({', '.join(['%s'] * len(columns))})"
+        if self.action == 'upsert':
+            self.rows_before = _count_rows(cursor, self.target_table)
+            # 使用 VALUES() 取得待寫入值，相容 MySQL 5.7 與 8.0
+            insert_sql += " ON DUPLICATE KEY UPDATE " + ', '.join(f"`{c}` = VALUES(`{c}`)" for c in columns if c not in self.key_columns)
+        self.write_cursor = insert_cursor(self.db_pool, self.conn)
+        self.writer = _BatchWriter(self.conn, self.write_cursor, insert_sql, columns, self.target_table,
+                                   self.options.get('max_error_rows', DEFAULT_MAX_ERROR_ROWS),
+                                   savepoint_cursor=cursor if self.transactional else None)
+        self.columns = columns
+
+    def _widen(self, dtypes):
+        """後續區塊的欄位型態比資料表寬時 (例如整數欄位出現小數或文字)，先放寬資料表的欄位。"""
+        changes = {}
+        for col, dtype in dtypes.items():
+            wider = _wider_mysql_type(self.column_types[col], map_pandas_dtype_to_mysql(dtype))
+            if wider != self.column_types[col]:
+                changes[col] = wider
+        if not changes:
+            return
+        primary_key = self.key_spec[0]
+        key_columns = self.key_columns if self.action == 'upsert' else None
+        modifications = [f"MODIFY `{col}` {_column_definition(col, mysql_type, key_columns, self.indexed_columns, primary_key)}"
+                         for col, mysql_type in changes.items()]
+        logging.info(f"資料表 '{self.load_table}' 的欄位需要較寬的型態，正在放寬: "
+                     f"{', '.join(f'{col} {self.column_types[col]} -> {t}' for col, t in changes.items())}")
+        with self.metrics.stage('widen'):
+            self.cursor.execute(f"ALTER TABLE `{self.load_table}` {', '.join(modifications)}")
+        self.column_types.update(changes)
+
+    def finish(self):
+        cursor = self.cursor
+        total_rows = self.rows_written
+        if self.writer.dead_letter.rows:
+            total_rows -= self.writer.dead_letter.rows
+            logging.warning(f"有 {self.writer.dead_letter.rows} 筆資料被 MySQL 拒絕而未寫入，已存到: {self.writer.dead_letter.path}")
+        if self.rejects is not None and self.rejects.rows:
+            logging.warning(f"有 {self.rejects.rows} 筆資料不符合資料表 '{self.target_table}' 的欄位定義，已寫入拒絕檔: {self.rejects.path}")
+        if self.null_keys:
+            logging.warning(f"有 {self.null_keys} 筆資料的鍵值欄位為空，這些資料一律會被新增而不會更新既有資料。")
+
+        index_seconds = None
+        if self.post_load_indexes:
+            _check_cancelled(self.cancel_event)
+            _report(self.progress, total_rows, total_rows, f"資料已寫入，正在建立 {len(self.post_load_indexes)} 個索引...")
+            with self.metrics.stage('build_indexes') as stage:
+                _build_indexes(cursor, self.load_table, self.post_load_indexes)
+            index_seconds = stage.seconds
+            logging.info(f"已為資料表 '{self.load_table}' 建立 {len(self.post_load_indexes)} 個索引，耗時 {index_seconds:.2f} 秒。")
+        if self.shadow:
+            _check_cancelled(self.cancel_event)
+            with self.metrics.stage('swap'):
+                _swap_in_shadow_table(cursor, self.target_table, self.load_table, self.table_exists)
+        elif self.transactional:
+            _check_cancelled(self.cancel_event)
+            with self.metrics.stage('commit'):
+                self.conn.commit()
+
+        result = {'rows': total_rows, 'table': self.target_table, 'metrics': self.metrics}
+        if index_seconds is not None:
+            result.update(indexes_built=len(self.post_load_indexes), index_seconds=index_seconds)
+        if self.rejects is not None and self.rejects.rows:
+            result.update(rejected=self.rejects.rows, reject_file=self.rejects.path)
+        if self.writer.dead_letter.rows:
+            result.update(dead_letter_rows=self.writer.dead_letter.rows, dead_letter_file=self.writer.dead_letter.path)
+        if self.action == 'upsert':
+            # 未設定 FOUND_ROWS 時，ON DUPLICATE KEY UPDATE 的影響筆數為：新增 1、更新 2、內容相同 0
+            inserted = _count_rows(cursor, self.target_table) - self.rows_before
+            updated = max(self.writer.affected_rows - inserted, 0) // 2
+            result.update(inserted=inserted, updated=updated, unchanged=total_rows - inserted - updated)
+            logging.info(f"更新或插入完成：新增 {inserted} 筆、更新 {updated} 筆、未變更 {result['unchanged']} 筆。")
+        return result
+
+    def abort(self, error):
+        if self.cursor is None:
+            return
+        if self.shadow:
+            # 載入失敗只丟棄影子表，線上的資料表完全不受影響
+            try:
+                self.cursor.execute(f"DROP TABLE IF EXISTS `{self.load_table}`")
+                logging.info(f"匯入失敗，已丟棄影子資料表 '{self.load_table}'。")
+            except Exception as drop_error:
+                logging.error(f"丟棄影子資料表 '{self.load_table}' 失敗: {drop_error}")
+        elif self.transactional:
+            # 本次寫入都還沒提交，撤回後既有資料表與匯入前完全相同
+            try:
+                self.conn.rollback()
+                logging.info(f"匯入{'已取消' if isinstance(error, OperationCancelled) else '失敗'}，"
+                             f"已撤回寫入資料表 '{self.target_table}' 的 {self.rows_written} 筆資料。")
+            except Exception as rollback_error:
+                logging.error(f"撤回資料表 '{self.target_table}' 的寫入失敗: {rollback_error}")
+        elif isinstance(error, OperationCancelled):
+            _rollback_cancelled_load(self.conn, self.cursor, self.target_table, self.created_table)
+
+    def close(self):
+        if self.write_cursor is not None: self.write_cursor.close()
+        if self.cursor is not None: self.cursor.close()
+        if self.conn is not None: self.conn.close()
+
+
+def _rollback_cancelled_load(conn, cursor, table_name, created_table):
+    """取消後撤回尚未提交的批次，本次新建的資料表直接刪除。"""
+    try:
+        conn.rollback()
+        if created_table:
+            cursor.execute(f"DROP TABLE IF EXISTS `{table_name}`")
+            logging.info(f"工作已取消，已刪除本次建立的資料表 '{table_name}'。")
+    except Exception as rollback_error:
+        logging.error(f"取消後撤回資料表 '{table_name}' 的寫入失敗: {rollback_error}")
+
+
+def _shadow_table_name(table_name):
+    return f"{table_name[:59]}__new"
+
+
+def _retired_table_name(table_name):
+    return f"{table_name[:59]}__old"
+
+
+def _read_index_definitions(cursor, table_name):
+    """讀取資料表的索引定義 (含主鍵)，回傳 [{'name', 'unique', 'columns': [(欄位, 前綴長度)]}]。"""
+    cursor.execute(
+        "SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+        (table_name,))
+    indexes = {}
+    for index_name, non_unique, column_name, sub_part in cursor.fetchall():
+        index = indexes.setdefault(index_name, {'name': index_name, 'unique': not int(non_unique), 'columns': []})
+        index['columns'].append((column_name, sub_part))
+    return list(indexes.values())
+
+
+def _build_indexes(cursor, table_name, indexes):
+    """以單一 ALTER TABLE 一次建立所有索引，只需重建資料表一次。"""
+    clauses = []
+    for index in indexes:
+        columns = ', '.join(f"`{col}`({sub_part})" if sub_part else f"`{col}`" for col, sub_part in index['columns'])
+        if index['name'] == 'PRIMARY':
+            clauses.append(f"ADD PRIMARY KEY ({columns})")
+        else:
+            clauses.append(f"ADD {'UNIQUE ' if index['unique'] else ''}INDEX `{index['name']}` ({columns})")
+    logging.info(f"正在為資料表 '{table_name}' 建立 {len(clauses)} 個索引...")
+    cursor.execute(f"ALTER TABLE `{table_name}` {', '.join(clauses)}")
+
+
+def parse_index_spec(spec, columns):
+    """檢查匯入設定的索引規格，回傳 (主鍵欄位, 自動遞增代理鍵名稱, 次要索引定義)。
+
+    spec 為 {'primary_key': [欄位], 'surrogate_key': 代理鍵欄位名稱, 'indexes': [{'columns': [欄位], 'unique': bool}]}；
+    主鍵與代理鍵只能擇一。次要索引定義的格式與 _read_index_definitions 相同，可直接交給 _build_indexes。
+    """
+    spec = spec or {}
+    primary_key = list(spec.get('primary_key') or [])
+    surrogate_key = (spec.get('surrogate_key') or '').strip() or None
+    if primary_key and surrogate_key:
+        raise ValueError("主鍵欄位與自動遞增代理鍵只能擇一設定。")
+    if surrogate_key in columns:
+        raise ValueError(f"代理鍵欄位 '{surrogate_key}' 與匯入資料的欄位同名。")
+    indexes, names = [], set()
+    for index in spec.get('indexes') or []:
+        index_columns = list(index['columns'])
+        if not index_columns:
+            continue
+        unique = bool(index.get('unique'))
+        base = (f"{'uk' if unique else 'idx'}_" + '_'.join(index_columns))[:60]
+        name, n = base, 1
+        while name in names:
+            n += 1
+            name = f"{base}_{n}"
+        names.add(name)
+        indexes.append({'name': name, 'unique': unique, 'columns': [(col, None) for col in index_columns]})
+    missing = [col for col in primary_key + [col for idx in indexes for col, _ in idx['columns']] if col not in columns]
+    if missing:
+        raise ValueError(f"索引設定的欄位不存在於匯入資料中: {', '.join(dict.fromkeys(missing))}")
+    return primary_key, surrogate_key, indexes
+
+
+def _swap_in_shadow_table(cursor, target_table, shadow_table, target_exists):
+    """以單一 RENAME TABLE 原子地換上影子表，再刪除舊表。"""
+    if target_exists:
+        retired = _retired_table_name(target_table)
+        cursor.execute(f"DROP TABLE IF EXISTS `{retired}`")
+        cursor.execute(f"RENAME TABLE `{target_table}` TO `{retired}`, `{shadow_table}` TO `{target_table}`")
+        cursor.execute(f"DROP TABLE `{retired}`")
+    else:
+        cursor.execute(f"RENAME TABLE `{shadow_table}` TO `{target_table}`")
+    logging.info(f"已將影子資料表 '{shadow_table}' 交換為 '{target_table}'。")
+
+
+def _column_definition(col, mysql_type, key_columns=None, indexed_columns=(), primary_key=()):
+    # TEXT 欄位無法直接建立索引，鍵值與索引欄位改用 VARCHAR
+    if mysql_type == 'TEXT' and (col in (key_columns or ()) or col in indexed_columns or col in primary_key):
+        mysql_type = KEY_VARCHAR_TYPE
+    return mysql_type + (" NOT NULL" if col in primary_key else "")
+
+
+def _wider_mysql_type(current, needed):
+    """兩種推斷型態都能容納的最窄型態：布林 < 整數 < 浮點數，其餘組合 (例如日期與數字) 一律改為 TEXT。"""
+    if current == needed:
+        return current
+    if current in _NUMERIC_WIDTH and needed in _NUMERIC_WIDTH:
+        return max(current, needed, key=_NUMERIC_WIDTH.get)
+    return 'TEXT'
+
+
+def _create_table_sql(table_name, dtypes, key_columns=None, indexed_columns=(), primary_key=(), surrogate_key=None):
+    definitions = []
+    if surrogate_key:
+        definitions.append(f"`{surrogate_key}` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT")
+    for col, dtype in dtypes.items():
+        definitions.append(f"`{col}` {_column_definition(col, map_pandas_dtype_to_mysql(dtype), key_columns, indexed_columns, primary_key)}")
+    # 主鍵是 InnoDB 的叢集索引，事後加入會重建整個資料表，因此隨資料表一起建立
+    if surrogate_key or primary_key:
+        definitions.append(f"PRIMARY KEY ({', '.join(f'`{c}`' for c in ([surrogate_key] if surrogate_key else primary_key))})")
+    if key_columns:
+        definitions.append(f"UNIQUE KEY `{_unique_key_name(table_name)}` ({', '.join(f'`{c}`' for c in key_columns)})")
+    return f"CREATE TABLE `{table_name}` ({', '.join(definitions)}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
+
+
+def _unique_key_name(table_name):
+    return f"uk_{table_name}"[:64]
+
+
+def _count_rows(cursor, table_name):
+    cursor.execute(f"SELECT COUNT(*) FROM `{table_name}`")
+    return cursor.fetchone()[0]
+
+
+def _ensure_unique_key(cursor, table_name, key_columns):
+    """確認既有資料表有與鍵值欄位完全相同的唯一索引，沒有則補建。"""
+    cursor.execute(
+        "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+        (table_name,))
+    unique_indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        unique_indexes.setdefault(index_name, set()).add(column_name)
+    if set(key_columns) in unique_indexes.values():
+        return
+
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table_name,))
+    column_types = {name: data_type.lower() for name, data_type in cursor.fetchall()}
+    missing = [c for c in key_columns if c not in column_types]
+    if missing: raise ValueError(f"資料表 '{table_name}' 缺少鍵值欄位: {', '.join(missing)}")
+
+    alterations = [f"MODIFY `{c}` {KEY_VARCHAR_TYPE}" for c in key_columns if 'text' in column_types[c] or 'blob' in column_types[c]]
+    alterations.append(f"ADD UNIQUE KEY `{_unique_key_name(table_name)}` ({', '.join(f'`{c}`' for c in key_columns)})")
+    logging.info(f"資料表 '{table_name}' 尚無對應的唯一索引，正在建立: {', '.join(key_columns)}")
+    try:
+        cursor.execute(f"ALTER TABLE `{table_name}` {', '.join(alterations)}")
+    except Exception as e:
+        raise ValueError(f"無法在資料表 '{table_name}' 建立唯一索引 (既有資料的鍵值可能重複): {e}") from e
+
+
+def open_sqlite_readonly(sqlite_file):
+    """以唯讀 URI 開啟 SQLite 檔 (不會建立檔案或取得寫入鎖)，並套用讀取用的 PRAGMA。"""
+    uri = f"file:{urllib.request.pathname2url(os.path.abspath(sqlite_file))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_BYTES}")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+    return conn
+
+
+def _sqlite_rowid_bounds(conn, table_name):
+    """回傳 (最小 rowid, 最大 rowid)，只需讀取 B-tree 的兩端；WITHOUT ROWID 資料表回傳 None。"""
+    try:
+        return conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM `{table_name}`").fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+
+def _sqlite_rowid_density(conn, table_name, low, high):
+    """估計 rowid 範圍中實際有資料的比例：範圍不大時直接計數，否則平均抽樣幾個固定寬度的區間計數。"""
+    span = high - low + 1
+    sql = f"SELECT COUNT(*) FROM `{table_name}` WHERE rowid >= ? AND rowid < ?"
+    if span <= SQLITE_DENSITY_PROBES * SQLITE_DENSITY_PROBE_WIDTH:
+        return conn.execute(sql, (low, high + 1)).fetchone()[0] / span
+    step = (span - SQLITE_DENSITY_PROBE_WIDTH) // (SQLITE_DENSITY_PROBES - 1)
+    found = sum(conn.execute(sql, (start, start + SQLITE_DENSITY_PROBE_WIDTH)).fetchone()[0]
+                for start in range(low, low + step * SQLITE_DENSITY_PROBES, step))
+    return found / (SQLITE_DENSITY_PROBES * SQLITE_DENSITY_PROBE_WIDTH)
+
+
+def _plan_sqlite_read(conn, table_name):
+    """決定 SQLite 資料表的讀取方式，回傳 (估計筆數, rowid 分段或 None)。
+
+    rowid 密集時以抽樣估計筆數 (不必 COUNT(*) 全表)，並回傳 (最小 rowid, 最大 rowid, 每段寬度)，
+    每段寬度依密度調整為約 SQLITE_RANGE_ROWS 筆；rowid 稀疏、資料表太小或沒有 rowid 時以 COUNT(*)
+    計算筆數並回傳 None (循序讀取)，不會因為 rowid 範圍很大而產生大量空的分段。
+    """
+    bounds = _sqlite_rowid_bounds(conn, table_name)
+    if bounds is not None and bounds[0] is None:
+        return 0, None
+    if bounds is not None:
+        low, high = bounds
+        density = _sqlite_rowid_density(conn, table_name, low, high)
+        estimated = round((high - low + 1) * density)
+        if density >= SQLITE_MIN_ROWID_DENSITY and estimated >= SQLITE_PARALLEL_MIN_ROWS:
+            return estimated, (low, high, max(1, int(SQLITE_RANGE_ROWS / density)))
+        if density >= SQLITE_MIN_ROWID_DENSITY:
+            return estimated, None
+        logging.info(f"資料表 '{table_name}' 的 rowid 稀疏 (估計密度 {density:.4f})，改以 COUNT(*) 計算筆數並循序讀取。")
+    return conn.execute(f"SELECT COUNT(*) FROM `{table_name}`").fetchone()[0], None
+
+
+def _iter_sqlite_chunks(sqlite_file, conn, table_name, rowid_ranges, workers=SQLITE_READ_WORKERS):
+    """依原本順序產生最多 COPY_CHUNK_SIZE 筆的資料列批次。
+
+    rowid_ranges 為 _plan_sqlite_read 回傳的 (最小 rowid, 最大 rowid, 每段寬度) 時，切成多段由數條唯讀連線
+    在背景執行緒平行讀取 (最多同時讀取 workers * 2 段)，讀取與寫入 MySQL 因此可以重疊；為 None 時以單一
+    SELECT * 依序讀取。資料列 (含 BLOB 的 bytes) 以 sqlite3 傳回的 tuple 原樣交給 executemany，不再另外轉換。
+    """
+    if rowid_ranges is None or workers <= 1:
+        cursor = conn.execute(f"SELECT * FROM `{table_name}`")
+        while True:
+            chunk = cursor.fetchmany(COPY_CHUNK_SIZE)
+            if not chunk: return
+            yield chunk
+
+    local = threading.local()
+    readers = []
+    readers_lock = threading.Lock()
+
+    def read_range(start, end):
+        if not hasattr(local, 'conn'):
+            local.conn = open_sqlite_readonly(sqlite_file)
+            with readers_lock:
+                readers.append(local.conn)
+        return local.conn.execute(f"SELECT * FROM `{table_name}` WHERE rowid >= ? AND rowid < ? ORDER BY rowid", (start, end)).fetchall()
+
+    low, high, width = rowid_ranges
+    ranges = ((start, min(start + width, high + 1)) for start in range(low, high + 1, width))
+    logging.info(f"以 {workers} 條唯讀連線平行讀取約 {-(-(high - low + 1) // width)} 段 rowid 範圍。")
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sqlite-read')
+    try:
+        pending = collections.deque(executor.submit(read_range, *rowid_range) for rowid_range in itertools.islice(ranges, workers * 2))
+        while pending:
+            rows = pending.popleft().result()
+            for next_range in itertools.islice(ranges, 1):
+                pending.append(executor.submit(read_range, *next_range))
+            for i in range(0, len(rows), COPY_CHUNK_SIZE):
+                yield rows[i:i + COPY_CHUNK_SIZE]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for reader in readers:
+            reader.close()
+
+
+def copy_sqlite_table(db_pool, sqlite_file, sqlite_table, new_mysql_table, progress=None, metrics=None, cancel_event=None,
+                      max_error_rows=DEFAULT_MAX_ERROR_ROWS):
+    """將 SQLite 資料表 (含結構與資料) 複製到 MySQL，目標表若存在會先刪除。
+
+    cancel_event 被設定時會在批次之間停止、刪除未完成的目標表並拋出 OperationCancelled。
+    被 MySQL 拒絕的列寫入死信檔，超過 max_error_rows 筆時中止。
+    """
+    metrics = metrics or StageMetrics(f"複製 '{sqlite_table}' -> '{new_mysql_table}'")
+    sqlite_conn = None
+    mysql_conn = None
+    mysql_cursor = None
+    chunks = None
+    writer = None
+    rows_written = 0
+    try:
+        _report(progress, 0, 0, "正在連接 SQLite...")
+        with metrics.stage('count'):
+            sqlite_conn = open_sqlite_readonly(sqlite_file)
+            columns_info = sqlite_conn.execute(f"PRAGMA table_info(`{sqlite_table}`)").fetchall()
+            if not columns_info: raise ValueError(f"在 SQLite 中找不到資料表 '{sqlite_table}' 或該表沒有欄位。")
+            # rowid 密集時以抽樣估計筆數作為進度的分母，不必先掃描全表 COUNT(*)
+            total_rows, rowid_ranges = _plan_sqlite_read(sqlite_conn, sqlite_table)
+
+        _report(progress, 0, total_rows, "正在從連線池取得 MySQL 連線...")
+        mysql_conn = db_pool.get_connection()
+        mysql_cursor = mysql_conn.cursor()
+
+        _report(progress, 0, total_rows, f"正在建立資料表 '{new_mysql_table}'...")
+        with metrics.stage('prepare_table'):
+            column_definitions = [f"`{col[1]}` {map_sqlite_type_to_mysql(col[2])}" for col in columns_info]
+            create_table_query = f"CREATE TABLE `{new_mysql_table}` ({', '.join(column_definitions)}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
+            mysql_cursor.execute(f"DROP TABLE IF EXISTS `{new_mysql_table}`")
+            mysql_cursor.execute(create_table_query)
+
+        if total_rows > 0:
+            column_names_str = ", ".join([f"`{col[1]}`" for col in columns_info])
+            placeholders = ", ".join(["%s"] * len(columns_info))
+            insert_query = f"INSERT INTO `{new_mysql_table}` ({column_names_str}) VALUES ({placeholders})"
+            mysql_cursor.close()
+            mysql_cursor = insert_cursor(db_pool, mysql_conn)
+            writer = _BatchWriter(mysql_conn, mysql_cursor, insert_query, [col[1] for col in columns_info], new_mysql_table, max_error_rows)
+            chunks = _iter_sqlite_chunks(sqlite_file, sqlite_conn, sqlite_table, rowid_ranges)
+            while True:
+                _check_cancelled(cancel_event)
+                with metrics.stage('read') as stage:
+                    chunk = next(chunks, None)
+                    stage.add_rows(len(chunk or ()))
+                if not chunk: break
+                with metrics.stage('insert', rows=len(chunk)):
+                    writer.write(chunk)
+                with metrics.stage('commit'):
+                    mysql_conn.commit()
+                rows_written += len(chunk)
+                _report(progress, rows_written, max(total_rows, rows_written), f"正在寫入資料... {rows_written} / 約 {total_rows}")
+    except OperationCancelled:
+        if mysql_conn:
+            cleanup_cursor = mysql_conn.cursor()
+            _rollback_cancelled_load(mysql_conn, cleanup_cursor, new_mysql_table, True)
+            cleanup_cursor.close()
+        raise
+    finally:
+        if chunks is not None: chunks.close()
+        if sqlite_conn: sqlite_conn.close()
+        if mysql_conn and mysql_conn.is_connected():
+            mysql_cursor.close()
+            mysql_conn.close()
+
+    # rowid 可能有間隙，實際筆數以寫入的筆數為準
+    result = {'rows': rows_written, 'table': new_mysql_table, 'metrics': metrics}
+    if writer is not None and writer.dead_letter.rows:
+        result.update(rows=rows_written - writer.dead_letter.rows, dead_letter_rows=writer.dead_letter.rows, dead_letter_file=writer.dead_letter.path)
+        logging.warning(f"有 {writer.dead_letter.rows} 筆資料被 MySQL 拒絕而未寫入，已存到: {writer.dead_letter.path}")
+    metrics.finish(rows=result['rows'])
+    logging.info(metrics.summary())
+    return result
+
+
+def _read_copy_columns(cursor, table_name):
+    """回傳 (所有欄位, 可寫入的欄位)；產生欄位 (GENERATED) 由伺服器計算，不能以 INSERT 寫入。"""
+    cursor.execute(
+        "SELECT COLUMN_NAME, EXTRA FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (table_name,))
+    rows = cursor.fetchall()
+    return [name for name, _ in rows], [name for name, extra in rows if 'generated' not in (extra or '').lower()]
+
+
+def _next_key_bound(cursor, table_name, key_columns, lower, chunk_rows):
+    """找出從 lower (不含) 起第 chunk_rows 筆的主鍵值；只走主鍵索引，不讀取資料列內容。剩餘不足一段時回傳 None。"""
+    keys = ', '.join(f"`{c}`" for c in key_columns)
+    sql = f"SELECT {keys} FROM `{table_name}`"
+    params = []
+    if lower is not None:
+        sql += f" WHERE ({keys}) > ({', '.join(['%s'] * len(key_columns))})"
+        params = list(lower)
+    sql += f" ORDER BY {keys} LIMIT 1 OFFSET {int(chunk_rows) - 1}"
+    cursor.execute(sql, params)
+    return cursor.fetchone()
+
+
+def copy_mysql_table(db_pool, source_table, new_table, columns=None, where_sql=None, params=(), progress=None, metrics=None,
+                     cancel_event=None, chunk_rows=MYSQL_COPY_CHUNK_ROWS):
+    """在 MySQL 伺服器端複製資料表：CREATE TABLE ... LIKE 後以 INSERT ... SELECT 搬移資料，資料不經過用戶端。
+
+    columns 為要保留的欄位 (None 表示全部，須包含主鍵欄位)；where_sql/params 為篩選條件 (與匯出相同)。
+    來源有主鍵時依主鍵範圍每 chunk_rows 筆執行一次 INSERT ... SELECT 並提交，避免長時間鎖住大量資料列；
+    沒有主鍵時只能以單一語句複製。目標表已存在時拒絕執行；取消或失敗時刪除本次建立的目標表。
+    """
+    if source_table == new_table: raise ValueError("新資料表名稱不能與來源資料表相同。")
+    metrics = metrics or StageMetrics(f"伺服器端複製 '{source_table}' -> '{new_table}'")
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    created_table = False
+    rows_copied = 0
+    try:
+        _report(progress, 0, 0, f"正在讀取資料表 '{source_table}' 的結構...")
+        with metrics.stage('prepare_table'):
+            all_columns, writable = _read_copy_columns(cursor, source_table)
+            if not all_columns: raise ValueError(f"找不到資料表 '{source_table}'。")
+            cursor.execute("SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (new_table,))
+            if cursor.fetchone()[0]: raise ValueError(f"資料表 '{new_table}' 已存在，請使用其他名稱。")
+            primary = next((index for index in _read_index_definitions(cursor, source_table) if index['name'] == 'PRIMARY'), None)
+            key_columns = [col for col, _ in primary['columns']] if primary else []
+
+            selected = list(columns) if columns else list(all_columns)
+            unknown = [c for c in selected if c not in all_columns]
+            if unknown: raise ValueError(f"資料表 '{source_table}' 沒有這些欄位: {', '.join(unknown)}")
+            # 少了主鍵欄位會改變唯一性，複製結果可能違反主鍵
+            missing_keys = [c for c in key_columns if c not in selected]
+            if missing_keys: raise ValueError(f"欄位子集必須包含主鍵欄位: {', '.join(missing_keys)}")
+            # 產生欄位隨 LIKE 保留定義，由伺服器重新計算
+            insert_columns = [c for c in selected if c in writable]
+            dropped = [c for c in all_columns if c not in selected]
+
+            # 目前的估計筆數 (information_schema)，只作為進度的分母
+            cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (source_table,))
+            total_rows = int(cursor.fetchone()[0] or 0)
+
+            _report(progress, 0, total_rows, f"正在建立資料表 '{new_table}'...")
+            cursor.execute(f"CREATE TABLE `{new_table}` LIKE `{source_table}`")
+            created_table = True
+            if dropped:
+                cursor.execute(f"ALTER TABLE `{new_table}` {', '.join(f'DROP COLUMN `{c}`' for c in dropped)}")
+
+        column_list = ', '.join(f"`{c}`" for c in insert_columns)
+        insert_sql = f"INSERT INTO `{new_table}` ({column_list}) SELECT {column_list} FROM `{source_table}`"
+        params = list(params or [])
+        if not key_columns:
+            logging.warning(f"資料表 '{source_table}' 沒有主鍵，無法分段，將以單一 INSERT ... SELECT 複製。")
+            _check_cancelled(cancel_event)
+            _report(progress, 0, total_rows, "正在伺服器端複製資料 (無主鍵，無法顯示分段進度)...")
+            with metrics.stage('insert') as stage:
+                cursor.execute(insert_sql + (f" WHERE {where_sql}" if where_sql else ""), params)
+                rows_copied = cursor.rowcount
+                stage.add_rows(rows_copied)
+            with metrics.stage('commit'):
+                conn.commit()
+        else:
+            keys = ', '.join(f"`{c}`" for c in key_columns)
+            marks = ', '.join(['%s'] * len(key_columns))
+            lower = None
+            rows_scanned = 0
+            while True:
+                _check_cancelled(cancel_event)
+                with metrics.stage('read'):
+                    upper = _next_key_bound(cursor, source_table, key_columns, lower, chunk_rows)
+                conditions, chunk_params = [], []
+                if lower is not None:
+                    conditions.append(f"({keys}) > ({marks})")
+                    chunk_params.extend(lower)
+                if upper is not None:
+                    conditions.append(f"({keys}) <= ({marks})")
+                    chunk_params.extend(upper)
+                if where_sql:
+                    conditions.append(f"({where_sql})")
+                    chunk_params.extend(params)
+                sql = insert_sql + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+                with metrics.stage('insert') as stage:
+                    cursor.execute(sql, chunk_params)
+                    stage.add_rows(cursor.rowcount)
+                    rows_copied += cursor.rowcount
+                with metrics.stage('commit'):
+                    conn.commit()
+                if upper is None:
+                    break
+                lower = upper
+                rows_scanned += chunk_rows
+                _report(progress, rows_scanned, max(total_rows, rows_scanned),
+                        f"正在伺服器端複製資料... 已掃描 {rows_scanned} / 約 {total_rows}，已複製 {rows_copied} 筆")
+        _report(progress, max(total_rows, 1), max(total_rows, 1), f"複製完成，共 {rows_copied} 筆。")
+    except OperationCancelled:
+        _rollback_cancelled_load(conn, cursor, new_table, created_table)
+        raise
+    except Exception:
+        if created_table:
+            try:
+                conn.rollback()
+                cursor.execute(f"DROP TABLE IF EXISTS `{new_table}`")
+                logging.info(f"複製失敗，已刪除本次建立的資料表 '{new_table}'。")
+            except Exception as cleanup_error:
+                logging.error(f"複製失敗後刪除資料表 '{new_table}' 失敗: {cleanup_error}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    logging.info(f"已在伺服器端將 '{source_table}' 複製到 '{new_table}'，共 {rows_copied} 筆。")
+    metrics.finish(rows=rows_copied)
+    logging.info(metrics.summary())
+    return {'rows': rows_copied, 'table': new_table, 'metrics': metrics}
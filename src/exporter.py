@@ -0,0 +1,203 @@
+import csv
+import datetime
+import decimal
+import logging
+import os
+import sqlite3
+import time
+
+from mysql.connector import FieldFlag, FieldType
+
+from metrics import StageMetrics
+from table_ops import quote_identifier
+
+# 匯出格式 (介面顯示名稱 -> 內部代碼) 與預設副檔名
+EXPORT_FORMATS = {
+    'CSV': 'csv',
+    'Parquet': 'parquet',
+    'SQLite': 'sqlite',
+}
+EXPORT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'sqlite': '.sqlite'}
+# 每批從伺服器取回的筆數；記憶體用量只與此值有關，與資料表大小無關
+EXPORT_BATCH_SIZE = 10000
+
+_INT_TYPES = {'TINY', 'SHORT', 'LONG', 'LONGLONG', 'INT24', 'YEAR', 'BIT'}
+_FLOAT_TYPES = {'FLOAT', 'DOUBLE'}
+_DECIMAL_TYPES = {'DECIMAL', 'NEWDECIMAL'}
+_DATETIME_TYPES = {'DATETIME', 'TIMESTAMP'}
+_DATE_TYPES = {'DATE', 'NEWDATE'}
+_BLOB_TYPES = {'BLOB', 'TINY_BLOB', 'MEDIUM_BLOB', 'LONG_BLOB', 'STRING', 'VAR_STRING', 'VARCHAR'}
+
+
+def _column_kind(description_entry):
+    """依 cursor.description 判斷欄位類別：int/float/decimal/datetime/date/binary/text。"""
+    type_name = FieldType.get_info(description_entry[1])
+    flags = description_entry[7] if len(description_entry) > 7 else 0
+    if type_name in _INT_TYPES: return 'int'
+    if type_name in _FLOAT_TYPES: return 'float'
+    if type_name in _DECIMAL_TYPES: return 'decimal'
+    if type_name in _DATETIME_TYPES: return 'datetime'
+    if type_name in _DATE_TYPES: return 'date'
+    if type_name in _BLOB_TYPES and flags & FieldFlag.BINARY: return 'binary'
+    return 'text'
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str): return value
+    if isinstance(value, (bytes, bytearray)): return bytes(value).decode('utf-8', errors='replace')
+    return str(value)
+
+
+def _to_iso(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime.datetime) else (value.isoformat() if value is not None else None)
+
+
+class _CsvWriter:
+    def __init__(self, path, columns, kinds):
+        # utf-8-sig 讓 Excel 直接開啟時能正確辨識中文
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.converters = [(lambda v: bytes(v).hex() if v is not None else None) if kind == 'binary' else None for kind in kinds]
+
+    def write_batch(self, rows):
+        if any(self.converters):
+            rows = [tuple(conv(v) if conv else v for conv, v in zip(self.converters, row)) for row in rows]
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, columns, kinds):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("匯出 Parquet 需要安裝 pyarrow 套件 (pip install pyarrow)。")
+        self.pa = pa
+        arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'datetime': pa.timestamp('us'),
+                       'date': pa.date32(), 'binary': pa.binary()}
+        self.schema = pa.schema([(col, arrow_types.get(kind, pa.string())) for col, kind in zip(columns, kinds)])
+        # DECIMAL、TIME 等型態以字串保存，避免精度或型態轉換問題
+        self.converters = [_to_text if kind in ('decimal', 'text') else None for kind in kinds]
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, rows):
+        arrays = []
+        for i, (field, conv) in enumerate(zip(self.schema, self.converters)):
+            values = [row[i] for row in rows]
+            if conv: values = [conv(v) for v in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _sqlite_identifier(name):
+    # SQLite 以雙引號括住名稱，名稱中的雙引號加倍跳脫 (與 table_ops.quote_identifier 的反引號相同)
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class _SQLiteWriter:
+    def __init__(self, path, columns, kinds, table_name):
+        sqlite_types = {'int': 'INTEGER', 'float': 'REAL', 'decimal': 'NUMERIC', 'datetime': 'DATETIME',
+                        'date': 'DATE', 'binary': 'BLOB'}
+        self.conn = sqlite3.connect(path)
+        definitions = ", ".join(f'{_sqlite_identifier(col)} {sqlite_types.get(kind, "TEXT")}' for col, kind in zip(columns, kinds))
+        self.conn.execute(f'CREATE TABLE {_sqlite_identifier(table_name)} ({definitions})')
+        self.insert_sql = f'INSERT INTO {_sqlite_identifier(table_name)} VALUES ({", ".join(["?"] * len(columns))})'
+        converters = {'decimal': lambda v: str(v) if isinstance(v, decimal.Decimal) else v,
+                      'datetime': _to_iso, 'date': _to_iso, 'text': _to_text}
+        self.converters = [converters.get(kind) for kind in kinds]
+
+    def write_batch(self, rows):
+        self.conn.executemany(self.insert_sql, (tuple(conv(v) if conv else v for conv, v in zip(self.converters, row)) for row in rows))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def _open_writer(fmt, path, columns, kinds, table_name):
+    if fmt == 'csv': return _CsvWriter(path, columns, kinds)
+    if fmt == 'parquet': return _ParquetWriter(path, columns, kinds)
+    if fmt == 'sqlite': return _SQLiteWriter(path, columns, kinds, table_name)
+    raise ValueError(f"不支援的匯出格式: {fmt}")
+
+
+def _estimate_rows(cursor, table_name, where_sql, params):
+    if where_sql:
+        cursor.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_name)} WHERE {where_sql}", params or ())
+    else:
+        # 未篩選時使用統計資訊估算，避免大表的 COUNT(*) 全表掃描
+        cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table_name,))
+    row = cursor.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def export_table(db_pool, table_name, dest_path, fmt, where_sql=None, params=None, batch_size=EXPORT_BATCH_SIZE, progress=None, metrics=None):
+    """以非緩衝游標分批讀取資料表 (可加 WHERE 條件)，串流寫入 CSV/Parquet/SQLite。
+
+    資料先寫入 dest_path + '.partial'，完成後才更名，失敗時不會留下不完整的檔案。
+    progress(done, total, text) 用於回報進度與傳輸速率。
+    """
+    metrics = metrics or StageMetrics(f"匯出 '{table_name}'")
+    partial_path = dest_path + '.partial'
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    conn = db_pool.get_connection()
+    writer = None
+    rows_done = 0
+    try:
+        count_cursor = conn.cursor()
+        with metrics.stage('count'):
+            total = _estimate_rows(count_cursor, table_name, where_sql, params)
+        count_cursor.close()
+
+        cursor = conn.cursor(buffered=False)
+        sql = f"SELECT * FROM {quote_identifier(table_name)}" + (f" WHERE {where_sql}" if where_sql else "")
+        logging.info(f"開始匯出: {sql} | 參數: {params} -> {dest_path}")
+        with metrics.stage('query'):
+            cursor.execute(sql, params or ())
+        columns = [d[0] for d in cursor.description]
+        kinds = [_column_kind(d) for d in cursor.description]
+        writer = _open_writer(fmt, partial_path, columns, kinds, table_name)
+
+        start = time.perf_counter()
+        while True:
+            with metrics.stage('fetch') as stage:
+                rows = cursor.fetchmany(batch_size)
+                stage.add_rows(len(rows))
+            if not rows: break
+            with metrics.stage('write', rows=len(rows)):
+                writer.write_batch(rows)
+            rows_done += len(rows)
+            elapsed = time.perf_counter() - start
+            rate = rows_done / elapsed if elapsed else 0
+            if progress: progress(rows_done, max(total, rows_done), f"正在匯出... {rows_done} / 約 {max(total, rows_done)} 筆 ({rate:,.0f} 筆/秒)")
+        cursor.close()
+        writer.close()
+        writer = None
+        os.replace(partial_path, dest_path)
+    except Exception:
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        # 非緩衝游標中途失敗時須讀完剩餘結果，連線才能歸還連線池
+        if conn.is_connected() and conn.unread_result:
+            conn.consume_results()
+        raise
+    finally:
+        conn.close()
+
+    metrics.finish(rows=rows_done)
+    logging.info(metrics.summary())
+    return {'rows': rows_done, 'path': dest_path, 'metrics': metrics}
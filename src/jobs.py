@@ -0,0 +1,250 @@
+import collections
+import datetime
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+from metrics import app_file_path
+
+HISTORY_FILE = 'db_importer_jobs.sqlite'
+# 工作歷史視窗預設顯示的筆數
+HISTORY_LIMIT = 200
+KIND_LABELS = {
+    'import': "檔案匯入",
+    'copy': "SQLite 複製",
+    'mysql_copy': "MySQL 資料表複製",
+}
+STATUS_LABELS = {
+    'queued': "排隊中",
+    'running': "執行中",
+    'done': "完成",
+    'failed': "失敗",
+    'cancelled': "已取消",
+}
+FINISHED_STATUSES = ('done', 'failed', 'cancelled')
+
+_job_ids = itertools.count(1)
+
+
+class Job:
+    """佇列中的一個匯入或複製工作。
+
+    run(progress, cancel_event) 執行實際工作並回傳引擎的結果字典；進度、狀態與錯誤都記錄在
+    物件上，介面定時讀取即可，不需要跨執行緒回呼。
+    """
+    def __init__(self, kind, target, description, run):
+        self.id = next(_job_ids)
+        self.kind = kind
+        self.target = target
+        self.description = description
+        self.run = run
+        self.status = 'queued'
+        self.done = 0
+        self.total = 0
+        self.text = ""
+        self.rows = None
+        self.error = None
+        self.result = None
+        self.cancel_event = threading.Event()
+        self.submitted_at = datetime.datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._start = None
+        self._seconds = None
+
+    def progress(self, done, total, text):
+        self.done, self.total, self.text = done, total, text
+
+    @property
+    def seconds(self):
+        if self._seconds is not None:
+            return self._seconds
+        return time.perf_counter() - self._start if self._start is not None else None
+
+    @property
+    def rows_per_sec(self):
+        seconds = self.seconds
+        return self.rows / seconds if self.rows and seconds else None
+
+
+def import_job(db_pool, file_paths, target_table, options, description=None):
+    def run(progress, cancel_event):
+        return engine.import_files(db_pool, file_paths, target_table, options, progress=progress, cancel_event=cancel_event)
+    return Job('import', target_table, description or f"{len(file_paths)} 個檔案", run)
+
+
+def copy_job(db_pool, sqlite_file, sqlite_table, new_mysql_table):
+    def run(progress, cancel_event):
+        return engine.copy_sqlite_table(db_pool, sqlite_file, sqlite_table, new_mysql_table, progress=progress, cancel_event=cancel_event)
+    return Job('copy', new_mysql_table, f"{sqlite_table} ({sqlite_file})", run)
+
+
+def mysql_copy_job(db_pool, source_table, new_table, columns=None, where_sql=None, params=()):
+    def run(progress, cancel_event):
+        return engine.copy_mysql_table(db_pool, source_table, new_table, columns=columns, where_sql=where_sql, params=params,
+                                       progress=progress, cancel_event=cancel_event)
+    return Job('mysql_copy', new_table, f"{source_table}" + (f" WHERE {where_sql}" if where_sql else ""), run)
+
+
+class JobHistory:
+    """以本機 SQLite 檔保存已結束工作的紀錄 (耗時、筆數、速度與錯誤)。"""
+    def __init__(self, path=None):
+        self.path = path or app_file_path(HISTORY_FILE)
+        self.lock = threading.Lock()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_history ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, target TEXT, description TEXT, status TEXT, "
+                    "submitted_at TEXT, started_at TEXT, finished_at TEXT, seconds REAL, rows INTEGER, rows_per_sec REAL, error TEXT)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def record(self, job):
+        def stamp(value):
+            return value.isoformat(timespec='seconds') if value else None
+        rows_per_sec = job.rows_per_sec
+        with self.lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO job_history (kind, target, description, status, submitted_at, started_at, finished_at, "
+                        "seconds, rows, rows_per_sec, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job.kind, job.target, job.description, job.status, stamp(job.submitted_at), stamp(job.started_at),
+                         stamp(job.finished_at), job.seconds, job.rows, round(rows_per_sec, 1) if rows_per_sec else None, job.error))
+            finally:
+                conn.close()
+
+    def recent(self, limit=HISTORY_LIMIT):
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM job_history ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
+def default_workers(db_pool):
+    # 每個工作占用一條連線；保留一條給資料表管理頁籤的查詢
+    return max(1, getattr(db_pool, 'pool_size', 1) - 1)
+
+
+class JobQueue:
+    """以固定大小的執行緒池同時執行多個匯入/複製工作。
+
+    工作數上限預設依連線池大小決定 (見 default_workers)；超過的工作排隊等待。
+    同一個目標資料表的工作依加入順序逐一執行 (例如覆蓋時共用暫存表名稱、監看資料夾的批次寫入同一個資料表)，
+    等待中的工作不佔用執行緒。
+    每個工作結束後寫入 JobHistory，並以工作物件呼叫 on_finish (在工作執行緒中)。
+    """
+    def __init__(self, db_pool, workers=None, history=None, on_finish=None):
+        self.workers = workers or default_workers(db_pool)
+        self.history = history
+        self.on_finish = on_finish
+        self.jobs = []
+        self.lock = threading.Lock()
+        # 目標資料表 (小寫) -> 等待該資料表目前的工作結束的工作；有鍵表示該資料表已有工作交給執行緒池
+        self._waiting = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        logging.info(f"工作佇列已啟動，最多同時執行 {self.workers} 個工作。")
+
+    def submit(self, job):
+        key = job.target.lower()
+        with self.lock:
+            self.jobs.append(job)
+            busy = key in self._waiting
+            self._waiting.setdefault(key, collections.deque())
+            if busy:
+                self._waiting[key].append(job)
+        logging.info(f"工作 #{job.id} ({KIND_LABELS[job.kind]} -> '{job.target}') 已加入佇列。")
+        if busy:
+            job.text = "等待同一資料表的工作完成"
+        else:
+            self.executor.submit(self._run, job)
+        return job
+
+    def _start_next(self, job):
+        # 交出目標資料表，改由下一個等待同一資料表的工作執行
+        key = job.target.lower()
+        with self.lock:
+            waiting = self._waiting[key]
+            next_job = waiting.popleft() if waiting else None
+            if next_job is None:
+                del self._waiting[key]
+        if next_job is None:
+            return
+        next_job.text = ""
+        try:
+            self.executor.submit(self._run, next_job)
+        except RuntimeError:
+            # 佇列已關閉 (shutdown)：其餘等待的工作視為取消
+            next_job.status = 'cancelled'
+            next_job.error = "工作佇列已關閉。"
+            self._start_next(next_job)
+
+    def cancel(self, job_id):
+        """要求取消工作：排隊中的工作不會執行，執行中的工作在下一個批次之間停止並撤回。"""
+        job = next((j for j in self.snapshot() if j.id == job_id), None)
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+        job.cancel_event.set()
+        logging.info(f"已要求取消工作 #{job.id}。")
+        return True
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.jobs)
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = [j for j in self.jobs if j.status not in FINISHED_STATUSES]
+
+    def active_count(self):
+        return sum(1 for j in self.snapshot() if j.status in ('queued', 'running'))
+
+    def _run(self, job):
+        job.started_at = datetime.datetime.now()
+        job._start = time.perf_counter()
+        try:
+            if job.cancel_event.is_set():
+                raise engine.OperationCancelled("工作在開始前已被取消。")
+            job.status = 'running'
+            logging.info(f"工作 #{job.id} 開始執行。")
+            job.result = job.run(job.progress, job.cancel_event)
+            job.rows = job.result['rows']
+            job.status = 'done'
+        except engine.OperationCancelled as e:
+            job.status = 'cancelled'
+            job.error = str(e)
+            logging.info(f"工作 #{job.id} 已取消。")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logging.error(f"工作 #{job.id} 失敗: {e}", exc_info=True)
+        finally:
+            job._seconds = time.perf_counter() - job._start
+            job.finished_at = datetime.datetime.now()
+            self._start_next(job)
+        if self.history is not None:
+            try:
+                self.history.record(job)
+            except sqlite3.Error as e:
+                logging.error(f"寫入工作歷史失敗: {e}")
+        if self.on_finish:
+            self.on_finish(job)
+
+    def shutdown(self):
+        """取消所有未結束的工作並等待執行中的工作停止。"""
+        for job in self.snapshot():
+            job.cancel_event.set()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,290 @@
+import cProfile
+import datetime
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# 與 db_importer_debug.log 相同的專案根目錄
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_FILE = 'db_importer_metrics.json'
+# 指標檔只保留最近的 N 次執行紀錄
+METRICS_HISTORY = 50
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+
+def app_file_path(filename):
+    return os.path.join(APP_DIR, filename)
+
+
+def current_rss_bytes():
+    """目前程序的常駐記憶體 (RSS)；無法取得時回傳 None。"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', encoding='ascii') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return None
+    if sys.platform == 'win32':
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize if counters else None
+    return None
+
+
+def peak_rss_bytes():
+    """目前程序的峰值常駐記憶體；無法取得時回傳 None。"""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', None) or info.rss
+    except ImportError:
+        pass
+    if sys.platform == 'win32':
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def _windows_memory_counters():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+def _mb(num_bytes):
+    return round(num_bytes / 1024 / 1024, 1)
+
+
+class StageRecord:
+    def __init__(self, lock):
+        self.seconds = 0.0
+        self.rows = None
+        # 與其他階段同時執行過的階段無法單獨量測記憶體變化，記為 None
+        self.mem_delta_bytes = 0
+        self.calls = 0
+        self._lock = lock
+
+    def add_rows(self, rows):
+        with self._lock:
+            self.rows = (self.rows or 0) + rows
+
+
+class StageMetrics:
+    """依名稱累計各階段的耗時、處理筆數與記憶體變化。
+
+    同一個階段可多次進入 (例如每個檔案各讀一次)，數值會累加；可由多個執行緒同時記錄。
+    記憶體變化是整個程序的 RSS 差值，只在 concurrent() 之外 (沒有其他階段同時執行) 才記錄。
+    """
+    def __init__(self, label):
+        self.label = label
+        self.stages = {}
+        self.started_at = datetime.datetime.now()
+        self.start = time.perf_counter()
+        self.total_seconds = None
+        self.rows = None
+        # 重疊執行的管線各階段的忙碌/閒置時間 (staging.StageStats)
+        self.pipeline = []
+        self._lock = threading.Lock()
+        self._concurrent = 0
+
+    @contextmanager
+    def concurrent(self):
+        """標示多個階段在不同執行緒中同時執行的區間；期間進入的階段不記錄記憶體變化。"""
+        with self._lock:
+            self._concurrent += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._concurrent -= 1
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        with self._lock:
+            record = self.stages.setdefault(name, StageRecord(self._lock))
+            concurrent = self._concurrent > 0
+        rss_before = None if concurrent else current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = None if concurrent else current_rss_bytes()
+            with self._lock:
+                record.seconds += seconds
+                record.calls += 1
+                if rows is not None:
+                    record.rows = (record.rows or 0) + rows
+                if concurrent:
+                    record.mem_delta_bytes = None
+                elif rss_before is not None and rss_after is not None and record.mem_delta_bytes is not None:
+                    record.mem_delta_bytes += rss_after - rss_before
+
+    def record_pipeline(self, stats):
+        self.pipeline = list(stats)
+
+    def finish(self, rows=None):
+        self.total_seconds = time.perf_counter() - self.start
+        self.rows = rows
+        return self
+
+    @property
+    def stage_times(self):
+        return {name: record.seconds for name, record in self.stages.items()}
+
+    def as_dict(self):
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self.start
+        peak = peak_rss_bytes()
+        return {
+            'label': self.label,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_seconds': round(total, 4),
+            'rows': self.rows,
+            'rows_per_sec': round(self.rows / total, 1) if self.rows and total else None,
+            'peak_rss_mb': _mb(peak) if peak else None,
+            'stages': {
+                name: {
+                    'seconds': round(record.seconds, 4),
+                    'calls': record.calls,
+                    'rows': record.rows,
+                    'mem_delta_mb': _mb(record.mem_delta_bytes) if record.mem_delta_bytes is not None else None,
+                }
+                for name, record in self.stages.items()
+            },
+            'pipeline': {stats.name: stats.as_dict() for stats in self.pipeline},
+        }
+
+    def summary(self):
+        data = self.as_dict()
+        head = f"{self.label} 效能摘要: 總計 {data['total_seconds']:.2f}s"
+        if data['rows'] is not None:
+            head += f", {data['rows']} 筆"
+            if data['rows_per_sec']:
+                head += f" ({data['rows_per_sec']:,.0f} 筆/秒)"
+        parts = []
+        for name, stage in data['stages'].items():
+            part = f"{name} {stage['seconds']:.2f}s"
+            if stage['rows'] is not None:
+                part += f" {stage['rows']} 筆"
+            if stage['mem_delta_mb'] is not None:
+                part += f" {stage['mem_delta_mb']:+.1f}MB"
+            parts.append(part)
+        for name, stage in data['pipeline'].items():
+            parts.append(f"[{name}] 忙碌 {stage['busy_seconds']:.2f}s 閒置 {stage['idle_seconds']:.2f}s 受阻 {stage['blocked_seconds']:.2f}s")
+        return head + (" | " + " | ".join(parts) if parts else "")
+
+
+def save_metrics_json(metrics, path=None):
+    """將本次執行的指標附加到 JSON 指標檔 (保留最近 METRICS_HISTORY 筆)。"""
+    path = path or app_file_path(METRICS_FILE)
+    history = []
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            logging.warning(f"無法讀取指標檔 '{path}'，將重新建立。")
+    history.append(metrics.as_dict())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history[-METRICS_HISTORY:], f, ensure_ascii=False, indent=2)
+    return path
+
+
+def run_profiled(mode, label, func):
+    """在 cProfile 或 tracemalloc 下執行 func，並把結果存放在偵錯日誌旁邊。
+
+    mode 為 None 時直接執行；回傳 func 的回傳值。cProfile 也會記錄執行期間啟動的執行緒
+    (匯入管線的讀取與編碼階段)，結果與呼叫端執行緒合併為同一份報告。
+    """
+    if not mode:
+        return func()
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"未知的效能分析模式: {mode}")
+
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    base = app_file_path(f"db_importer_profile_{label}_{stamp}")
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        thread_profilers = []
+
+        def profile_new_thread(frame, event, arg):
+            # 新執行緒第一次呼叫時改由自己的 profiler 記錄 (enable 會取代此函式)
+            thread_profiler = cProfile.Profile()
+            try:
+                thread_profiler.enable()
+            except ValueError:
+                # Python 3.12 起 cProfile 已涵蓋所有執行緒，且同時只能啟用一個
+                sys.setprofile(None)
+                return
+            thread_profilers.append(thread_profiler)
+
+        threading.setprofile(profile_new_thread)
+        try:
+            return profiler.runcall(func)
+        finally:
+            threading.setprofile(None)
+            stats = pstats.Stats(profiler)
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+            stats.dump_stats(base + '.prof')
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats('cumulative').print_stats(40)
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+            logging.info(f"cProfile 結果已儲存: {base}.prof / {base}.txt (含 {len(thread_profilers)} 個背景執行緒)")
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(25)
+    try:
+        return func()
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+        with open(base + '_tracemalloc.txt', 'w', encoding='utf-8') as f:
+            f.write(f"current={_mb(current)}MB peak={_mb(peak)}MB\n\n")
+            for stat in snapshot.statistics('lineno')[:40]:
+                f.write(f"{stat}\n")
+        logging.info(f"tracemalloc 結果已儲存: {base}_tracemalloc.txt (峰值 {_mb(peak)}MB)")
@@ -0,0 +1,104 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import archives
+from readers import read_file_raw, sanitize_and_deduplicate_columns, select_sheets
+from transforms import apply_skip_and_header
+
+# 預先檢查時同時讀取的檔案數
+PRESCAN_WORKERS = 8
+# 狀態代碼 -> 報告中顯示的文字
+STATUS_LABELS = {
+    'reference': "基準 (第一個檔案)",
+    'ok': "一致",
+    'reordered': "欄位相同但順序不同",
+    'renamed': "欄位數相同但名稱不同",
+    'count_mismatch': "欄位數不符",
+    'empty': "無資料",
+    'error': "讀取失敗",
+}
+
+
+def _sample_type(series):
+    """依樣本值推測欄位型態：BIGINT/DOUBLE/DATETIME/TEXT，全空時回傳 None。"""
+    values = series.dropna().astype(str).str.strip()
+    values = values[values != '']
+    if values.empty:
+        return None
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.notna().all():
+        return "BIGINT" if (numbers % 1 == 0).all() else "DOUBLE"
+    dates = pd.to_datetime(values, errors='coerce', format='mixed')
+    if dates.notna().all():
+        return "DATETIME"
+    return "TEXT"
+
+
+def scan_file_schema(file_path, options):
+    """只讀取檔案開頭的預覽列，套用移除行數與標題列設定後回傳欄位名稱與樣本型態。"""
+    entry = {'file': archives.display_name(file_path), 'path': file_path, 'columns': [], 'types': {}, 'error': None}
+    try:
+        sheet_name = options.get('sheet_name')
+        if options.get('sheet_mode', 'single') != 'single' and archives.is_excel(file_path):
+            # 多工作表模式以第一個符合的工作表作為此檔案的代表
+            sheets = select_sheets(file_path, options['sheet_mode'], options.get('sheet_pattern', ''))
+            sheet_name = sheets[0] if sheets else None
+        df = read_file_raw(file_path, sheet_name=sheet_name, encoding=options.get('csv_encoding', 'utf-8'),
+                           preview=True, delimiter=options.get('csv_delimiter', ','), column_count=options.get('csv_column_count'),
+                           usecols=options.get('usecols'))
+        if df is None or df.empty:
+            return entry
+        df = apply_skip_and_header(df, options.get('rows_to_skip', 0), options.get('headers_promoted', False))
+        if df.empty:
+            return entry
+        if options.get('headers_promoted', False):
+            df = sanitize_and_deduplicate_columns(df)
+        entry['columns'] = [str(c) for c in df.columns]
+        entry['types'] = {str(col): _sample_type(df[col]) for col in df.columns}
+    except Exception as e:
+        entry['error'] = str(e)
+    return entry
+
+
+def prescan_files(file_paths, options, workers=PRESCAN_WORKERS, progress=None):
+    """平行讀取每個檔案的標題與樣本列，產生欄位結構報告。
+
+    以第一個檔案為基準 (與匯入時相同)，回傳 {'reference_columns', 'files', 'type_conflicts'}；
+    files 依原順序排列，每筆含 status (見 STATUS_LABELS)、missing/extra 欄位與錯誤訊息。
+    """
+    entries = [None] * len(file_paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(file_paths) or 1))) as executor:
+        futures = {executor.submit(scan_file_schema, path, options): i for i, path in enumerate(file_paths)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            entries[futures[future]] = future.result()
+            if progress: progress(done, len(file_paths), f"正在檢查欄位結構... {done} / {len(file_paths)}")
+
+    reference = next((e['columns'] for e in entries if e['columns']), [])
+    for entry in entries:
+        columns = entry['columns']
+        entry['missing'] = [c for c in reference if c not in columns]
+        entry['extra'] = [c for c in columns if c not in reference]
+        if entry['error']: entry['status'] = 'error'
+        elif not columns: entry['status'] = 'empty'
+        elif columns is reference: entry['status'] = 'reference'
+        elif columns == reference: entry['status'] = 'ok'
+        elif sorted(columns) == sorted(reference): entry['status'] = 'reordered'
+        elif len(columns) == len(reference): entry['status'] = 'renamed'
+        else: entry['status'] = 'count_mismatch'
+
+    # 同名欄位在不同檔案推測出不相容的型態 (BIGINT 與 DOUBLE 可互相放寬，不列入)
+    type_conflicts = {}
+    for column in reference:
+        seen = {}
+        for entry in entries:
+            sample_type = entry['types'].get(column)
+            if sample_type: seen.setdefault(sample_type, []).append(entry['file'])
+        if len(seen) > 1 and not set(seen) <= {"BIGINT", "DOUBLE"}:
+            type_conflicts[column] = seen
+
+    report = {'reference_columns': reference, 'files': entries, 'type_conflicts': type_conflicts}
+    problems = sum(1 for e in entries if e['status'] not in ('reference', 'ok'))
+    logging.info(f"欄位結構預先檢查完成：{len(entries)} 個檔案，{problems} 個與基準不一致，{len(type_conflicts)} 個欄位型態衝突。")
+    return report
@@ -0,0 +1,534 @@
+import codecs
+import collections
+import contextlib
+import csv
+import fnmatch
+import io
+import itertools
+import logging
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import archives
+from metrics import current_rss_bytes, peak_rss_bytes
+
+# 預覽時只讀取前 N 行，避免大檔案拖慢介面
+PREVIEW_ROWS = 200
+# 超過此大小的 CSV 才切分成多個範圍平行解析
+PARALLEL_CSV_MIN_BYTES = 64 * 1024 * 1024
+# 單一解析範圍的上限，控制每個子程序的記憶體用量
+PARALLEL_CSV_MAX_RANGE_BYTES = 256 * 1024 * 1024
+# 平行解析時每個程序最多預先解析的範圍數；已解析但尚未取用的範圍都佔用記憶體
+PARALLEL_CSV_AHEAD = 2
+# CSV 一律先解析為文字，各位元組範圍或解析引擎各自推斷型態時結果才會一致；
+# 讀完後再由 infer_numeric_columns 把整欄都是數字的欄位轉為數值 (與 pandas 推斷的結果及 Excel 相同)
+CSV_DTYPE = str
+# 推斷數值欄時先檢查前 N 個非空值，明顯是文字的欄位不必整欄轉換
+NUMERIC_SAMPLE_VALUES = 100
+# CSV 解析引擎 (介面顯示名稱 -> 內部代碼)
+CSV_ENGINES = {
+    'pandas (C)': 'c',
+    'PyArrow': 'pyarrow',
+}
+CSV_ENCODINGS = ['utf-8', 'big5', 'gbk', 'utf-16']
+# Excel 工作表選擇模式 (介面顯示名稱 -> 內部代碼)
+SHEET_MODES = {
+    '單一工作表': 'single',
+    '所有工作表': 'all',
+    '名稱符合': 'pattern',
+}
+# CSV 分隔符號 (介面顯示名稱 -> 字元)
+CSV_DELIMITERS = {
+    '逗號 (,)': ',',
+    'Tab': '\t',
+    '分號 (;)': ';',
+    '直線 (|)': '|',
+}
+# 自動偵測時只讀取檔案開頭的位元組數
+SNIFF_SAMPLE_BYTES = 256 * 1024
+# DataFrame.attrs 中記錄各欄位在原始檔案中的位置 (從 0 起算) 的鍵
+SOURCE_POSITIONS_ATTR = 'source_positions'
+
+
+def read_file_raw(file_path, sheet_name=None, encoding='utf-8', preview=False, parallel_workers=1, csv_engine='c',
+                  delimiter=',', column_count=None, usecols=None):
+    """以無標題的方式讀取 Excel/CSV，移除全空的行與欄，欄位命名為 Column_0..N。
+
+    file_path 也可以是 gzip/bz2/xz 壓縮檔或 ZIP 成員 (見 archives)，內容在讀取時以串流解壓縮。
+
+    parallel_workers 為 None (自動) 或大於 1 時，大型 CSV 會切分後以多個程序平行解析。
+    csv_engine 為 'pyarrow' 時改用記憶體映射與多執行緒讀取，結果與 pandas C 引擎相同。
+    column_count 指定 CSV 的欄位數，頂端說明文字的欄位較少時才不會解析失敗 (由 sniff_source 提供)。
+    usecols 為要讀取的 CSV 欄位在檔案中的位置清單，其餘欄位完全不解析；檔案沒有的位置會被忽略。
+    各欄位在檔案中的位置記錄在 df.attrs[SOURCE_POSITIONS_ATTR]，供欄位選擇介面對照。
+    """
+    if not file_path: return None
+    nrows = PREVIEW_ROWS if preview else None
+    usecols = sorted(set(usecols)) if usecols else None
+    kind = archives.data_kind(file_path)
+    is_excel = kind == 'excel'
+    df = None
+    start = time.perf_counter()
+    rss_before = current_rss_bytes()
+
+    if is_excel:
+        if not sheet_name: return None
+        # Excel 無論是否指定 usecols 都會解析每個儲存格，因此讀完整個工作表後再選擇欄位
+        df = pd.read_excel(archives.excel_source(file_path), sheet_name=sheet_name, header=None, nrows=nrows)
+    elif kind == 'csv':
+        # PyArrow 本身即以多執行緒解析，不再另外切分程序；無法解析時回傳 None，改由 pandas 讀取
+        if csv_engine == 'pyarrow':
+            df = _read_csv_arrow(file_path, encoding, nrows, delimiter, usecols)
+        if df is None and usecols:
+            column_count = column_count or _csv_column_count(file_path, encoding, delimiter)
+            usecols = [position for position in usecols if position < column_count]
+        if df is None and not preview and should_parse_in_parallel(file_path, parallel_workers, encoding):
+            chunks = iter_csv_chunks_parallel(file_path, encoding, parallel_workers, delimiter, column_count, usecols)
+            frames = [chunk for chunk in chunks if not chunk.empty]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        elif df is None:
+            with _csv_source(file_path) as source:
+                df = pd.read_csv(source, encoding=encoding, sep=delimiter, header=None, names=_column_names(column_count),
+                                 dtype=CSV_DTYPE, low_memory=False, skipinitialspace=True, nrows=nrows, usecols=usecols)
+
+    if df is not None:
+        # 只讀取部分欄位時不移除全空的行：頂端說明文字可能只在未讀取的欄位，保留下來移除行數才與
+        # 讀取全部欄位時一致；選擇的欄位都是空值的資料列由轉換流程在標題列之後移除
+        if not usecols or is_excel:
+            df.dropna(how='all', axis=0, inplace=True)
+        df.dropna(how='all', axis=1, inplace=True)
+        df.reset_index(drop=True, inplace=True)
+        df.attrs[SOURCE_POSITIONS_ATTR] = [_source_position(col) for col in df.columns]
+        df.columns = [f"Column_{i}" for i in range(df.shape[1])]
+        if usecols and is_excel:
+            df = project_columns(df, usecols)
+        if kind == 'csv':
+            infer_numeric_columns(df)
+            _log_parse_stats(file_path, csv_engine, len(df), df.shape[1], time.perf_counter() - start, rss_before)
+    return df
+
+
+def iter_file_raw(file_path, sheet_name=None, encoding='utf-8', parallel_workers=1, csv_engine='c', delimiter=',',
+                  column_count=None, usecols=None):
+    """與 read_file_raw 相同，但平行解析的大型 CSV 依檔案順序逐一產出各範圍的 DataFrame，整個檔案不會同時在記憶體中。
+
+    欄位以第一個範圍為準：全空的欄位依第一個範圍移除，數值欄也依第一個範圍推斷 (之後的範圍該欄出現文字時
+    維持文字，由匯入時放寬欄位型態)。其他來源只產出一個 DataFrame。
+    """
+    if (csv_engine == 'pyarrow' or archives.data_kind(file_path) != 'csv'
+            or not should_parse_in_parallel(file_path, parallel_workers, encoding)):
+        yield read_file_raw(file_path, sheet_name=sheet_name, encoding=encoding, parallel_workers=parallel_workers,
+                            csv_engine=csv_engine, delimiter=delimiter, column_count=column_count, usecols=usecols)
+        return
+
+    if usecols:
+        column_count = column_count or _csv_column_count(file_path, encoding, delimiter)
+        usecols = [position for position in sorted(set(usecols)) if position < column_count]
+    start = time.perf_counter()
+    rss_before = current_rss_bytes()
+    keep = numeric = None
+    rows = 0
+    for chunk in iter_csv_chunks_parallel(file_path, encoding, parallel_workers, delimiter, column_count, usecols):
+        # 與 read_file_raw 相同：只讀取部分欄位時不移除全空的行
+        if not usecols:
+            chunk = chunk.dropna(how='all', axis=0)
+        if chunk.empty:
+            continue
+        if keep is None:
+            keep = [col for col in chunk.columns if chunk[col].notna().any()]
+        lost = [_source_position(col) for col in chunk.columns if col not in keep and chunk[col].notna().any()]
+        if lost:
+            raise ValueError(f"'{archives.display_name(file_path)}' 位置 {lost} 的欄位在檔案開頭全為空值、之後才有資料，"
+                             f"平行解析無法保留這些欄位；請將平行解析程序數設為 1 後重新匯入。")
+        chunk = chunk[keep].reset_index(drop=True)
+        chunk.attrs[SOURCE_POSITIONS_ATTR] = [_source_position(col) for col in keep]
+        chunk.columns = [f"Column_{i}" for i in range(len(keep))]
+        if numeric is None:
+            numeric = infer_numeric_columns(chunk)
+        else:
+            infer_numeric_columns(chunk, numeric)
+        rows += len(chunk)
+        yield chunk
+    _log_parse_stats(file_path, csv_engine, rows, len(keep or ()), time.perf_counter() - start, rss_before)
+
+
+def infer_numeric_columns(df, columns=None):
+    """把所有非空值都是數字的文字欄轉為數值 (整數欄有空值時為浮點數)，就地修改並回傳轉換的欄位。
+
+    結果與 pandas 解析 CSV 時推斷的型態相同：有標題列或任何一格文字的欄位維持文字，
+    前導零也會保留。columns 指定只檢查這些欄位，預設為全部。
+    """
+    converted = []
+    for col in df.columns if columns is None else columns:
+        series = df[col]
+        if not pd.api.types.is_string_dtype(series.dtype):
+            continue
+        present = series.notna()
+        if not present.any() or pd.to_numeric(series[present].iloc[:NUMERIC_SAMPLE_VALUES], errors='coerce').isna().any():
+            continue
+        numbers = pd.to_numeric(series, errors='coerce')
+        if numbers.notna().sum() == present.sum():
+            df[col] = numbers
+            converted.append(col)
+    return converted
+
+
+def _csv_source(file_path):
+    # 一般檔案交給 pandas 直接開啟；壓縮檔與 ZIP 成員以解壓縮串流讀取
+    return archives.open_binary(file_path) if archives.is_streamed(file_path) else contextlib.nullcontext(file_path)
+
+
+def _source_position(label):
+    # pandas 以整數位置命名無標題的欄位，PyArrow 自動命名為 f0, f1, ...
+    return int(label[1:]) if isinstance(label, str) else int(label)
+
+
+def _csv_column_count(file_path, encoding, delimiter):
+    """CSV 第一行的欄位數；pandas 的 usecols 含有檔案沒有的位置時會直接失敗，須先依此過濾。"""
+    with io.TextIOWrapper(archives.open_binary(file_path), encoding=encoding, errors='replace', newline='') as f:
+        return len(next(csv.reader(f, delimiter=delimiter), []))
+
+
+def project_columns(df, usecols):
+    """從已讀入的資料中只保留 usecols 指定位置的欄位，並重新命名為 Column_0..N。"""
+    if df is None or not usecols:
+        return df
+    wanted = set(usecols)
+    positions = df.attrs.get(SOURCE_POSITIONS_ATTR, range(df.shape[1]))
+    keep = [i for i, position in enumerate(positions) if position in wanted]
+    projected = df.iloc[:, keep].copy()
+    projected.attrs[SOURCE_POSITIONS_ATTR] = [positions[i] for i in keep]
+    projected.columns = [f"Column_{i}" for i in range(projected.shape[1])]
+    return projected
+
+
+def list_sheets(file_path):
+    with pd.ExcelFile(archives.excel_source(file_path)) as xls:
+        return list(xls.sheet_names)
+
+
+def select_sheets(file_path, mode='single', pattern='', sheet_name=None):
+    """依模式決定要讀取的工作表：single 只讀 sheet_name，all 讀全部，
+    pattern 讀名稱符合萬用字元 (例如 '2024-01-*'，不分大小寫) 的工作表。"""
+    if mode == 'single':
+        return [sheet_name] if sheet_name else []
+    sheets = list_sheets(file_path)
+    if mode == 'pattern':
+        pattern = (pattern or '*').lower()
+        sheets = [name for name in sheets if fnmatch.fnmatchcase(name.lower(), pattern)]
+    return sheets
+
+
+def _read_sheet(file_path, sheet_name, preview, usecols=None):
+    return sheet_name, read_file_raw(file_path, sheet_name=sheet_name, preview=preview, usecols=usecols)
+
+
+def read_sheets(file_path, sheet_names, workers=None, preview=False, usecols=None):
+    """讀取多個工作表，依原順序回傳 [(工作表名稱, DataFrame)]。
+
+    解析 Excel 受 CPU 限制，多個工作表時以多個程序平行讀取；workers 為 None 表示依 CPU 核心數決定。
+    """
+    workers = min(len(sheet_names), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [_read_sheet(file_path, name, preview, usecols) for name in sheet_names]
+    logging.info(f"以 {workers} 個程序平行讀取 '{archives.display_name(file_path)}' 的 {len(sheet_names)} 個工作表。")
+    count = len(sheet_names)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_read_sheet, [file_path] * count, sheet_names, [preview] * count, [usecols] * count))
+
+
+def _log_parse_stats(file_path, csv_engine, rows, columns, seconds, rss_before):
+    rss_after, peak = current_rss_bytes(), peak_rss_bytes()
+    delta = f"{(rss_after - rss_before) / 1024 / 1024:+,.1f} MB" if rss_after and rss_before else "無法取得"
+    peak_text = f"{peak / 1024 / 1024:,.1f} MB" if peak else "無法取得"
+    logging.info(f"解析 '{archives.display_name(file_path)}' ({csv_engine} 引擎): {rows} 行 x {columns} 欄, "
+                 f"{seconds:.2f} 秒, 記憶體變化 {delta}, 峰值 RSS {peak_text}")
+
+
+def _column_names(column_count):
+    return range(column_count) if column_count else None
+
+
+def _read_csv_arrow(file_path, encoding, nrows=None, delimiter=',', usecols=None):
+    """以 PyArrow 讀取 CSV；各行欄位數不一致 (例如頂端有說明文字) 時回傳 None，由 pandas C 引擎接手。"""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        raise RuntimeError("PyArrow 解析引擎需要安裝 pyarrow 套件 (pip install pyarrow)。")
+    read_options = pa_csv.ReadOptions(autogenerate_column_names=True, encoding=encoding)
+    # 與 pandas C 引擎相同先全部解析為文字 (CSV_DTYPE)，再由 infer_numeric_columns 推斷數值欄；
+    # 第一行的欄位數不足時其餘行會解析失敗並改用 pandas，因此以第一行決定欄位
+    column_types = {f"f{position}": pa.string() for position in range(_csv_column_count(file_path, encoding, delimiter))}
+    # 允許引號內的換行，與 pandas C 引擎的行為一致
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+    # 空字串視為 NULL，與 pandas C 引擎的行為一致；檔案沒有的欄位會是全空欄，稍後被移除
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, include_missing_columns=True, column_types=column_types,
+                                            include_columns=[f"f{position}" for position in usecols] if usecols else None)
+    # 壓縮內容無法記憶體映射，改以解壓縮串流讀取
+    source = archives.open_binary(file_path) if archives.is_streamed(file_path) else pa.memory_map(file_path)
+    try:
+        if nrows is None:
+            table = pa_csv.read_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        else:
+            # 預覽只讀到足夠的批次即停止，不解析整個檔案
+            reader = pa_csv.open_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+            batches, count = [], 0
+            for batch in reader:
+                batches.append(batch)
+                count += batch.num_rows
+                if count >= nrows: break
+            table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows)
+        return table.to_pandas(types_mapper=_text_dtype_mapper())
+    except pa.ArrowInvalid as e:
+        logging.warning(f"PyArrow 無法解析 '{archives.display_name(file_path)}'，改用 pandas C 引擎: {e}")
+        return None
+    finally:
+        source.close()
+
+
+def _text_dtype_mapper():
+    # 所有欄位都是文字，轉成與 pandas C 引擎相同的型態 (pandas 3 為 Arrow 儲存的 str；之前的版本為 object，交給預設轉換)
+    text_dtype = pd.Series([''], dtype=CSV_DTYPE).dtype
+    if isinstance(text_dtype, pd.api.extensions.ExtensionDtype):
+        return lambda arrow_type: text_dtype
+    return None
+
+
+def sanitize_and_deduplicate_columns(df):
+    original_columns = df.columns.tolist()
+    new_columns = []
+    seen_counts = {}
+    for col in original_columns:
+        clean_col = re.sub(r'[\s\n\r\t　]+', ' ', str(col)).strip()
+        if not clean_col: clean_col = "Unnamed_Column"
+        if clean_col in seen_counts:
+            seen_counts[clean_col] += 1
+            new_columns.append(f"{clean_col}_{seen_counts[clean_col]}")
+        else:
+            seen_counts[clean_col] = 0
+            new_columns.append(clean_col)
+    df.columns = new_columns
+    return df
+
+
+def split_csv_byte_ranges(file_path, parts, block_size=16 * 1024 * 1024):
+    """把 CSV 切成約 parts 等份的位元組範圍，每個邊界都落在記錄結尾。
+
+    從檔頭開始累計雙引號的奇偶數，只有在引號之外的換行才視為記錄結尾，
+    因此欄位內含換行的引號字串不會被切斷。utf-8、big5、gbk 的多位元組字元
+    不會出現 0x22 (") 或 0x0A (\\n) 位元組，可直接在位元組層級判斷。
+    """
+    size = os.path.getsize(file_path)
+    if parts <= 1 or size == 0:
+        return [(0, size)]
+
+    targets = [size * i // parts for i in range(1, parts)]
+    boundaries = [0]
+    in_quotes = False
+    block_start = 0
+    with open(file_path, 'rb') as f:
+        while targets:
+            block = f.read(block_size)
+            if not block: break
+            scan_from = 0
+            while targets and targets[0] < block_start + len(block):
+                search_at = max(targets[0] - block_start, scan_from)
+                # 先把目標位置之前的引號數計入奇偶狀態
+                in_quotes ^= bool(block.count(b'"', scan_from, search_at) % 2)
+                scan_from = search_at
+                newline = block.find(b'\n', scan_from)
+                while newline != -1:
+                    in_quotes ^= bool(block.count(b'"', scan_from, newline) % 2)
+                    scan_from = newline + 1
+                    if not in_quotes: break
+                    newline = block.find(b'\n', scan_from)
+                if newline == -1:
+                    break  # 本區塊內找不到記錄結尾，延續到下一個區塊
+                boundary = block_start + newline + 1
+                if boundary > boundaries[-1] and boundary < size:
+                    boundaries.append(boundary)
+                while targets and targets[0] < boundary:
+                    targets.pop(0)
+            in_quotes ^= bool(block.count(b'"', scan_from) % 2)
+            block_start += len(block)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _parse_csv_range(file_path, start, end, encoding, delimiter=',', column_count=None, usecols=None):
+    # 由子程序執行：只讀取自己負責的位元組範圍
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if not data.strip():
+        return pd.DataFrame()
+    return pd.read_csv(io.BytesIO(data), encoding=encoding, sep=delimiter, header=None, names=_column_names(column_count),
+                       dtype=CSV_DTYPE, low_memory=False, skipinitialspace=True, usecols=usecols)
+
+
+def iter_csv_chunks_parallel(file_path, encoding='utf-8', workers=None, delimiter=',', column_count=None, usecols=None):
+    """以多個子程序平行解析 CSV 的各個位元組範圍，依檔案順序逐一產出 DataFrame。
+
+    同時最多只有 PARALLEL_CSV_AHEAD 倍程序數的範圍在解析或等待取用，取用端較慢時不會把整個檔案累積在記憶體中。
+    """
+    workers = workers or os.cpu_count() or 1
+    # 切得比程序數多一些，讓較快的程序可以接手，也限制單一範圍的記憶體用量
+    parts = max(workers * 4, -(-os.path.getsize(file_path) // PARALLEL_CSV_MAX_RANGE_BYTES))
+    ranges = split_csv_byte_ranges(file_path, parts)
+    logging.info(f"平行解析 '{os.path.basename(file_path)}'：{len(ranges)} 個範圍、{workers} 個程序。")
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(byte_range):
+        return executor.submit(_parse_csv_range, file_path, *byte_range, encoding, delimiter, column_count, usecols)
+
+    try:
+        remaining = iter(ranges)
+        pending = collections.deque(submit(byte_range) for byte_range in itertools.islice(remaining, workers * PARALLEL_CSV_AHEAD))
+        while pending:
+            chunk = pending.popleft().result()
+            for byte_range in itertools.islice(remaining, 1):
+                pending.append(submit(byte_range))
+            yield chunk
+    finally:
+        # 提早停止 (取消或匯入失敗) 時不再解析尚未開始的範圍
+        executor.shutdown(cancel_futures=True)
+
+
+def should_parse_in_parallel(file_path, workers, encoding='utf-8'):
+    # UTF-16 的換行與引號各佔兩個位元組，無法以單一位元組判斷記錄邊界；壓縮內容只能循序讀取
+    return (archives.is_csv(file_path) and not archives.is_streamed(file_path) and (workers is None or workers > 1) and (os.cpu_count() or 1) > 1
+            and not encoding.lower().startswith('utf-16') and os.path.getsize(file_path) >= PARALLEL_CSV_MIN_BYTES)
+
+
+def _detect_encoding(sample):
+    """依 BOM、UTF-8 嚴格解碼與雙位元組分布判斷編碼，回傳 (編碼, 判斷依據)。"""
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8', "UTF-8 BOM"
+    if sample.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16', "UTF-16 BOM"
+    try:
+        # 樣本可能在多位元組字元中間截斷，final=False 允許結尾不完整
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', "UTF-8 解碼成功"
+    except UnicodeDecodeError:
+        pass
+
+    # big5 首位元組為 0xA1-0xF9，約半數常用字的次位元組落在 0x40-0x7E；
+    # GB2312 常用字兩個位元組都在 0xA1-0xFE，首位元組 0x81-0xA0 則只出現在 GBK
+    pairs = gbk_only = low_trail = 0
+    i, n = 0, len(sample) - 1
+    while i < n:
+        lead = sample[i]
+        if lead < 0x81:
+            i += 1
+            continue
+        trail = sample[i + 1]
+        pairs += 1
+        if lead <= 0xA0: gbk_only += 1
+        if 0x40 <= trail <= 0x7E: low_trail += 1
+        i += 2
+    candidates = [enc for enc in ('big5', 'gbk') if _decodes(sample, enc)]
+    if len(candidates) == 1:
+        return candidates[0], f"只有 {candidates[0]} 可完整解碼"
+    if gbk_only:
+        return 'gbk', f"{gbk_only} 個 GBK 專用首位元組"
+    if pairs and low_trail / pairs > 0.1:
+        return 'big5', f"{low_trail}/{pairs} 個雙位元組字的次位元組位於 0x40-0x7E"
+    return 'gbk', "雙位元組分布符合 GB2312"
+
+
+def _decodes(sample, encoding):
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _detect_delimiter(lines):
+    # 逐一嘗試候選分隔符號，取「欄位數一致 (且大於 1) 的行數」最多者；比 csv.Sniffer 更能容忍頂端的說明文字
+    best, best_score = ',', 0
+    for delimiter in CSV_DELIMITERS.values():
+        counts = [len(row) for row in csv.reader(lines, delimiter=delimiter)]
+        counts = [c for c in counts if c > 1]
+        if not counts: continue
+        mode = max(set(counts), key=counts.count)
+        score = counts.count(mode)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def _is_number(value):
+    try:
+        float(value.replace(',', ''))
+        return True
+    except ValueError:
+        return False
+
+
+def _looks_like_header(row, body):
+    cells = [c.strip() for c in row]
+    filled = [c for c in cells if c]
+    if not filled or any(_is_number(c) for c in filled) or len(set(filled)) != len(filled):
+        return False
+    # 參考 csv.Sniffer.has_header：數值欄或固定長度的文字欄，標題格與內容不同型態即支持為標題
+    votes = 0
+    for j, cell in enumerate(cells):
+        column = [r[j].strip() for r in body if j < len(r) and r[j].strip()]
+        if not cell or not column: continue
+        if cell in column:
+            votes -= 1
+        elif sum(_is_number(v) for v in column) > len(column) / 2:
+            votes += 1
+        else:
+            lengths = {len(v) for v in column}
+            if len(lengths) == 1:
+                votes += 1 if len(cell) not in lengths else -1
+    return votes >= 0
+
+
+def sniff_source(file_path, sample_bytes=SNIFF_SAMPLE_BYTES):
+    """只讀取檔案開頭的樣本，推測 CSV 的編碼、分隔符號、頂端多餘行數與是否有標題列。
+
+    回傳的 rows_to_skip 以「移除全空行之後」的行數計算，與 read_file_raw 及匯入設定的
+    「移除頂端 N 行」一致；has_header 表示略過這些行後的第一行應作為標題；
+    column_count 只在頂端各行欄位數不一致時提供，須傳給 read_file_raw。
+    """
+    with archives.open_binary(file_path) as f:
+        sample = f.read(sample_bytes)
+    truncated = len(sample) == sample_bytes
+    encoding, reason = _detect_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=not truncated)
+    lines = text.lstrip('\ufeff').splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]  # 最後一行可能不完整
+
+    delimiter = _detect_delimiter(lines)
+    rows = [row for row in csv.reader(lines, delimiter=delimiter) if any(c.strip() for c in row)]
+    result = {'encoding': encoding, 'encoding_reason': reason, 'delimiter': delimiter, 'rows_to_skip': 0,
+              'has_header': False, 'column_count': None}
+    if not rows:
+        return result
+
+    fills = [sum(1 for c in row if c.strip()) for row in rows]
+    # 以樣本後半段的填寫欄數作為資料列的典型寬度，頂端填寫欄數明顯較少的行視為說明文字
+    body_fills = sorted(fills[len(fills) // 2:])
+    typical = body_fills[len(body_fills) // 2]
+    start = 0
+    if typical > 1:
+        threshold = max(2, math.ceil(typical * 0.6))
+        start = next((i for i, fill in enumerate(fills) if fill >= threshold), 0)
+    result['rows_to_skip'] = start
+    widths = [len(row) for row in rows]
+    if min(widths[:start + 1]) < max(widths):
+        # 頂端說明文字的欄位較少，須指定欄位數，否則 pandas 會以第一行的欄位數解析而失敗
+        result['column_count'] = max(widths)
+    result['has_header'] = _looks_like_header(rows[start], rows[start + 1:start + 51])
+    return result
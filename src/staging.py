@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+
+# 相鄰階段之間佇列的容量；佇列滿時上游階段暫停 (背壓)，記憶體中最多只有這麼多個項目在等待
+STAGE_QUEUE_DEPTH = 2
+# 等待佇列時每隔這麼久檢查一次是否已停止
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """管線已停止 (下游失敗或已結束)，階段執行緒直接結束。"""
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageStats:
+    """一個階段的時間分配：處理項目 (忙碌)、等待上游 (閒置) 與等待下游 (受阻，背壓)。"""
+    def __init__(self, name):
+        self.name = name
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.items = 0
+
+    def as_dict(self):
+        return {
+            'busy_seconds': round(self.busy_seconds, 4),
+            'idle_seconds': round(self.idle_seconds, 4),
+            'blocked_seconds': round(self.blocked_seconds, 4),
+            'items': self.items,
+        }
+
+
+class StagedPipeline:
+    """把工作拆成以有界佇列串接的階段，各階段在自己的執行緒中同時執行。
+
+    source 為 (名稱, 產生器函式)，在背景執行緒中逐一產生項目；stages 為 [(名稱, 函式)]，函式接收一個項目
+    並回傳要交給下一階段的項目 (可迭代，可為空)，各自在背景執行緒中執行；sink 為 (名稱, 函式)，
+    在呼叫 run 的執行緒中處理最後的項目，因此資料庫連線等資源不需要跨執行緒使用。
+    任一階段拋出的例外會在 run 中重新拋出；sink 失敗時其餘階段在目前項目處理完後停止。
+    """
+    def __init__(self, source, stages, sink, depth=STAGE_QUEUE_DEPTH):
+        self.source = source
+        self.stages = list(stages)
+        self.sink = sink
+        self.depth = depth
+        self.stats = [StageStats(name) for name, _ in [source] + self.stages + [sink]]
+        self._stop = threading.Event()
+
+    def run(self):
+        queues = [queue.Queue(self.depth) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._run_source, args=(self.stats[0], self.source[1], queues[0]), daemon=True)]
+        for i, (_, func) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._run_stage, args=(self.stats[i + 1], func, queues[i], queues[i + 1]), daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            self._run_sink(self.stats[-1], self.sink[1], queues[-1])
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def bottleneck(self):
+        """忙碌時間最長的階段，即限制整體吞吐量的階段。"""
+        return max(self.stats, key=lambda stats: stats.busy_seconds).name
+
+    def _get(self, inbox, stats):
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return inbox.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    if self._stop.is_set(): raise _Stopped()
+        finally:
+            stats.idle_seconds += time.perf_counter() - start
+
+    def _put(self, outbox, item, stats):
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    outbox.put(item, timeout=_POLL_SECONDS)
+                    return
+                except queue.Full:
+                    if self._stop.is_set(): raise _Stopped()
+        finally:
+            stats.blocked_seconds += time.perf_counter() - start
+
+    def _emit(self, items, outbox, stats):
+        # 逐一取出輸出項目：產生器的計算時間算作忙碌，等待下游的時間算作受阻
+        items = iter(items)
+        count = 0
+        while True:
+            start = time.perf_counter()
+            item = next(items, _DONE)
+            stats.busy_seconds += time.perf_counter() - start
+            if item is _DONE:
+                return count
+            self._put(outbox, item, stats)
+            count += 1
+
+    def _run_source(self, stats, produce, outbox):
+        try:
+            stats.items = self._emit(produce(), outbox, stats)
+            self._put(outbox, _DONE, stats)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._forward(_Failure(e), outbox, stats)
+
+    def _run_stage(self, stats, func, inbox, outbox):
+        try:
+            while True:
+                item = self._get(inbox, stats)
+                if item is _DONE or isinstance(item, _Failure):
+                    self._put(outbox, item, stats)
+                    return
+                stats.items += 1
+                start = time.perf_counter()
+                results = func(item)
+                stats.busy_seconds += time.perf_counter() - start
+                self._emit(results, outbox, stats)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._forward(_Failure(e), outbox, stats)
+
+    def _run_sink(self, stats, func, inbox):
+        while True:
+            item = self._get(inbox, stats)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            stats.items += 1
+            start = time.perf_counter()
+            try:
+                func(item)
+            finally:
+                stats.busy_seconds += time.perf_counter() - start
+
+    def _forward(self, failure, outbox, stats):
+        try:
+            self._put(outbox, failure, stats)
+        except _Stopped:
+            pass
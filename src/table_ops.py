@@ -0,0 +1,105 @@
+import logging
+
+# 篩選運算子 (介面顯示名稱 -> 內部代碼)
+FILTER_OPERATORS = {
+    '=': 'eq',
+    '≠': 'ne',
+    '>': 'gt',
+    '>=': 'ge',
+    '<': 'lt',
+    '<=': 'le',
+    '包含': 'contains',
+    '開頭為': 'startswith',
+    '為空': 'isnull',
+    '不為空': 'notnull',
+}
+_COMPARISONS = {'eq': '=', 'ne': '<>', 'gt': '>', 'ge': '>=', 'lt': '<', 'le': '<='}
+# EXPLAIN 預估掃描超過此筆數且無法使用索引 (全表掃描或額外排序) 時才提出警告
+EXPLAIN_WARN_ROWS = 10_000
+
+
+def quote_identifier(name):
+    """以反引號括住資料表或欄位名稱，名稱中的反引號加倍跳脫。"""
+    return f"`{name.replace('`', '``')}`"
+
+
+def _quote(column, columns):
+    # 欄位名稱無法參數化，只接受資料表實際存在的欄位
+    if column not in columns:
+        raise ValueError(f"資料表沒有欄位 '{column}'。")
+    return quote_identifier(column)
+
+
+def _escape_like(value):
+    return str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_where(columns, filters=(), search=''):
+    """由篩選條件與關鍵字組成參數化的 WHERE 子句，回傳 (where_sql 或 None, 參數)。
+
+    filters 為 [(欄位, 運算子代碼, 值)]，各條件以 AND 連接；search 會在所有欄位以 LIKE 比對
+    (任一欄位符合即可)。值一律以參數傳遞，不會拼接進 SQL。
+    """
+    clauses, params = [], []
+    for column, op, value in filters:
+        quoted = _quote(column, columns)
+        if op == 'isnull':
+            clauses.append(f"{quoted} IS NULL")
+        elif op == 'notnull':
+            clauses.append(f"{quoted} IS NOT NULL")
+        elif op == 'contains':
+            clauses.append(f"{quoted} LIKE %s")
+            params.append(f"%{_escape_like(value)}%")
+        elif op == 'startswith':
+            clauses.append(f"{quoted} LIKE %s")
+            params.append(f"{_escape_like(value)}%")
+        elif op in _COMPARISONS:
+            clauses.append(f"{quoted} {_COMPARISONS[op]} %s")
+            params.append(value)
+        else:
+            raise ValueError(f"不支援的篩選運算子: {op}")
+    search = (search or '').strip()
+    if search and columns:
+        clauses.append("(" + " OR ".join(f"{_quote(c, columns)} LIKE %s" for c in columns) + ")")
+        params.extend([f"%{_escape_like(search)}%"] * len(columns))
+    return (" AND ".join(clauses) or None), params
+
+
+def build_order_by(columns, sort_column=None, descending=False):
+    if not sort_column:
+        return None
+    return f"{_quote(sort_column, columns)} {'DESC' if descending else 'ASC'}"
+
+
+def select_sql(table_name, where_sql=None, order_sql=None):
+    sql = f"SELECT * FROM {quote_identifier(table_name)}"
+    if where_sql: sql += f" WHERE {where_sql}"
+    if order_sql: sql += f" ORDER BY {order_sql}"
+    return sql
+
+
+def explain_warnings(db_pool, table_name, where_sql, params, order_sql, limit):
+    """以 EXPLAIN 檢查查詢計畫，回傳無法使用索引的篩選或排序警告 (文字清單)。"""
+    if not where_sql and not order_sql:
+        return []
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + select_sql(table_name, where_sql, order_sql) + " LIMIT %s", list(params) + [limit])
+        plan = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    warnings = []
+    for step in plan:
+        step = {k.lower(): v for k, v in step.items()}
+        access, extra = (step.get('type') or ''), (step.get('extra') or '')
+        rows = int(step.get('rows') or 0)
+        if where_sql and access.upper() == 'ALL' and rows >= EXPLAIN_WARN_ROWS:
+            warnings.append(f"篩選條件無法使用索引，伺服器需掃描全表 (約 {rows:,} 筆)。")
+        if order_sql and 'filesort' in extra.lower() and rows >= EXPLAIN_WARN_ROWS:
+            warnings.append("排序欄位沒有可用的索引，伺服器需額外排序 (Using filesort)。")
+    if warnings:
+        logging.info(f"查詢計畫警告 ({table_name}): {' '.join(warnings)}")
+    return warnings
@@ -0,0 +1,319 @@
+import json
+import logging
+import operator
+
+import numpy as np
+import pandas as pd
+
+from readers import sanitize_and_deduplicate_columns
+
+RECIPE_VERSION = 1
+# 配方 (轉換設定) 的欄位與預設值；與匯入設定字典使用相同的鍵
+RECIPE_DEFAULTS = {
+    'usecols': None,
+    'rows_to_skip': 0,
+    'headers_promoted': False,
+    'align_by_name': False,
+    'trim_whitespace': False,
+    'casts': {},
+    'row_filters': [],
+    'filters': [],
+    'add_filename': False,
+    'deduplicate': False,
+}
+# 型態轉換選項 (介面顯示名稱 -> 內部代碼)
+CAST_TYPES = {
+    '整數': 'int',
+    '浮點數': 'float',
+    '日期時間': 'datetime',
+    '文字': 'text',
+}
+SOURCE_COLUMN = '檔案來源'
+SHEET_COLUMN = '工作表來源'
+# 列條件的比較運算子 (運算子代碼與 table_ops.FILTER_OPERATORS 相同)
+_COMPARISONS = {'eq': operator.eq, 'ne': operator.ne, 'gt': operator.gt, 'ge': operator.ge, 'lt': operator.lt, 'le': operator.le}
+
+
+def apply_skip_and_header(df, rows_to_skip, headers_promoted):
+    """移除頂端 N 行，並視需要把下一行提升為欄位名稱。"""
+    if rows_to_skip > 0 and rows_to_skip < len(df):
+        df = df.iloc[rows_to_skip:].reset_index(drop=True)
+    if df.empty:
+        return df
+    if headers_promoted:
+        new_header = df.iloc[0].astype(str)
+        df = df[1:]
+        df.columns = new_header
+    return df.reset_index(drop=True)
+
+
+def recipe_from_options(options):
+    """從匯入設定字典取出配方欄位，缺少的欄位使用預設值。"""
+    recipe = {key: options.get(key, default) for key, default in RECIPE_DEFAULTS.items()}
+    recipe['casts'] = dict(recipe['casts'] or {})
+    recipe['filters'] = [f for f in (recipe['filters'] or []) if f and f.strip()]
+    # usecols: 要讀取的欄位在檔案中的位置 (None 為全部)；row_filters: [[欄位, 運算子代碼, 值]]
+    recipe['usecols'] = sorted({int(i) for i in recipe['usecols']}) if recipe['usecols'] else None
+    recipe['row_filters'] = [list(f) for f in (recipe['row_filters'] or []) if f and f[0]]
+    return recipe
+
+
+def save_recipe(recipe, path):
+    data = dict(recipe_from_options(recipe), version=RECIPE_VERSION)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_recipe(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version', RECIPE_VERSION) > RECIPE_VERSION:
+        raise ValueError(f"配方檔版本 ({data['version']}) 比此程式支援的版本新。")
+    unknown = set(data) - set(RECIPE_DEFAULTS) - {'version'}
+    if unknown:
+        logging.warning(f"配方檔含有未知的設定，將忽略: {sorted(unknown)}")
+    return recipe_from_options(data)
+
+
+def _trim(df):
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            # 非字串值經 .str 會變成 NaN，這些位置保留原值
+            stripped = series.str.strip()
+            df[col] = stripped.where(stripped.notna(), series)
+    return df
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def row_filter_mask(series, op, value):
+    """單一列條件的布林遮罩，語意與資料表管理的 SQL 篩選相同：空值只符合「為空」。
+
+    值為數字時以數值比較 (無法轉為數字的資料不符合)，否則以去除前後空白的文字比較。
+    """
+    if op == 'isnull':
+        return series.isna()
+    present = series.notna()
+    if op == 'notnull':
+        return present
+    text = series.astype(str).str.strip()
+    if op == 'contains':
+        return present & text.str.contains(str(value), regex=False)
+    if op == 'startswith':
+        return present & text.str.startswith(str(value))
+    if op not in _COMPARISONS:
+        raise ValueError(f"不支援的列條件運算子: {op}")
+    number = _to_number(value)
+    if number is not None:
+        numbers = pd.to_numeric(series, errors='coerce')
+        return numbers.notna() & _COMPARISONS[op](numbers, number)
+    return present & _COMPARISONS[op](text, str(value).strip())
+
+
+def _cast(series, cast_type):
+    if cast_type == 'int':
+        # 先轉成 numpy float64：Arrow 型態 (ArrowDtype) 的欄位不支援 % 運算
+        numbers = pd.to_numeric(series, errors='coerce').astype('float64')
+        return numbers.where(numbers % 1 == 0).astype('Int64')
+    if cast_type == 'float':
+        return pd.to_numeric(series, errors='coerce')
+    if cast_type == 'datetime':
+        return pd.to_datetime(series, errors='coerce', format='mixed')
+    if cast_type == 'text':
+        return series.astype(object).where(series.isna(), series.astype(str))
+    raise ValueError(f"不支援的型態轉換: {cast_type}")
+
+
+class Pipeline:
+    """由配方編譯出的轉換流程，預覽與匯入共用。
+
+    依序為：移除頂端行數與標題列 (每個檔案的第一個區塊) → 欄位名稱清理與對齊 → 列條件 →
+    去除前後空白 → 型態轉換 → 篩選 → 檔案/工作表來源欄位 → 去除重複。列條件放在最前面，
+    不符合的列不會經過後續步驟，也不會轉換與寫入資料庫。除去除重複外的步驟都
+    只處理單一區塊；去除重複以列雜湊記住已出現的資料，跨區塊、跨檔案一樣有效。
+    每個步驟帶有由其設定組成的鍵值，PreviewCache 以此判斷哪些步驟的結果可以沿用。
+    """
+    def __init__(self, recipe, tag_sheets=False):
+        self.recipe = recipe_from_options(recipe)
+        # 一次匯入多個工作表時加上工作表來源欄位
+        self.tag_sheets = tag_sheets
+        self.final_columns = None
+        self._file_name = None
+        self._sheet_name = None
+        self._file_header = None
+        self._first_chunk = False
+        self._seen_hashes = set()
+        self.steps = self._compile()
+
+    def _compile(self):
+        recipe = self.recipe
+        steps = [
+            ('transform', (recipe['rows_to_skip'], recipe['headers_promoted']), self._skip_and_header),
+            ('sanitize', (recipe['align_by_name'],), self._conform_columns),
+        ]
+        if recipe['row_filters']:
+            steps.append(('row_filter', tuple(map(tuple, recipe['row_filters'])), self._apply_row_filters))
+        if recipe['trim_whitespace']:
+            steps.append(('trim', (), _trim))
+        if recipe['casts']:
+            steps.append(('cast', tuple(sorted(recipe['casts'].items())), self._apply_casts))
+        if recipe['filters']:
+            steps.append(('filter', tuple(recipe['filters']), self._apply_filters))
+        if recipe['add_filename'] or self.tag_sheets:
+            steps.append(('source_tag', (recipe['add_filename'], self.tag_sheets), self._add_source))
+        if recipe['deduplicate']:
+            steps.append(('dedup', (), self._dedup))
+        return steps
+
+    def start_file(self, name, sheet_name=None):
+        """開始處理新檔案 (或同一活頁簿的另一個工作表)；下一個區塊會先套用移除行數與標題列。"""
+        self._file_name = name
+        self._sheet_name = sheet_name
+        self._file_header = None
+
+    def apply(self, df, metrics=None):
+        """對一個區塊套用所有步驟；回傳 None 表示此檔案與第一個檔案的欄位不相容而略過。"""
+        outputs = self._run(df, metrics)
+        return outputs[-1] if outputs else df
+
+    def _run(self, df, metrics=None, start=0):
+        # 回傳各步驟的輸出；結果為空或 None 時提早結束，後續步驟沒有輸出
+        self._first_chunk = self._file_header is None
+        outputs = []
+        for name, _, step in self.steps[start:]:
+            # 各步驟都拿到淺層複製，替換欄位或改名不會影響前一步的輸出 (預覽快取會保留它們)
+            df = df.copy(deep=False)
+            if metrics is None:
+                df = step(df)
+            else:
+                with metrics.stage(name) as stage:
+                    df = step(df)
+                    if df is not None: stage.add_rows(len(df))
+            outputs.append(df)
+            if df is None or df.empty:
+                break
+        return outputs
+
+    def _skip_and_header(self, df):
+        if self._first_chunk:
+            df = apply_skip_and_header(df, self.recipe['rows_to_skip'], self.recipe['headers_promoted'])
+            self._file_header = list(df.columns)
+        elif len(df.columns) == len(self._file_header):
+            df.columns = self._file_header
+        if self.recipe['usecols']:
+            # 只讀取部分欄位時讀取器保留了全空的行 (見 readers.read_file_raw)，在標題列之後才移除
+            df = df.dropna(how='all').reset_index(drop=True)
+        return df
+
+    def _conform_columns(self, df):
+        if self.final_columns is None:
+            df = sanitize_and_deduplicate_columns(df)
+            self.final_columns = df.columns.tolist()
+            return df
+        if self.recipe['align_by_name'] and self.recipe['headers_promoted']:
+            # 清理後的標題與第一個檔案比對：缺少的欄位補空值，多出的欄位捨棄
+            df = sanitize_and_deduplicate_columns(df)
+            missing = [c for c in self.final_columns if c not in df.columns]
+            extra = [c for c in df.columns if c not in self.final_columns]
+            if self._first_chunk and missing: logging.warning(f"檔案 '{self._file_name}' 缺少欄位 {missing}，將以空值填入。")
+            if self._first_chunk and extra: logging.warning(f"檔案 '{self._file_name}' 有第一個檔案沒有的欄位 {extra}，將捨棄這些欄位。")
+            return df.reindex(columns=self.final_columns)
+        if len(self.final_columns) == df.shape[1]:
+            df.columns = self.final_columns
+            return df
+        logging.warning(f"檔案 '{self._file_name}' 的欄位數 ({df.shape[1]}) 與第一個檔案 ({len(self.final_columns)}) 不符，將跳過此檔案。")
+        return None
+
+    def _apply_row_filters(self, df):
+        keep = np.ones(len(df), dtype=bool)
+        for column, op, value in self.recipe['row_filters']:
+            if column not in df.columns:
+                raise ValueError(f"列條件的欄位 '{column}' 不存在於檔案 '{self._file_name}'。")
+            keep &= row_filter_mask(df[column], op, value).to_numpy(dtype=bool, na_value=False)
+        return df if keep.all() else df[keep].reset_index(drop=True)
+
+    def _apply_casts(self, df):
+        for col, cast_type in self.recipe['casts'].items():
+            if col not in df.columns:
+                continue
+            before = int(df[col].notna().sum())
+            df[col] = _cast(df[col], cast_type)
+            lost = before - int(df[col].notna().sum())
+            if lost:
+                logging.warning(f"欄位 '{col}' 轉換為 {cast_type} 時有 {lost} 個值無法轉換，已設為空值。")
+        return df
+
+    def _apply_filters(self, df):
+        for expr in self.recipe['filters']:
+            try:
+                df = df.query(expr)
+            except Exception as e:
+                raise ValueError(f"篩選條件 '{expr}' 無法套用: {e}")
+        return df.reset_index(drop=True)
+
+    def _add_source(self, df):
+        if self.recipe['add_filename'] and SOURCE_COLUMN not in df.columns:
+            df.insert(0, SOURCE_COLUMN, self._file_name)
+        if self.tag_sheets and SHEET_COLUMN not in df.columns:
+            df.insert(1 if SOURCE_COLUMN in df.columns else 0, SHEET_COLUMN, self._sheet_name)
+        return df
+
+    def _dedup(self, df):
+        if df.empty:
+            return df
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        seen = self._seen_hashes
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        keep &= np.fromiter((h not in seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+        seen.update(hashes[keep].tolist())
+        return df[keep].reset_index(drop=True)
+
+
+def compile_pipeline(options):
+    return Pipeline(recipe_from_options(options), tag_sheets=options.get('sheet_mode', 'single') != 'single')
+
+
+class PreviewCache:
+    """記住預覽時每個步驟的輸出。
+
+    設定變更後重新編譯的流程會與上次的步驟鍵值逐一比對，只從第一個不同的步驟開始重算；
+    例如切換「去除重複」只需重跑最後一步。原始資料 (source) 換了就全部重算。
+    """
+    def __init__(self):
+        self.source = None
+        self.file_name = None
+        self.keys = []
+        self.outputs = []
+
+    def run(self, pipeline, df, file_name, sheet_name=None):
+        if df is not self.source or file_name != self.file_name:
+            self.source, self.file_name, self.keys, self.outputs = df, file_name, [], []
+        step_keys = [(name, key) for name, key, _ in pipeline.steps]
+        reuse = 0
+        while reuse < min(len(self.keys), len(step_keys)) and self.keys[reuse] == step_keys[reuse]:
+            reuse += 1
+        # 第一步 (移除行數與標題列) 一律須執行過，流程才知道目前的檔案標題
+        reuse = min(reuse, len(self.outputs))
+        pipeline.start_file(file_name, sheet_name)
+        if reuse:
+            pipeline._file_header = list(self.outputs[0].columns) if self.outputs[0] is not None else []
+            last = self.outputs[reuse - 1]
+            if last is None or last.empty or reuse == len(step_keys):
+                self.keys = step_keys[:reuse]
+                self.outputs = self.outputs[:reuse]
+                logging.debug(f"預覽轉換：沿用全部 {reuse} 個步驟。")
+                return last
+            new_outputs = pipeline._run(last, start=reuse)
+        else:
+            new_outputs = pipeline._run(df)
+        self.outputs = self.outputs[:reuse] + new_outputs
+        self.keys = step_keys[:len(self.outputs)]
+        logging.debug(f"預覽轉換：沿用 {reuse} 個步驟，重算 {len(new_outputs)} 個步驟。")
+        return self.outputs[-1] if self.outputs else df
@@ -0,0 +1,131 @@
+import datetime
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from metrics import app_file_path
+
+REJECTS_DIR = 'rejects'
+REJECT_REASON_COLUMN = '拒絕原因'
+DEAD_LETTER_ERROR_COLUMN = 'MySQL 錯誤'
+# 整數型態的範圍 (有號)；無號型態為 0 ~ 2 * 上限 + 1
+INTEGER_BOUNDS = {
+    'tinyint': (-2**7, 2**7 - 1),
+    'smallint': (-2**15, 2**15 - 1),
+    'mediumint': (-2**23, 2**23 - 1),
+    'int': (-2**31, 2**31 - 1),
+    'integer': (-2**31, 2**31 - 1),
+    'bigint': (-2**63, 2**63 - 1),
+}
+FLOAT_TYPES = ('float', 'double', 'decimal', 'numeric', 'real')
+DATE_TYPES = ('date', 'datetime', 'timestamp')
+LENGTH_TYPES = ('char', 'varchar')
+
+
+def read_target_schema(cursor, table_name):
+    """從 information_schema 讀取資料表的欄位定義 (依欄位順序)。"""
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE, COLUMN_DEFAULT, EXTRA "
+        "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (table_name,))
+    schema = {}
+    for name, data_type, column_type, max_length, nullable, default, extra in cursor.fetchall():
+        schema[name] = {
+            'type': data_type.lower(),
+            'unsigned': 'unsigned' in (column_type or '').lower(),
+            'max_length': int(max_length) if max_length is not None else None,
+            # 不可為空、沒有預設值、也不是自動遞增的欄位必須有值
+            'required': nullable == 'NO' and default is None and 'auto_increment' not in (extra or '').lower(),
+        }
+    return schema
+
+
+def check_columns(columns, schema, table_name):
+    """欄位層級的檢查：匯入資料有資料表沒有的欄位、或缺少必填欄位時，整批都無法寫入。"""
+    unknown = [c for c in columns if c not in schema]
+    if unknown:
+        raise ValueError(f"資料表 '{table_name}' 沒有這些欄位: {', '.join(map(str, unknown))}")
+    missing = [name for name, spec in schema.items() if spec['required'] and name not in columns]
+    if missing:
+        raise ValueError(f"匯入資料缺少資料表 '{table_name}' 的必填欄位: {', '.join(missing)}")
+
+
+def _check_column(series, spec):
+    """回傳 (不合格遮罩, 原因, 轉換後的欄位)；轉換後的值與 MySQL 解讀一致，合格的列直接寫入。"""
+    present = series.notna()
+    data_type = spec['type']
+    if data_type in INTEGER_BOUNDS:
+        # 先轉成 numpy float64：Arrow 型態 (ArrowDtype) 的欄位不支援 % 運算
+        numbers = pd.to_numeric(series, errors='coerce').astype('float64')
+        low, high = INTEGER_BOUNDS[data_type]
+        if spec['unsigned']: low, high = 0, high * 2 + 1
+        ok = numbers.notna() & (numbers % 1 == 0) & (numbers >= low) & (numbers <= high)
+        # 保留原值：大整數經浮點數轉換可能失去精度
+        return present & ~ok, f"不是 {data_type} 範圍內的整數", series
+    if data_type in FLOAT_TYPES:
+        numbers = pd.to_numeric(series, errors='coerce')
+        # DECIMAL 保留原值，避免轉成浮點數後失去精度
+        return present & numbers.isna(), "不是數字", series if data_type in ('decimal', 'numeric') else numbers
+    if data_type in DATE_TYPES:
+        dates = pd.to_datetime(series, errors='coerce', format='mixed')
+        return present & dates.isna(), "無法解析為日期時間", dates
+    if data_type in LENGTH_TYPES and spec['max_length']:
+        lengths = series.astype(str).str.len()
+        return present & (lengths > spec['max_length']), f"長度超過 {spec['max_length']} 個字元", series
+    return pd.Series(False, index=series.index), "", series
+
+
+def validate_frame(df, schema):
+    """依資料表結構檢查一個區塊，回傳 (合格的列, 不合格的列)；不合格的列多一欄拒絕原因。"""
+    bad = np.zeros(len(df), dtype=bool)
+    reasons = np.full(len(df), '', dtype=object)
+    checked = {}
+    for col in df.columns:
+        spec = schema[col]
+        invalid, reason, converted = _check_column(df[col], spec)
+        if spec['required']:
+            missing = df[col].isna().to_numpy()
+            if missing.any():
+                reasons[missing] += f"{col}: 不可為空; "
+                bad |= missing
+        invalid = invalid.to_numpy()
+        if invalid.any():
+            reasons[invalid] += f"{col}: {reason}; "
+            bad |= invalid
+        checked[col] = converted
+    clean = pd.DataFrame(checked, index=df.index)[~bad].reset_index(drop=True)
+    rejects = df[bad].copy()
+    rejects[REJECT_REASON_COLUMN] = [r.rstrip('; ') for r in reasons[bad]]
+    return clean, rejects.reset_index(drop=True)
+
+
+def reject_file_path(table_name, suffix=''):
+    folder = app_file_path(REJECTS_DIR)
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_name = re.sub(r'[^\w.-]', '_', table_name)
+    return os.path.join(folder, f"{safe_name}_{stamp}{suffix}.csv")
+
+
+class RejectWriter:
+    """把不合格的列附加寫入拒絕檔 (CSV, UTF-8 BOM 以便 Excel 開啟)；第一次寫入時才建立檔案。
+
+    suffix 區分檔案用途，例如寫入時被 MySQL 拒絕的列使用 '_dead_letter'。
+    """
+    def __init__(self, table_name, suffix=''):
+        self.table_name = table_name
+        self.suffix = suffix
+        self.path = None
+        self.rows = 0
+
+    def write(self, rejects):
+        if rejects.empty:
+            return
+        if self.path is None:
+            self.path = reject_file_path(self.table_name, self.suffix)
+            rejects.to_csv(self.path, index=False, encoding='utf-8-sig')
+        else:
+            rejects.to_csv(self.path, index=False, header=False, mode='a', encoding='utf-8')
+        self.rows += len(rejects)
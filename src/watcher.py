@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+
+import archives
+from jobs import FINISHED_STATUSES
+
+# 每隔幾秒掃描一次資料夾
+WATCH_POLL_SECONDS = 2.0
+# 檔案大小與修改時間連續幾次掃描都沒變，才視為寫入完成
+STABLE_CHECKS = 2
+# 每個微批次最多包含的檔案數
+MICRO_BATCH_MAX_FILES = 50
+
+
+def list_matching_files(folder, keyword='', log_errors=True):
+    """列出資料夾中符合檔名關鍵字 (不分大小寫) 的資料檔；壓縮檔照列，ZIP 依其中的資料檔展開 (見 archives)。"""
+    keyword = keyword.lower()
+    entries = archives.expand_entries(folder, sorted(os.listdir(folder)), log_errors)
+    return [entry for entry in entries if keyword in entry.lower()]
+
+
+class FolderWatcher:
+    """以輪詢監看資料夾，把寫入完成的新檔案分批交給 submit_batch(檔案路徑清單)。
+
+    submit_batch 回傳工作佇列中的 Job；前一批尚未結束時新檔案會累積起來，等它結束後合併成
+    下一個微批次，因此平時每個檔案幾秒內就會匯入，檔案大量湧入時則自動改為批次處理。
+    同一個檔案 (路徑、大小、修改時間皆相同) 只會匯入一次；開始監看時已存在的檔案預設略過。
+    檔案在所屬的工作成功後才算匯入完成；工作失敗或被取消時，該批的檔案記錄在 failed 並回報，
+    不會自動重送 (同一批前面的檔案可能已提交，附加模式重送會重複寫入)，檔案內容變更或呼叫
+    retry_failed() 後才會再次匯入。
+    """
+    def __init__(self, folder, keyword, submit_batch, include_existing=False, on_status=None,
+                 poll_seconds=WATCH_POLL_SECONDS, stable_checks=STABLE_CHECKS, max_batch_files=MICRO_BATCH_MAX_FILES):
+        self.folder = folder
+        self.keyword = keyword
+        self.submit_batch = submit_batch
+        self.on_status = on_status
+        self.poll_seconds = poll_seconds
+        self.stable_checks = stable_checks
+        self.max_batch_files = max_batch_files
+        self.seen = set() if include_existing else {self._signature(p) for p in self._candidates()} - {None}
+        self.pending = {}
+        self.ready = []
+        self.in_flight = None
+        # 送出中的批次 [(路徑, 簽章)]；工作成功後簽章才加入 seen
+        self.in_flight_files = []
+        # 所屬工作失敗的檔案 {簽章: 錯誤訊息}
+        self.failed = {}
+        self._retry_event = threading.Event()
+        self.batches = 0
+        self.files_submitted = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _candidates(self):
+        try:
+            # 仍在寫入的 ZIP 無法讀取成員清單，等下次掃描即可，不必記錄警告
+            return [os.path.join(self.folder, f) for f in list_matching_files(self.folder, self.keyword, log_errors=False)]
+        except OSError as e:
+            logging.error(f"無法列出監看資料夾 '{self.folder}': {e}")
+            return []
+
+    @staticmethod
+    def _signature(path):
+        # ZIP 成員以壓縮檔本身的大小與修改時間判斷是否寫入完成
+        try:
+            stat = os.stat(archives.local_path(path))
+        except OSError:
+            return None
+        return (path, stat.st_size, stat.st_mtime_ns)
+
+    def _status(self, text):
+        if self.on_status: self.on_status(text)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='folder-watcher', daemon=True)
+        self._thread.start()
+        logging.info(f"開始監看資料夾 '{self.folder}' (關鍵字: '{self.keyword}')，每 {self.poll_seconds:g} 秒掃描一次。")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.poll_seconds * 2)
+        logging.info(f"已停止監看資料夾 '{self.folder}'：共送出 {self.batches} 批、{self.files_submitted} 個檔案。")
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logging.error(f"監看資料夾時發生錯誤: {e}", exc_info=True)
+            self._stop_event.wait(self.poll_seconds)
+
+    def poll_once(self):
+        """掃描一次：更新待確認檔案的穩定次數，並在前一批結束後送出已就緒的檔案。"""
+        if self._retry_event.is_set():
+            self._retry_event.clear()
+            self._requeue_failed()
+        for path in self._candidates():
+            signature = self._signature(path)
+            if signature is None or signature in self.seen or signature in self.failed:
+                continue
+            if any(signature == submitted for _, submitted in self.in_flight_files) or path in self.ready:
+                continue
+            previous, checks = self.pending.get(path, (None, 0))
+            checks = checks + 1 if signature == previous else 0
+            if checks >= self.stable_checks and self._readable(path):
+                self.pending.pop(path, None)
+                self.ready.append(path)
+            else:
+                self.pending[path] = (signature, checks)
+
+        if self.in_flight is not None and self.in_flight.status not in FINISHED_STATUSES:
+            if self.ready: self._status(f"監看中：{len(self.ready)} 個檔案等待上一批完成，{len(self.pending)} 個檔案寫入中。")
+            return
+        if self.in_flight is not None:
+            self._finish_batch()
+        if not self.ready:
+            failed = f"，{len(self.failed)} 個檔案匯入失敗" if self.failed else ""
+            self._status(f"監看中：已送出 {self.batches} 批、{self.files_submitted} 個檔案{failed}，{len(self.pending)} 個檔案寫入中。")
+            return
+        batch, self.ready = self.ready[:self.max_batch_files], self.ready[self.max_batch_files:]
+        # 就緒到送出之間檔案可能又被改寫，以送出當下的簽章為準
+        self.in_flight_files = [(path, self._signature(path)) for path in batch]
+        self.in_flight = self.submit_batch(batch)
+        self.batches += 1
+        self.files_submitted += len(batch)
+        logging.info(f"監看資料夾送出第 {self.batches} 批：{len(batch)} 個檔案。")
+        self._status(f"監看中：已送出 {self.batches} 批、{self.files_submitted} 個檔案。")
+
+    def _finish_batch(self):
+        job, files = self.in_flight, self.in_flight_files
+        self.in_flight, self.in_flight_files = None, []
+        if job.status == 'done':
+            self.seen.update(signature for _, signature in files if signature is not None)
+            return
+        error = job.error or job.status
+        for _, signature in files:
+            if signature is not None:
+                self.failed[signature] = error
+        names = ', '.join(archives.display_name(path) for path, _ in files)
+        logging.error(f"監看資料夾的批次匯入未完成 ({job.status}: {error})，{len(files)} 個檔案未標記為已匯入: {names}。"
+                      f"同一批前面的檔案可能已提交，確認後可重試。")
+        self._status(f"監看中：有一批 {len(files)} 個檔案匯入失敗 ({error})，可重試失敗的檔案。")
+
+    def retry_failed(self):
+        """要求在下一次掃描時把匯入失敗的檔案重新排入 (可從其他執行緒呼叫)。"""
+        self._retry_event.set()
+
+    def _requeue_failed(self):
+        # 仍存在且內容未變更的失敗檔案重新排入；已變更的檔案會以新的簽章重新確認
+        failed, self.failed = self.failed, {}
+        retried = [path for path, size, mtime in failed if self._signature(path) == (path, size, mtime)]
+        self.ready.extend(path for path in retried if path not in self.ready)
+        logging.info(f"監看資料夾：重新排入 {len(retried)} 個先前匯入失敗的檔案。")
+
+    @staticmethod
+    def _readable(path):
+        # 其他程式仍以獨占方式寫入時 (Windows) 會無法開啟
+        try:
+            with open(archives.local_path(path), 'rb'):
+                return True
+        except OSError:
+            return False
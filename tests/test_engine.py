@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+import engine
+import readers
+from standin import StandInConnection, StandInCursor, StandInPool
+
+OPTIONS = {'rows_to_skip': 0, 'headers_promoted': True, 'action': 'overwrite', 'csv_encoding': 'utf-8'}
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    executed = []
+    execute = StandInCursor.execute
+
+    def record(self, sql, params=None):
+        executed.append(sql)
+        return execute(self, sql, params)
+    monkeypatch.setattr(StandInCursor, 'execute', record)
+    return executed
+
+
+@pytest.mark.parametrize('swap', [False, True])
+def test_overwrite_keeps_target_when_later_file_fails(tmp_path, statements, swap):
+    good = tmp_path / "a.csv"
+    pd.DataFrame({'編號': range(5000), '名稱': ['x'] * 5000}).to_csv(good, index=False)
+    pool = StandInPool()
+    pool.tables.add('t')
+
+    with pytest.raises(FileNotFoundError):
+        engine.import_files(pool, [str(good), str(tmp_path / "missing.csv")], 't', dict(OPTIONS, swap_overwrite=swap))
+
+    assert 't' in pool.tables
+    assert not any(sql.startswith("DROP TABLE `t`") for sql in statements)
+    assert "DROP TABLE IF EXISTS `t__new`" in statements[-1]
+
+
+def test_parallel_csv_ranges_are_imported_one_at_a_time(tmp_path, monkeypatch):
+    path = tmp_path / "big.csv"
+    pd.DataFrame({'編號': [f"{i:06d}" for i in range(40_000)], '金額': range(40_000)}).to_csv(path, index=False)
+    monkeypatch.setattr(readers, 'should_parse_in_parallel', lambda *args, **kwargs: True)
+    blocks = []
+    encode = engine._TableLoader.encode
+
+    def record(self, df):
+        blocks.append(len(df))
+        return encode(self, df)
+    monkeypatch.setattr(engine._TableLoader, 'encode', record)
+    pool = StandInPool()
+
+    result = engine.import_files(pool, [str(path)], 't', dict(OPTIONS, parallel_workers=2))
+
+    assert len(blocks) > 1
+    assert sum(blocks) == result['rows'] == pool.rows_written == 40_000
+
+
+@pytest.mark.parametrize('action', ['append', 'upsert'])
+def test_cancelled_load_into_existing_table_commits_nothing(tmp_path, statements, monkeypatch, action):
+    path = tmp_path / "a.csv"
+    pd.DataFrame({'編號': range(5000), '名稱': ['x'] * 5000}).to_csv(path, index=False)
+    pool = StandInPool()
+    pool.tables.add('t')
+    events = []
+    monkeypatch.setattr(StandInConnection, 'commit', lambda self: events.append('commit'))
+    monkeypatch.setattr(StandInConnection, 'rollback', lambda self: events.append('rollback'))
+    monkeypatch.setattr(StandInCursor, 'fetchone', lambda self: (0,) if self._result == [] else self._result[0])
+    # 替身沒有 information_schema；唯一索引的檢查與補建不是這裡要測的
+    monkeypatch.setattr(engine, '_ensure_unique_key', lambda *args: None)
+    cancel = threading.Event()
+
+    def progress(done, total, text):
+        if done: cancel.set()
+
+    options = dict(OPTIONS, action=action, key_columns=['編號'], validate_schema=False)
+    with pytest.raises(engine.OperationCancelled):
+        engine.import_files(pool, [str(path)], 't', options, progress=progress, cancel_event=cancel)
+
+    assert pool.rows_written > 0
+    assert events == ['rollback']
+    assert any(sql == "SAVEPOINT batch_write" for sql in statements)
+
+
+def _sqlite_table(path, rowids):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE s (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO s VALUES (?, ?)", ((rowid, f"n{rowid}") for rowid in rowids))
+    conn.commit()
+    conn.close()
+
+
+def test_sparse_sqlite_rowids_are_read_serially_with_exact_count(tmp_path):
+    path = str(tmp_path / "sparse.sqlite")
+    # 雪花 ID 般的主鍵：rowid 範圍遠大於筆數
+    rowids = [1_700_000_000_000_000 + i * 7_919_000_003 for i in range(3000)]
+    _sqlite_table(path, rowids)
+    conn = engine.open_sqlite_readonly(path)
+    try:
+        total, rowid_ranges = engine._plan_sqlite_read(conn, 's')
+        assert (total, rowid_ranges) == (3000, None)
+        rows = [row for chunk in engine._iter_sqlite_chunks(path, conn, 's', rowid_ranges) for row in chunk]
+    finally:
+        conn.close()
+    assert [row[0] for row in rows] == rowids
+
+
+def test_dense_sqlite_rowids_are_split_by_row_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'SQLITE_PARALLEL_MIN_ROWS', 1000)
+    monkeypatch.setattr(engine, 'SQLITE_RANGE_ROWS', 500)
+    path = str(tmp_path / "dense.sqlite")
+    # 每三個 rowid 有兩筆資料
+    rowids = [i for i in range(1, 60_001) if i % 3]
+    _sqlite_table(path, rowids)
+    conn = engine.open_sqlite_readonly(path)
+    try:
+        total, (low, high, width) = engine._plan_sqlite_read(conn, 's')
+        assert abs(total - len(rowids)) < len(rowids) * 0.05
+        assert 700 <= width <= 800
+        rows = [row for chunk in engine._iter_sqlite_chunks(path, conn, 's', (low, high, width)) for row in chunk]
+    finally:
+        conn.close()
+    assert [row[0] for row in rows] == rowids
@@ -0,0 +1,36 @@
+import threading
+
+import jobs
+
+
+def _job(target, running, overlaps, release):
+    def run(progress, cancel_event):
+        with running['lock']:
+            running[target] = running.get(target, 0) + 1
+            if running[target] > 1: overlaps.append(target)
+        release.wait(5)
+        with running['lock']:
+            running[target] -= 1
+        return {'rows': 0}
+    return jobs.Job('import', target, target, run)
+
+
+def test_jobs_for_the_same_table_run_one_at_a_time():
+    queue = jobs.JobQueue(None, workers=4)
+    running, overlaps, release = {'lock': threading.Lock()}, [], threading.Event()
+    first, second = queue.submit(_job('t', running, overlaps, release)), queue.submit(_job('T', running, overlaps, release))
+    other = queue.submit(_job('u', running, overlaps, release))
+    cancelled = queue.submit(_job('t', running, overlaps, release))
+    queue.cancel(cancelled.id)
+
+    # 不同資料表的工作不必等待
+    while other.status != 'running' or first.status != 'running':
+        threading.Event().wait(0.01)
+    assert second.status == 'queued'
+
+    release.set()
+    while queue.active_count():
+        threading.Event().wait(0.01)
+    queue.shutdown()
+    assert [first.status, second.status, other.status, cancelled.status] == ['done', 'done', 'done', 'cancelled']
+    assert not overlaps
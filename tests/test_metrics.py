@@ -0,0 +1,51 @@
+import threading
+
+import metrics
+import staging
+from metrics import StageMetrics
+
+
+def test_stage_counts_from_many_threads():
+    metrics = StageMetrics("測試")
+
+    def work():
+        for _ in range(2000):
+            with metrics.stage('insert', rows=1) as stage:
+                stage.add_rows(1)
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    with metrics.concurrent():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    data = metrics.as_dict()['stages']['insert']
+    assert data['calls'] == 16000
+    assert data['rows'] == 32000
+    # 同時執行的階段只有整個程序的 RSS，不記錄各自的記憶體變化
+    assert data['mem_delta_mb'] is None
+
+
+def test_memory_delta_outside_concurrent_section():
+    metrics = StageMetrics("測試")
+    with metrics.stage('read'):
+        pass
+    assert metrics.as_dict()['stages']['read']['mem_delta_mb'] is not None
+    assert 'read' in metrics.summary()
+
+
+def test_cprofile_covers_stage_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'APP_DIR', str(tmp_path))
+
+    def stage_work():
+        return sum(range(1000))
+
+    def run():
+        staged = staging.StagedPipeline(('parse', lambda: iter(range(3))), [('encode', lambda item: [stage_work()])], ('write', lambda item: None))
+        staged.run()
+        return 'ok'
+
+    assert metrics.run_profiled('cprofile', 'test', run) == 'ok'
+    report, = tmp_path.glob('*.txt')
+    assert 'stage_work' in report.read_text(encoding='utf-8')
+    assert len(list(tmp_path.glob('*.prof'))) == 1
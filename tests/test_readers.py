@@ -0,0 +1,68 @@
+import random
+
+import pandas as pd
+import pytest
+
+import readers
+
+
+def _write_mixed_csv(path, rows=40_000):
+    rng = random.Random(7)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("編號,金額,備註\n")
+        for i in range(rows):
+            # 前導零的編號、整數值的小數與偶爾出現的文字，各位元組範圍推斷的型態會不同
+            code = f"{rng.randint(0, 9999):06d}" if i < rows // 2 else str(rng.randint(0, 9999))
+            amount = f"{rng.randint(0, 100)}.0" if rng.random() < 0.9 else "無"
+            note = "" if rng.random() < 0.3 else f"\"第 {i} 筆, 含逗號\""
+            f.write(f"{code},{amount},{note}\n")
+
+
+def test_parallel_csv_matches_serial(tmp_path, monkeypatch):
+    path = str(tmp_path / "mixed.csv")
+    _write_mixed_csv(path)
+    serial = readers.read_file_raw(path, parallel_workers=1)
+
+    # 小檔案預設不會平行解析，這裡強制切成多個範圍
+    monkeypatch.setattr(readers, 'should_parse_in_parallel', lambda *args, **kwargs: True)
+    parallel = readers.read_file_raw(path, parallel_workers=2)
+
+    assert len(readers.split_csv_byte_ranges(path, 8)) > 1
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert serial.iloc[1, 0] == serial.iloc[1, 0].zfill(6)
+
+
+def test_headerless_numeric_csv_infers_like_pandas(tmp_path):
+    path = tmp_path / "numbers.csv"
+    path.write_text("003,1.5,a\n010,2,\n,3,c\n", encoding='utf-8')
+    df = readers.read_file_raw(str(path))
+    expected = pd.read_csv(path, header=None)
+    expected.columns = df.columns
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_pyarrow_engine_matches_c_engine(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / "numbers.csv"
+    path.write_text("003,1.5,a\n010,2,\n,3,c\n", encoding='utf-8')
+    c_engine = readers.read_file_raw(str(path), csv_engine='c')
+    arrow_engine = readers.read_file_raw(str(path), csv_engine='pyarrow')
+    pd.testing.assert_frame_equal(arrow_engine, c_engine)
+
+    path.write_text("編號,金額\n003,1.5\n010,2\n", encoding='utf-8')
+    c_engine = readers.read_file_raw(str(path), csv_engine='c')
+    arrow_engine = readers.read_file_raw(str(path), csv_engine='pyarrow')
+    pd.testing.assert_frame_equal(arrow_engine, c_engine)
+    assert list(arrow_engine.iloc[1:, 0]) == ['003', '010']
+
+
+def test_parallel_csv_is_streamed_in_file_order(tmp_path, monkeypatch):
+    path = str(tmp_path / "mixed.csv")
+    _write_mixed_csv(path)
+    serial = readers.read_file_raw(path, parallel_workers=1)
+
+    monkeypatch.setattr(readers, 'should_parse_in_parallel', lambda *args, **kwargs: True)
+    chunks = list(readers.iter_file_raw(path, parallel_workers=2))
+
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), serial)
@@ -0,0 +1,38 @@
+import sqlite3
+
+import exporter
+import table_ops
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (0,)
+
+
+def test_table_names_with_backticks_are_escaped():
+    where_sql, params = table_ops.build_where(['a'], [('a', 'eq', 1)])
+    assert table_ops.select_sql('x`; DROP TABLE y; --', where_sql) == \
+        "SELECT * FROM `x``; DROP TABLE y; --` WHERE `a` = %s"
+
+    cursor = RecordingCursor()
+    exporter._estimate_rows(cursor, 'x`y', where_sql, params)
+    assert cursor.statements == ["SELECT COUNT(*) FROM `x``y` WHERE `a` = %s"]
+
+
+def test_sqlite_export_escapes_double_quotes(tmp_path):
+    path = str(tmp_path / "out.sqlite")
+    writer = exporter._SQLiteWriter(path, ['a"b', '名稱'], ['int', 'text'], 'x"y')
+    writer.write_batch([(1, 'n')])
+    writer.close()
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT "a""b", "名稱" FROM "x""y"').fetchall() == [(1, 'n')]
+    finally:
+        conn.close()
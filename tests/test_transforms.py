@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+
+from transforms import _cast
+
+# PyArrow 是選用套件
+pa = pytest.importorskip('pyarrow')
+
+
+def test_int_cast_on_arrow_strings():
+    series = pd.Series(['1', '2.5', None, 'x', '40'], dtype=pd.ArrowDtype(pa.string()))
+    result = _cast(series, 'int')
+    assert str(result.dtype) == 'Int64'
+    assert result.tolist() == [1, pd.NA, pd.NA, pd.NA, 40]
+
+
+def test_int_cast_on_arrow_numbers():
+    series = pd.Series([3.0, 2.5, None], dtype=pd.ArrowDtype(pa.float64()))
+    assert _cast(series, 'int').tolist() == [3, pd.NA, pd.NA]
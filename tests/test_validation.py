@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from validation import REJECT_REASON_COLUMN, validate_frame
+
+pa = pytest.importorskip('pyarrow')
+
+SCHEMA = {
+    '數量': {'type': 'int', 'unsigned': False, 'max_length': None, 'required': False},
+    '名稱': {'type': 'varchar', 'unsigned': False, 'max_length': 3, 'required': True},
+}
+
+
+def test_validate_arrow_frame():
+    text = pd.ArrowDtype(pa.string())
+    df = pd.DataFrame({
+        '數量': pd.Series(['1', '2.5', 'x', None, '3000000000'], dtype=text),
+        '名稱': pd.Series(['甲', '乙', '丙', '丁', '戊己庚辛'], dtype=text),
+    })
+    clean, rejects = validate_frame(df, SCHEMA)
+    assert clean['名稱'].tolist() == ['甲', '丁']
+    assert rejects['名稱'].tolist() == ['乙', '丙', '戊己庚辛']
+    assert rejects[REJECT_REASON_COLUMN].str.contains('數量').tolist() == [True, True, True]
+    assert '長度超過' in rejects[REJECT_REASON_COLUMN].iloc[2]
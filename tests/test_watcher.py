@@ -0,0 +1,59 @@
+import watcher
+
+
+class FakeJob:
+    def __init__(self, paths):
+        self.paths = paths
+        self.status = 'running'
+        self.error = None
+
+
+def make_watcher(tmp_path, submitted):
+    def submit_batch(paths):
+        job = FakeJob(paths)
+        submitted.append(job)
+        return job
+    return watcher.FolderWatcher(str(tmp_path), '', submit_batch, include_existing=True, stable_checks=0)
+
+
+def test_failed_batch_is_not_marked_seen_and_can_be_retried(tmp_path):
+    for name in ('a.csv', 'b.csv'):
+        (tmp_path / name).write_text('x\n1\n')
+    submitted = []
+    folder_watcher = make_watcher(tmp_path, submitted)
+
+    folder_watcher.poll_once()
+    assert len(submitted) == 1 and len(submitted[0].paths) == 2
+
+    submitted[0].status, submitted[0].error = 'failed', 'connection lost'
+    folder_watcher.poll_once()
+    folder_watcher.poll_once()
+    assert len(submitted) == 1
+    assert not folder_watcher.seen
+    assert set(folder_watcher.failed.values()) == {'connection lost'}
+
+    folder_watcher.retry_failed()
+    folder_watcher.poll_once()
+    assert len(submitted) == 2 and sorted(submitted[1].paths) == sorted(submitted[0].paths)
+    assert not folder_watcher.failed
+
+    submitted[1].status = 'done'
+    folder_watcher.poll_once()
+    assert len(submitted) == 2
+    assert {signature[0] for signature in folder_watcher.seen} == set(submitted[0].paths)
+
+
+def test_changed_file_from_failed_batch_is_submitted_again(tmp_path):
+    path = tmp_path / 'a.csv'
+    path.write_text('x\n1\n')
+    submitted = []
+    folder_watcher = make_watcher(tmp_path, submitted)
+
+    folder_watcher.poll_once()
+    submitted[0].status = 'cancelled'
+    folder_watcher.poll_once()
+    assert len(submitted) == 1
+
+    path.write_text('x\n1\n2\n')
+    folder_watcher.poll_once()
+    assert len(submitted) == 2